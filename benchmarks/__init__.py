@@ -0,0 +1,13 @@
+"""
+Benchmarks for the Moviements backend.
+
+Every module is runnable from the repository root, e.g.::
+
+    python -m benchmarks.forward_auth
+
+The token and authentication hot paths (benchmarks.auth) have a runner that saves
+JSON results and flags regressions against a baseline::
+
+    python -m benchmarks --output baseline.json
+    python -m benchmarks --baseline baseline.json
+"""
@@ -0,0 +1,104 @@
+"""
+Runs the token and authentication benchmarks, saves their results as JSON and
+compares them with a baseline.
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --baseline baseline.json [--threshold 0.1] [decode_token ...]
+
+Exits with status 1 when a benchmark is slower than its baseline by more than the threshold.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+from pathlib import Path
+
+from .common import setup_django
+
+METRIC = "p50_us"
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Prints the change of every benchmark against the baseline.
+
+    Returns:
+        list[str]: The names of the benchmarks that regressed by more than threshold.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, stats in results.items():
+        if name not in baseline:
+            print(f"{name:<40} {'-':>12} {stats[METRIC]:>10.1f}us {'new':>9}")
+            continue
+
+        before, after = baseline[name][METRIC], stats[METRIC]
+        change = (after - before) / before
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<40} {before:>10.1f}us {after:>10.1f}us {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("names", nargs="*", help="Benchmarks to run (all by default)")
+    parser.add_argument("-n", "--iterations", type=int, default=2000)
+    parser.add_argument(
+        "-o", "--output", type=Path, help="Write the results to this JSON file"
+    )
+    parser.add_argument(
+        "-b", "--baseline", type=Path, help="Compare with these saved results"
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Median latency increase flagged as a regression (default: 0.1, i.e. 10%%)",
+    )
+    args = parser.parse_args(argv)
+
+    setup_django()
+
+    import django
+
+    from .auth import BENCHMARKS, run
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = run(args.iterations, args.names)
+
+    if args.output:
+        args.output.write_text(
+            json.dumps(
+                {
+                    "created_at": datetime.datetime.now(
+                        datetime.timezone.utc
+                    ).isoformat(),
+                    "python": platform.python_version(),
+                    "django": django.get_version(),
+                    "machine": platform.machine(),
+                    "benchmarks": results,
+                },
+                indent=2,
+            )
+        )
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["benchmarks"]
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
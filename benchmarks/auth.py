@@ -0,0 +1,181 @@
+"""
+Benchmarks of the token and authentication hot paths.
+
+    python -m benchmarks.auth [iterations]
+
+Run them through ``python -m benchmarks`` to save JSON results and compare them with a baseline.
+"""
+
+import datetime
+import sys
+from types import SimpleNamespace
+from typing import Callable
+
+from .common import setup_django, test_database, measure, report
+
+USER_AGENT = "benchmark"
+REMOTE_ADDR = "127.0.0.1"
+
+BENCHMARKS: dict[str, Callable[[SimpleNamespace, int], dict]] = {}
+
+
+def benchmark(name: str):
+    """
+    Registers a benchmark, called with the fixtures and the number of iterations.
+    """
+
+    def decorator(fn):
+        BENCHMARKS[name] = fn
+        return fn
+
+    return decorator
+
+
+def create_fixtures() -> SimpleNamespace:
+    from django.test import RequestFactory
+    from rest_framework.request import Request
+
+    from user_auth.models import CustomUser, Session
+
+    user = CustomUser.objects.create_user(
+        username="benchmark", email="benchmark@moviements.ru", is_active=True
+    )
+    session = Session.create_for_user(user, USER_AGENT, REMOTE_ADDR)
+    access_token, refresh_token = session.create_token_pair()
+    factory = RequestFactory()
+
+    def make_request():
+        return Request(
+            factory.get(
+                "/auth/me/",
+                HTTP_AUTHORIZATION=f"Bearer {access_token}",
+                HTTP_USER_AGENT=USER_AGENT,
+                REMOTE_ADDR=REMOTE_ADDR,
+            )
+        )
+
+    return SimpleNamespace(
+        user=user,
+        session=session,
+        access_token=access_token,
+        refresh_token=refresh_token,
+        make_request=make_request,
+    )
+
+
+@benchmark("generate_token_pair")
+def bench_generate_token_pair(fixtures, iterations):
+    from tokens.jwt import generate_token_pair
+
+    payload = {"session_id": str(fixtures.session.id)}
+    return measure(lambda: generate_token_pair(payload), iterations)
+
+
+@benchmark("decode_token")
+def bench_decode_token(fixtures, iterations):
+    from tokens.jwt import decode_token
+
+    return measure(lambda: decode_token(fixtures.access_token), iterations)
+
+
+@benchmark("get_token_type")
+def bench_get_token_type(fixtures, iterations):
+    from tokens.jwt import get_token_type
+
+    return measure(lambda: get_token_type(fixtures.refresh_token), iterations)
+
+
+@benchmark("authenticate_warm")
+def bench_authenticate_warm(fixtures, iterations):
+    """
+    A request within the session touch interval: no writes.
+    """
+    from tokens.authentication import JWTAuthentication
+
+    authentication = JWTAuthentication()
+    return measure(authentication.authenticate, iterations, setup=fixtures.make_request)
+
+
+@benchmark("authenticate_cold")
+def bench_authenticate_cold(fixtures, iterations):
+    """
+    The first request after the session touch interval: the session and the user last login are written.
+    """
+    from django.utils import timezone
+
+    from tokens.authentication import JWTAuthentication
+    from user_auth.models import CustomUser, Session
+
+    authentication = JWTAuthentication()
+    stale = timezone.now() - datetime.timedelta(days=1)
+
+    def setup():
+        Session.objects.filter(pk=fixtures.session.pk).update(updated_at=stale)
+        CustomUser.objects.filter(pk=fixtures.user.pk).update(last_login=None)
+        return fixtures.make_request()
+
+    return measure(authentication.authenticate, iterations, setup=setup)
+
+
+@benchmark("blacklist_refresh_token")
+def bench_blacklist_refresh_token(fixtures, iterations):
+    from tokens.jwt import generate_token_pair
+    from tokens.models import Blacklist
+
+    payload = {"session_id": str(fixtures.session.id)}
+    return measure(
+        Blacklist.blacklist_refresh_token,
+        iterations,
+        setup=lambda: generate_token_pair(payload)[1],
+    )
+
+
+@benchmark("make_password")
+def bench_make_password(fixtures, iterations):
+    from django.contrib.auth.hashers import make_password
+
+    # Hashing is deliberately slow: scale the iterations down
+    return measure(
+        lambda: make_password("benchmark-password"),
+        max(iterations // 200, 5),
+        warmup=1,
+    )
+
+
+@benchmark("check_password")
+def bench_check_password(fixtures, iterations):
+    from django.contrib.auth.hashers import check_password, make_password
+
+    encoded = make_password("benchmark-password")
+    return measure(
+        lambda: check_password("benchmark-password", encoded),
+        max(iterations // 200, 5),
+        warmup=1,
+    )
+
+
+def run(iterations: int = 2000, names=None) -> dict[str, dict]:
+    """
+    Runs the benchmarks (all of them by default) in a throwaway test database.
+
+    Returns:
+        dict[str, dict]: The statistics of each benchmark, by name.
+    """
+    results = {}
+    with test_database():
+        fixtures = create_fixtures()
+        for name, fn in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            results[name] = fn(fixtures, iterations)
+            report(name, results[name])
+    return results
+
+
+def main(iterations: int = 2000) -> None:
+    setup_django()
+    run(iterations)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,82 @@
+"""
+Compares signing up users one at a time, like SignUpView, with the bulk provisioning of
+user_auth.provisioning (batch validation, pooled password hashing and bulk_create).
+
+    python -m benchmarks.bulk_provisioning [--users 64] [--workers N]
+"""
+
+import argparse
+import time
+
+from .common import setup_django, test_database
+
+
+def sign_up_one_by_one(records: list[dict]) -> None:
+    from django.db import transaction
+
+    from user_auth.models import UserRequest
+    from user_auth.serializers import SignUpSerializer
+
+    # The body of SignUpView.post
+    for record in records:
+        serializer = SignUpSerializer(data=record)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+            serializer.instance.set_password(serializer.validated_data["password"])
+            serializer.instance.save()
+            UserRequest.objects.create(
+                user=serializer.instance,
+                type=UserRequest.UserRequestType.SIGNUP_COMPLETE,
+            ).send_email()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Hashing processes (default: one per CPU)",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext, override_settings
+
+    from user_auth.hashing import hash_passwords, hashing_pool
+    from user_auth.models import CustomUser
+    from user_auth.provisioning import provision_users
+
+    with test_database(), override_settings(
+        PASSWORD_HASHING={"WORKERS": args.workers}
+    ), hashing_pool():
+        # Start the pool outside of the measurement
+        hash_passwords(["warm-up"] * 8)
+
+        for name, fn in (("one_by_one", sign_up_one_by_one), ("bulk", provision_users)):
+            records = [
+                {
+                    "username": f"{name}{i}",
+                    "email": f"{name}{i}@moviements.ru",
+                    "password": f"password{i}",
+                }
+                for i in range(args.users)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                fn(records)
+                elapsed = time.perf_counter() - start
+            print(
+                f"{name:<12} {args.users} users in {elapsed:>7.2f} s"
+                f"   {args.users / elapsed:>7.1f} users/s   {len(queries)} queries"
+            )
+
+        assert CustomUser.objects.count() == 2 * args.users
+
+
+if __name__ == "__main__":
+    main()
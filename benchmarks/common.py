@@ -0,0 +1,102 @@
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+def setup_django() -> None:
+    """
+    Configures Django with the project settings.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "moviements.settings")
+
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """
+    Creates a throwaway test database (and disables DEBUG) for the duration of the block.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(timings: list[float], fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of sorted timings.
+    """
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+def measure(
+    fn: Callable,
+    iterations: int = 1000,
+    warmup: int = 100,
+    setup: Optional[Callable[[], object]] = None,
+) -> dict:
+    """
+    Calls fn repeatedly and returns latency statistics in microseconds.
+
+    Parameters:
+        fn (Callable): The function to measure.
+        iterations (int, optional): The number of measured calls. Defaults to 1000.
+        warmup (int, optional): The number of calls made before measuring. Defaults to 100.
+        setup (Callable, optional): Called before every call, outside of the measurement.
+            Its return value is passed to fn.
+
+    Returns:
+        dict: Throughput, mean and percentile latencies.
+    """
+    for _ in range(warmup):
+        fn(setup()) if setup else fn()
+
+    timings = []
+    for _ in range(iterations):
+        if setup:
+            argument = setup()
+            start = time.perf_counter_ns()
+            fn(argument)
+        else:
+            start = time.perf_counter_ns()
+            fn()
+        timings.append((time.perf_counter_ns() - start) / 1000)
+
+    return summarize(timings)
+
+
+def summarize(timings: list[float]) -> dict:
+    """
+    Returns the statistics of latencies in microseconds, in the format of measure.
+    """
+    mean = statistics.fmean(timings)
+    timings = sorted(timings)
+    return {
+        "iterations": len(timings),
+        "ops_per_sec": 1e6 / mean,
+        "mean_us": mean,
+        "p50_us": percentile(timings, 0.50),
+        "p95_us": percentile(timings, 0.95),
+        "p99_us": percentile(timings, 0.99),
+    }
+
+
+def report(name: str, stats: dict) -> None:
+    print(
+        f"{name:<40} mean {stats['mean_us']:>10.1f} us"
+        f"   p50 {stats['p50_us']:>10.1f} us"
+        f"   p99 {stats['p99_us']:>10.1f} us"
+        f"   {stats['ops_per_sec']:>10.0f} ops/s"
+    )
@@ -0,0 +1,61 @@
+"""
+Compares the forward-auth endpoint with an authenticated DRF view.
+
+Requests are sent straight to the WSGI handler, so the numbers include the whole
+Django stack (signals, middleware, view) but no HTTP server or test client overhead.
+
+    python -m benchmarks.forward_auth [iterations]
+"""
+
+import io
+import sys
+
+from .common import setup_django, test_database, measure, report
+
+USER_AGENT = "benchmark"
+REMOTE_ADDR = "127.0.0.1"
+
+
+def main(iterations: int = 2000) -> None:
+    setup_django()
+
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import RequestFactory
+
+    from user_auth.models import CustomUser, Session
+
+    with test_database():
+        user = CustomUser.objects.create_user(
+            username="benchmark", email="benchmark@moviements.ru", is_active=True
+        )
+        session = Session.create_for_user(user, USER_AGENT, REMOTE_ADDR)
+        access_token, _ = session.create_token_pair()
+
+        handler = WSGIHandler()
+        factory = RequestFactory(
+            HTTP_AUTHORIZATION=f"Bearer {access_token}",
+            HTTP_USER_AGENT=USER_AGENT,
+            REMOTE_ADDR=REMOTE_ADDR,
+        )
+
+        def start_response(status, headers, exc_info=None):
+            return lambda data: None
+
+        def call(path: str) -> int:
+            environ = dict(factory.get(path).environ, **{"wsgi.input": io.BytesIO()})
+            response = handler(environ, start_response)
+            response.close()
+            return response.status_code
+
+        assert call("/tokens/verify/") == 200
+        assert call("/auth/me/") == 200
+
+        report(
+            "forward auth /tokens/verify/",
+            measure(lambda: call("/tokens/verify/"), iterations),
+        )
+        report("DRF view /auth/me/", measure(lambda: call("/auth/me/"), iterations))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,67 @@
+"""
+Compares DRF's JSONRenderer/JSONParser with moviements.renderers.FastJSONRenderer
+and moviements.parsers.FastJSONParser on the API's typical payloads.
+
+    python -m benchmarks.json_renderer [iterations]
+"""
+
+import datetime
+import io
+import sys
+import uuid
+
+from .common import setup_django, measure, report
+
+
+def main(iterations: int = 2000) -> None:
+    setup_django()
+
+    from django.utils import timezone
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from moviements.parsers import FastJSONParser
+    from moviements.renderers import FastJSONRenderer
+    from tokens.jwt import generate_token_pair
+    from user_auth.models import Session
+    from user_auth.serializers import SessionSerializer
+
+    user_id = uuid.uuid4()
+    now = timezone.now()
+    sessions = [
+        Session(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+            ip_address=f"10.0.{i // 256}.{i % 256}",
+            created_at=now - datetime.timedelta(days=i),
+            updated_at=now,
+        )
+        for i in range(100)
+    ]
+    sessions_payload = {"sessions": SessionSerializer(sessions, many=True).data}
+
+    access_token, refresh_token = generate_token_pair({"session_id": str(uuid.uuid4())})
+    signin_payload = {"access_token": access_token, "refresh_token": refresh_token}
+    signin_request = b'{"username": "testuser", "password": "testpassword"}'
+
+    for name, renderer, parser in (
+        ("drf", JSONRenderer(), JSONParser()),
+        ("fast", FastJSONRenderer(), FastJSONParser()),
+    ):
+        report(
+            f"{name} render 100 sessions",
+            measure(lambda: renderer.render(sessions_payload), iterations),
+        )
+        report(
+            f"{name} render /auth/signin/ response",
+            measure(lambda: renderer.render(signin_payload), iterations),
+        )
+        report(
+            f"{name} parse /auth/signin/ request",
+            measure(lambda: parser.parse(io.BytesIO(signin_request)), iterations),
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,74 @@
+"""
+Measures the per-request overhead of the middleware chain with the stock Django
+browser middleware and with the path-aware profile from moviements.middleware.
+
+The chain wraps a view that returns an empty response, so only middleware work is
+measured.
+
+    python -m benchmarks.middleware [iterations]
+"""
+
+import sys
+from typing import Callable
+
+from .common import setup_django, measure, report
+
+STOCK_MIDDLEWARE = {
+    "moviements.middleware.SessionMiddleware": "django.contrib.sessions.middleware.SessionMiddleware",
+    "moviements.middleware.CsrfViewMiddleware": "django.middleware.csrf.CsrfViewMiddleware",
+    "moviements.middleware.AuthenticationMiddleware": "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "moviements.middleware.MessageMiddleware": "django.contrib.messages.middleware.MessageMiddleware",
+}
+
+
+def build_chain(middleware: list[str]):
+    """
+    Builds the middleware chain the same way BaseHandler does, including process_view hooks.
+    """
+    from django.core.exceptions import MiddlewareNotUsed
+    from django.http import HttpResponse
+    from django.utils.module_loading import import_string
+
+    def view(request):
+        return HttpResponse()
+
+    process_views: list[Callable] = []
+
+    def get_response(request):
+        for process_view in process_views:
+            process_view(request, view, (), {})
+        return view(request)
+
+    handler = get_response
+    for path in reversed(middleware):
+        try:
+            mw_instance = import_string(path)(handler)
+        except MiddlewareNotUsed:
+            continue
+        handler = mw_instance
+        if hasattr(handler, "process_view"):
+            process_views.insert(0, handler.process_view)
+    return handler
+
+
+def main(iterations: int = 5000) -> None:
+    setup_django()
+
+    from django.conf import settings
+    from django.test import RequestFactory
+
+    profile = list(settings.MIDDLEWARE)
+    stock = [STOCK_MIDDLEWARE.get(path, path) for path in profile]
+    factory = RequestFactory(HTTP_AUTHORIZATION="Bearer token")
+
+    for path in ("/auth/me/", "/admin/"):
+        for name, middleware in (("stock", stock), ("api profile", profile)):
+            chain = build_chain(middleware)
+            report(
+                f"{name} {path}",
+                measure(lambda: chain(factory.get(path)), iterations),
+            )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,50 @@
+"""
+Compares generating the OpenAPI schema on every request (what the drf_yasg views
+did with cache_timeout=0) with serving the cached artifact.
+
+    python -m benchmarks.openapi_schema [iterations]
+"""
+
+import sys
+
+from .common import setup_django, measure, report
+
+
+def main(iterations: int = 200) -> None:
+    setup_django()
+
+    from django.test import RequestFactory
+
+    from moviements.schema import (
+        generate_schema,
+        get_schema_document,
+        schema_document_view,
+    )
+
+    factory = RequestFactory()
+    etag = get_schema_document(".json").etag
+
+    report(
+        "cold generation",
+        measure(lambda: generate_schema(".json"), iterations, warmup=5),
+    )
+    report(
+        "cached artifact (200)",
+        measure(
+            lambda: schema_document_view(factory.get("/swagger.json/"), ".json"),
+            iterations,
+        ),
+    )
+    report(
+        "cached artifact (304)",
+        measure(
+            lambda: schema_document_view(
+                factory.get("/swagger.json/", HTTP_IF_NONE_MATCH=etag), ".json"
+            ),
+            iterations,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
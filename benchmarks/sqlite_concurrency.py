@@ -0,0 +1,147 @@
+"""
+Compares Django's default SQLite configuration with the tuned backend
+(moviements.db.backends.sqlite3) under concurrent processes. The "persistent" profile is
+the default backend with the CONN_MAX_AGE of the tuned one, which tells the gain of
+reusing connections apart from the gain of the pragmas.
+
+Every worker process serves simulated authenticated requests: a session and user lookup,
+and for a fraction of the requests the session touch write of JWTAuthentication. Requests
+end like Django requests do, closing the connection unless CONN_MAX_AGE keeps it open.
+
+    python -m benchmarks.sqlite_concurrency [--processes 8] [--duration 5] [--write-fraction 0.1]
+"""
+
+import argparse
+import multiprocessing
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from .common import report, setup_django, summarize
+
+SESSIONS = 10000
+
+PROFILES: dict[str, dict[str, Any]] = {
+    "default": {"ENGINE": "django.db.backends.sqlite3"},
+    "persistent": {"ENGINE": "django.db.backends.sqlite3", "CONN_MAX_AGE": 600},
+    "tuned": {
+        "ENGINE": "moviements.db.backends.sqlite3",
+        "CONN_MAX_AGE": 600,
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
+    },
+}
+
+
+def get_connection(profile: str, path: Path):
+    from django.db.utils import ConnectionHandler
+
+    return ConnectionHandler({"default": PROFILES[profile] | {"NAME": str(path)}})[
+        "default"
+    ]
+
+
+def create_database(profile: str, path: Path) -> None:
+    connection = get_connection(profile, path)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TABLE user (id INTEGER PRIMARY KEY, username TEXT, is_active INTEGER)"
+        )
+        cursor.execute(
+            "CREATE TABLE session (id INTEGER PRIMARY KEY, user_id INTEGER, "
+            "user_agent TEXT, updated_at REAL)"
+        )
+        cursor.executemany(
+            "INSERT INTO user VALUES (%s, %s, 1)",
+            [(index, f"user{index}") for index in range(SESSIONS)],
+        )
+        cursor.executemany(
+            "INSERT INTO session VALUES (%s, %s, 'benchmark', 0)",
+            [(index, index) for index in range(SESSIONS)],
+        )
+    connection.close()
+
+
+def worker(profile, path, duration, write_fraction, seed, barrier, results) -> None:
+    setup_django()
+
+    from django.db import OperationalError
+
+    connection = get_connection(profile, path)
+    rng = random.Random(seed)
+    timings, errors = [], 0
+
+    # Start measuring once every process is ready
+    barrier.wait()
+    deadline = time.time() + duration
+
+    while time.time() < deadline:
+        session_id = rng.randrange(SESSIONS)
+        start = time.perf_counter_ns()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT session.id, session.updated_at, user.username, user.is_active "
+                    "FROM session JOIN user ON user.id = session.user_id "
+                    "WHERE session.id = %s",
+                    [session_id],
+                )
+                cursor.fetchone()
+                if rng.random() < write_fraction:
+                    cursor.execute(
+                        "UPDATE session SET updated_at = %s WHERE id = %s",
+                        [time.time(), session_id],
+                    )
+        except OperationalError:
+            errors += 1
+        finally:
+            connection.close_if_unusable_or_obsolete()
+        timings.append((time.perf_counter_ns() - start) / 1000)
+
+    connection.close()
+    results.put((timings, errors))
+
+
+def run(profile: str, processes: int, duration: float, write_fraction: float) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / f"{profile}.sqlite3"
+        create_database(profile, path)
+
+        context = multiprocessing.get_context("spawn")
+        barrier, queue = context.Barrier(processes), context.Queue()
+        workers = [
+            context.Process(
+                target=worker,
+                args=(profile, path, duration, write_fraction, seed, barrier, queue),
+            )
+            for seed in range(processes)
+        ]
+        for process in workers:
+            process.start()
+        results = [queue.get() for _ in workers]
+        for process in workers:
+            process.join()
+
+    timings = [timing for worker_timings, _ in results for timing in worker_timings]
+    errors = sum(worker_errors for _, worker_errors in results)
+    stats = summarize(timings)
+    # Throughput of all the processes together
+    stats["ops_per_sec"] = len(timings) / duration
+    report(f"{profile} ({processes} processes, {errors} errors)", stats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--write-fraction", type=float, default=0.1)
+    args = parser.parse_args()
+
+    setup_django()
+    for profile in PROFILES:
+        run(profile, args.processes, args.duration, args.write_fraction)
+
+
+if __name__ == "__main__":
+    main()
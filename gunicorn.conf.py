@@ -0,0 +1,36 @@
+"""
+gunicorn configuration: `gunicorn -c gunicorn.conf.py`.
+
+The application is loaded and warmed up once, in the master, and shared copy-on-write by
+the forked workers (see moviements/warmup.py). Following the gc.freeze documentation, the
+garbage collector is disabled in the master, everything allocated up to the fork is
+frozen, and collection is enabled again in the workers. The workers open their own
+database connections and span exporter thread (see monitoring/tracing.py).
+"""
+
+import gc
+import multiprocessing
+import os
+
+wsgi_app = "moviements.wsgi:application"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+
+gc.disable()
+
+
+def pre_fork(server, worker):
+    from moviements.warmup import prepare_fork
+
+    prepare_fork()
+
+
+def post_fork(server, worker):
+    gc.enable()
+
+    from monitoring.tracing import reinit_tracing_after_fork
+    from moviements.warmup import open_connections
+
+    open_connections()
+    reinit_tracing_after_fork()
@@ -0,0 +1,200 @@
+import datetime
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+
+
+def get_monitoring_config(key: str, default: Any = None) -> Any:
+    """
+    get_monitoring_config function retrieves a specific configuration value from the MONITORING dictionary in Django settings.
+
+    Parameters:
+        key (str): The key of the configuration value to retrieve.
+        default (Any, optional): A default value to return if the specified key is not found in the MONITORING dictionary. Defaults to None.
+
+    Returns:
+        Any: The value associated with the specified key in the MONITORING dictionary, or the default value if the key is not found.
+    """
+    return getattr(settings, "MONITORING", {}).get(key, default)
+
+
+def is_server_timing_enabled() -> bool:
+    """
+    is_server_timing_enabled function retrieves the value of the "SERVER_TIMING" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is False.
+
+    Returns:
+        bool: Whether the phase timings are sent in the Server-Timing response header.
+    """
+    return get_monitoring_config("SERVER_TIMING", False)
+
+
+def is_metrics_endpoint_enabled() -> bool:
+    """
+    is_metrics_endpoint_enabled function retrieves the value of the "METRICS_ENDPOINT" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is True.
+
+    Returns:
+        bool: Whether the Prometheus metrics endpoint is served.
+    """
+    return get_monitoring_config("METRICS_ENDPOINT", True)
+
+
+def is_query_profiler_enabled() -> bool:
+    """
+    is_query_profiler_enabled function retrieves the value of the "QUERY_PROFILER" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is False.
+
+    Returns:
+        bool: Whether the queries of each request are recorded and aggregated by URL name.
+    """
+    return get_monitoring_config("QUERY_PROFILER", False)
+
+
+def get_query_budgets() -> dict[str, int]:
+    """
+    get_query_budgets function retrieves the value of the "QUERY_BUDGETS" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is an empty dictionary.
+
+    Returns:
+        dict[str, int]: The maximum number of queries of a single request, by URL name.
+    """
+    return get_monitoring_config("QUERY_BUDGETS", {})
+
+
+def is_profiler_enabled() -> bool:
+    """
+    is_profiler_enabled function retrieves the value of the "PROFILER" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is False.
+
+    Returns:
+        bool: Whether requests can be profiled, on a signed X-Profile header or by sampling.
+    """
+    return get_monitoring_config("PROFILER", False)
+
+
+def get_profiler_sample_rate() -> float:
+    """
+    get_profiler_sample_rate function retrieves the value of the "PROFILER_SAMPLE_RATE" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 0 (only requests with a signed X-Profile header are profiled).
+
+    Returns:
+        float: The fraction of requests profiled without an X-Profile header, between 0 and 1.
+    """
+    return get_monitoring_config("PROFILER_SAMPLE_RATE", 0.0)
+
+
+def get_profiler_mode() -> str:
+    """
+    get_profiler_mode function retrieves the value of the "PROFILER_MODE" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is "cprofile".
+
+    Returns:
+        str: "cprofile" to write deterministic pstats files, or "sampling" to write collapsed stacks.
+    """
+    return get_monitoring_config("PROFILER_MODE", "cprofile")
+
+
+def get_profiler_interval() -> float:
+    """
+    get_profiler_interval function retrieves the value of the "PROFILER_INTERVAL" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 0.001 seconds.
+
+    Returns:
+        float: The number of seconds between two stack samples of the sampling profiler.
+    """
+    return get_monitoring_config("PROFILER_INTERVAL", 0.001)
+
+
+def get_profiler_dir() -> Path:
+    """
+    get_profiler_dir function retrieves the value of the "PROFILER_DIR" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is the "profiles" directory in BASE_DIR.
+
+    Returns:
+        Path: The directory the profiles are written to.
+    """
+    return Path(get_monitoring_config("PROFILER_DIR", settings.BASE_DIR / "profiles"))
+
+
+def get_profiler_token_max_age() -> datetime.timedelta:
+    """
+    get_profiler_token_max_age function retrieves the value of the "PROFILER_TOKEN_MAX_AGE" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 1 hour.
+
+    Returns:
+        datetime.timedelta: How long a signed X-Profile header value is accepted.
+    """
+    return get_monitoring_config("PROFILER_TOKEN_MAX_AGE", datetime.timedelta(hours=1))
+
+
+def is_tracing_enabled() -> bool:
+    """
+    is_tracing_enabled function retrieves the value of the "TRACING" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is False.
+
+    Returns:
+        bool: Whether requests are traced.
+    """
+    return get_monitoring_config("TRACING", False)
+
+
+def get_tracing_sample_rate() -> float:
+    """
+    get_tracing_sample_rate function retrieves the value of the "TRACING_SAMPLE_RATE" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 1 (every request is traced).
+    Requests with a traceparent header follow its sampled flag instead.
+
+    Returns:
+        float: The fraction of requests traced, between 0 and 1.
+    """
+    return get_monitoring_config("TRACING_SAMPLE_RATE", 1.0)
+
+
+def get_tracing_exporter() -> str:
+    """
+    get_tracing_exporter function retrieves the value of the "TRACING_EXPORTER" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is "file".
+
+    Returns:
+        str: "file" to append the spans to TRACING_FILE, or "memory" to keep them in memory (tests).
+    """
+    return get_monitoring_config("TRACING_EXPORTER", "file")
+
+
+def get_tracing_file() -> Path:
+    """
+    get_tracing_file function retrieves the value of the "TRACING_FILE" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is "traces/spans.jsonl" in BASE_DIR.
+
+    Returns:
+        Path: The JSON Lines file the spans are exported to.
+    """
+    return Path(
+        get_monitoring_config(
+            "TRACING_FILE", settings.BASE_DIR / "traces" / "spans.jsonl"
+        )
+    )
+
+
+def get_tracing_max_bytes() -> int:
+    """
+    get_tracing_max_bytes function retrieves the value of the "TRACING_MAX_BYTES" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 10 MiB.
+
+    Returns:
+        int: The size after which the spans file is rotated.
+    """
+    return get_monitoring_config("TRACING_MAX_BYTES", 10 * 1024 * 1024)
+
+
+def get_tracing_backup_count() -> int:
+    """
+    get_tracing_backup_count function retrieves the value of the "TRACING_BACKUP_COUNT" configuration from the MONITORING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 5.
+
+    Returns:
+        int: The number of rotated spans files kept.
+    """
+    return get_monitoring_config("TRACING_BACKUP_COUNT", 5)
@@ -0,0 +1,135 @@
+"""
+Startup cost of the project, from the `python -X importtime` log.
+
+measure_startup starts fresh interpreters that set up Django and load the URL
+configuration (what every worker and management command pays before doing any work), in
+the full or the API-only mode (see settings.API_ONLY). It reports the wall-clock cold
+start and breaks the import time down by module and by top-level package.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+STARTUP_SCRIPT = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+MODES = ("full", "api")
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class StartupReport:
+    mode: str
+    cold_start_ms: list[float]
+    imports: list[ImportRecord] = field(default_factory=list)
+
+    @property
+    def import_ms(self) -> float:
+        return sum(record.self_us for record in self.imports) / 1000
+
+    def by_package(self) -> dict[str, int]:
+        """
+        Returns the self import time of the top-level packages in microseconds, largest first.
+        """
+        packages: dict[str, int] = {}
+        for record in self.imports:
+            package = record.module.split(".", 1)[0]
+            packages[package] = packages.get(package, 0) + record.self_us
+        return dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+    def to_dict(self, top: Optional[int] = None) -> dict:
+        return {
+            "mode": self.mode,
+            "cold_start_ms": {
+                "min": min(self.cold_start_ms),
+                "median": statistics.median(self.cold_start_ms),
+            },
+            "import_ms": self.import_ms,
+            "modules": len(self.imports),
+            "packages": {
+                package: us / 1000
+                for package, us in list(self.by_package().items())[:top]
+            },
+        }
+
+
+def parse_importtime(log: str) -> list[ImportRecord]:
+    """
+    Parses the stderr output of `python -X importtime`.
+    """
+    records = []
+    for line in log.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        if not self_us.strip().isdigit():
+            # The header line
+            continue
+        module = name.strip()
+        records.append(
+            ImportRecord(
+                module=module,
+                self_us=int(self_us),
+                cumulative_us=int(cumulative_us),
+                depth=(len(name) - len(name.lstrip()) - 1) // 2,
+            )
+        )
+    return records
+
+
+def run_startup(mode: str, importtime: bool = False) -> tuple[float, str]:
+    """
+    Starts an interpreter running STARTUP_SCRIPT in the given mode.
+
+    Returns:
+        tuple[float, str]: The wall-clock time in milliseconds and the stderr output.
+    """
+    env = os.environ | {
+        "DJANGO_SETTINGS_MODULE": os.environ.get(
+            "DJANGO_SETTINGS_MODULE", "moviements.settings"
+        ),
+        "MOVIEMENTS_API_ONLY": "1" if mode == "api" else "0",
+    }
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", STARTUP_SCRIPT]
+
+    start = time.perf_counter()
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"The {mode} startup failed:\n{result.stderr}")
+    return elapsed, result.stderr
+
+
+def measure_startup(mode: str, repeat: int = 5) -> StartupReport:
+    """
+    Measures the cold start of the given mode repeat times, then its imports once.
+
+    Parameters:
+        mode (str): "full" or "api".
+        repeat (int, optional): The number of timed startups. Defaults to 5.
+
+    Returns:
+        StartupReport: The cold start timings and the import records.
+    """
+    # The first run compiles the bytecode of the modules only imported in this mode
+    run_startup(mode)
+    cold_start_ms = [run_startup(mode)[0] for _ in range(repeat)]
+    _, log = run_startup(mode, importtime=True)
+    return StartupReport(mode, cold_start_ms, parse_importtime(log))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from moviements.schema import SCHEMA_FORMATS, write_schema
+
+
+class Command(BaseCommand):
+    help = "Generates the OpenAPI schema artifacts served by /swagger.json and /swagger.yaml"
+
+    def handle(self, *args, **options):
+        for format in SCHEMA_FORMATS:
+            path = write_schema(format)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
@@ -0,0 +1,92 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from monitoring.importtime import MODES, measure_startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the cold start of the full and API-only modes and breaks their "
+        "import time down by package and module (python -X importtime)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            choices=(*MODES, "both"),
+            default="both",
+            help="Startup mode to measure (see settings.API_ONLY)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of timed cold starts per mode",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=15,
+            help="Number of packages and modules listed",
+        )
+        parser.add_argument(
+            "--sort",
+            choices=("self", "cumulative"),
+            default="cumulative",
+            help="Order of the modules",
+        )
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Print the summaries as JSON",
+        )
+
+    def handle(self, *args, **options):
+        modes = MODES if options["mode"] == "both" else (options["mode"],)
+        reports = [measure_startup(mode, options["repeat"]) for mode in modes]
+        top = options["top"]
+
+        if options["json"]:
+            self.stdout.write(
+                json.dumps([report.to_dict(top) for report in reports], indent=2)
+            )
+            return
+
+        for report in reports:
+            summary = report.to_dict(top)
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"{report.mode}: cold start {summary['cold_start_ms']['median']:.0f} ms "
+                    f"(min {summary['cold_start_ms']['min']:.0f} ms), "
+                    f"{summary['import_ms']:.0f} ms importing {summary['modules']} modules"
+                )
+            )
+
+            self.stdout.write("  Packages (self time)")
+            for package, ms in summary["packages"].items():
+                self.stdout.write(f"  {ms:>10.1f} ms  {package}")
+
+            self.stdout.write(f"  Modules ({options['sort']} time)")
+            modules = sorted(
+                report.imports,
+                key=lambda record: getattr(record, f"{options['sort']}_us"),
+                reverse=True,
+            )
+            for record in modules[:top]:
+                self.stdout.write(
+                    f"  {record.self_us / 1000:>10.1f} ms self"
+                    f"  {record.cumulative_us / 1000:>10.1f} ms cumulative"
+                    f"  {record.module}"
+                )
+
+        if len(reports) == 2:
+            full, api = (
+                report.to_dict()["cold_start_ms"]["median"] for report in reports
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"API-only cold start: {api:.0f} ms vs {full:.0f} ms "
+                    f"({(full - api) / full:.0%} faster)"
+                )
+            )
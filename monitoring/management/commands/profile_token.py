@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from monitoring.config import get_profiler_token_max_age
+from monitoring.profiling import make_profile_token
+
+
+class Command(BaseCommand):
+    help = "Prints a signed X-Profile header value to profile requests on demand"
+
+    def handle(self, *args, **options):
+        self.stderr.write(f"Valid for {get_profiler_token_max_age()}")
+        self.stdout.write(make_profile_token())
@@ -0,0 +1,199 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Values live in the memory of each worker process: scrape every worker, or run a
+single process per container.
+"""
+
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from typing import Generic, TypeVar
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+V = TypeVar("V")
+
+
+class Metric(ABC, Generic[V]):
+    type = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        registry: "Registry | None" = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], V] = {}
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: tuple[str, ...], **extra) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra.items())
+        if not pairs:
+            return ""
+        escaped = (
+            (
+                name,
+                str(value)
+                .replace("\\", r"\\")
+                .replace('"', r"\"")
+                .replace("\n", r"\n"),
+            )
+            for name, value in pairs
+        )
+        return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        """
+        Returns the sample lines of the metric in the Prometheus text format.
+        """
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric[float]):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}_total{self._format_labels(key)} {value}"
+            for key, value in values
+        ]
+
+
+class Histogram(Metric[list]):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        registry: "Registry | None" = None,
+    ):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (not cumulative), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def get_count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(
+                (key, (list(state[0]), state[1], state[2]))
+                for key, state in self._values.items()
+            )
+
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{self._format_labels(key, le=bound)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """
+        Renders all registered metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests by URL name",
+    ("endpoint", "method"),
+)
+AUTH_PHASE_DURATION = Histogram(
+    "auth_phase_duration_seconds",
+    "Duration of the authentication pipeline phases",
+    ("phase",),
+)
+SIGN_IN_TOTAL = Counter("auth_sign_in", "Sign-in attempts by outcome", ("outcome",))
+REFRESH_TOTAL = Counter("auth_refresh", "Token refreshes by outcome", ("outcome",))
+FINGERPRINT_MISMATCH_TOTAL = Counter(
+    "auth_fingerprint_mismatch",
+    "Sessions deleted because of a user agent or IP address mismatch",
+)
+DB_QUERIES_TOTAL = Counter("db_queries", "Database queries by URL name", ("endpoint",))
+DB_QUERY_SECONDS_TOTAL = Counter(
+    "db_query_seconds", "Time spent in database queries by URL name", ("endpoint",)
+)
+DB_QUERY_BUDGET_EXCEEDED_TOTAL = Counter(
+    "db_query_budget_exceeded",
+    "Requests that ran more queries than the budget of their URL name",
+    ("endpoint",),
+)
@@ -0,0 +1,104 @@
+import logging
+from time import perf_counter
+
+from django.core.exceptions import MiddlewareNotUsed
+
+from .config import (
+    get_query_budgets,
+    is_query_profiler_enabled,
+    is_server_timing_enabled,
+)
+from .metrics import (
+    DB_QUERIES_TOTAL,
+    DB_QUERY_BUDGET_EXCEEDED_TOTAL,
+    DB_QUERY_SECONDS_TOTAL,
+    HTTP_REQUEST_DURATION,
+)
+from .queries import QUERY_PROFILE, record_queries
+from .timing import start_collecting, stop_collecting
+
+logger = logging.getLogger(__name__)
+
+
+def get_endpoint(request) -> str:
+    match = request.resolver_match
+    return match.view_name if match else "<unresolved>"
+
+
+class ServerTimingMiddleware:
+    """
+    Collects the phase timings of each request, records the request duration by URL name
+    and, if MONITORING["SERVER_TIMING"] is enabled, exposes them in the Server-Timing header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = is_server_timing_enabled()
+
+    def __call__(self, request):
+        token = start_collecting()
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = perf_counter() - start
+            timings = stop_collecting(token)
+
+        HTTP_REQUEST_DURATION.observe(
+            duration, endpoint=get_endpoint(request), method=request.method
+        )
+
+        if self.server_timing:
+            response["Server-Timing"] = format_server_timing(timings, duration)
+        return response
+
+
+class QueryProfilerMiddleware:
+    """
+    Records the queries of each request and aggregates their count, time and shapes by URL name.
+    Requests running more queries than the MONITORING["QUERY_BUDGETS"] budget of their URL name are logged.
+
+    Enabled by MONITORING["QUERY_PROFILER"].
+    """
+
+    def __init__(self, get_response):
+        if not is_query_profiler_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.budgets = get_query_budgets()
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        endpoint = get_endpoint(request)
+        QUERY_PROFILE.add(endpoint, recorder)
+        DB_QUERIES_TOTAL.inc(recorder.count, endpoint=endpoint)
+        DB_QUERY_SECONDS_TOTAL.inc(recorder.duration, endpoint=endpoint)
+
+        budget = self.budgets.get(endpoint)
+        if budget is not None and recorder.count > budget:
+            DB_QUERY_BUDGET_EXCEEDED_TOTAL.inc(endpoint=endpoint)
+            logger.warning(
+                "%s %s ran %d queries (budget %d):\n%s",
+                request.method,
+                request.path,
+                recorder.count,
+                budget,
+                recorder.format_shapes(),
+            )
+        return response
+
+
+def format_server_timing(timings: list[tuple[str, float]], total: float) -> str:
+    """
+    Formats the phase timings as a Server-Timing header value. Repeated phases are summed.
+    """
+    durations: dict[str, float] = {}
+    for name, duration in timings:
+        durations[name] = durations.get(name, 0) + duration
+    durations["total"] = total
+
+    return ", ".join(
+        f"{name};dur={duration * 1000:.3f}" for name, duration in durations.items()
+    )
@@ -0,0 +1,195 @@
+"""
+On-demand request profiling.
+
+A request is profiled when it carries a valid signed X-Profile header (see the
+profile_token management command) or when it is picked by MONITORING["PROFILER_SAMPLE_RATE"].
+Each profile is written to MONITORING["PROFILER_DIR"] as a pstats file (cProfile mode) or
+collapsed stacks (sampling mode, for flamegraph.pl or speedscope), next to a JSON file
+with the URL name, the response status and the authentication phase timings.
+"""
+
+import cProfile
+import collections
+import json
+import logging
+import random
+import sys
+import threading
+import uuid
+from pathlib import Path
+from time import perf_counter
+
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+from .config import (
+    get_profiler_dir,
+    get_profiler_interval,
+    get_profiler_mode,
+    get_profiler_sample_rate,
+    get_profiler_token_max_age,
+    is_profiler_enabled,
+)
+from .timing import get_timings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_TOKEN_SALT = "monitoring.profiling"
+
+
+def make_profile_token() -> str:
+    """
+    Returns a signed X-Profile header value, valid for MONITORING["PROFILER_TOKEN_MAX_AGE"].
+    """
+    return signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).sign(uuid.uuid4().hex)
+
+
+def is_valid_profile_token(value: str) -> bool:
+    try:
+        signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).unsign(
+            value, max_age=get_profiler_token_max_age()
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of the profiled thread from a background thread every `interval` seconds.
+    Unlike cProfile, the profiled code runs at full speed and its cost does not grow with
+    the number of function calls.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: collections.Counter[str] = collections.Counter()
+        self._stopped = threading.Event()
+
+    def enable(self) -> None:
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(
+            target=self._sample, name="monitoring-sampler", daemon=True
+        )
+        self._sampler.start()
+
+    def disable(self) -> None:
+        self._stopped.set()
+        self._sampler.join()
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def dump_stats(self, path: Path) -> None:
+        path.write_text(
+            "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+        )
+
+
+def collapse_stack(frame) -> str:
+    """
+    Formats a stack in the collapsed format: frames from the outermost, separated by ";".
+    """
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests with a signed X-Profile header or picked by the sample rate.
+
+    Enabled by MONITORING["PROFILER"]. It must come after ServerTimingMiddleware, which collects
+    the phase timings stored with each profile.
+    """
+
+    def __init__(self, get_response):
+        if not is_profiler_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = get_profiler_sample_rate()
+        self.mode = get_profiler_mode()
+        self.interval = get_profiler_interval()
+        self.directory = get_profiler_dir()
+
+    def get_trigger(self, request) -> str | None:
+        token = request.META.get(PROFILE_HEADER)
+        if token is not None and is_valid_profile_token(token):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def __call__(self, request):
+        trigger = self.get_trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        if self.mode == "sampling":
+            profiler = SamplingProfiler(self.interval)
+        else:
+            profiler = cProfile.Profile()
+
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this process
+            return self.get_response(request)
+
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = perf_counter() - start
+
+        try:
+            self.write_profile(profiler, request, response, duration, trigger)
+        except OSError:
+            logger.exception("Could not write the profile of %s", request.path)
+        return response
+
+    def write_profile(self, profiler, request, response, duration, trigger) -> Path:
+        match = request.resolver_match
+        url_name = match.view_name if match else "unresolved"
+
+        phases: dict[str, float] = {}
+        for name, phase_duration in get_timings():
+            phases[name] = phases.get(name, 0) + phase_duration
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = "{}-{}-{}".format(
+            timezone.now().strftime("%Y%m%dT%H%M%S"),
+            url_name.replace(":", "."),
+            uuid.uuid4().hex[:8],
+        )
+        extension = (
+            ".collapsed" if isinstance(profiler, SamplingProfiler) else ".pstats"
+        )
+        path = self.directory / (name + extension)
+
+        profiler.dump_stats(path)
+        (self.directory / (name + ".json")).write_text(
+            json.dumps(
+                {
+                    "url_name": url_name,
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "duration": duration,
+                    "phases": phases,
+                    "trigger": trigger,
+                    "profile": path.name,
+                },
+                indent=2,
+            )
+        )
+        return path
@@ -0,0 +1,183 @@
+"""
+Query recording, fingerprinting and per-endpoint aggregation.
+
+A query fingerprint is its SQL with literals and placeholders replaced by "?" and
+variable-length lists (IN lists, multi-row VALUES) collapsed, so that all executions
+of the same ORM query share one shape whatever their parameters.
+"""
+
+import re
+import threading
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from django.db import connections
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?(?![\w\"])")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """
+    Returns the shape of a query: literals stripped and lists collapsed.
+
+    Parameters:
+        sql (str): The SQL of the query, with or without parameters interpolated.
+
+    Returns:
+        str: The query fingerprint.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _LIST.sub("(...)", sql)
+    sql = _ROWS.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+@dataclass
+class RecordedQuery:
+    sql: str
+    duration: float
+    alias: str
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper (see connection.execute_wrapper) recording the executed queries.
+    """
+
+    def __init__(self):
+        self.queries: list[RecordedQuery] = []
+
+    def wrapper(self, alias: str):
+        def execute(execute, sql, params, many, context):
+            start = perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append(RecordedQuery(sql, perf_counter() - start, alias))
+
+        return execute
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def duration(self) -> float:
+        return sum(query.duration for query in self.queries)
+
+    def shapes(self) -> dict[str, tuple[int, float]]:
+        """
+        Groups the recorded queries by fingerprint.
+
+        Returns:
+            dict[str, tuple[int, float]]: Count and total duration of each shape, most frequent first.
+        """
+        shapes: dict[str, list] = {}
+        for query in self.queries:
+            shape = shapes.setdefault(fingerprint(query.sql), [0, 0.0])
+            shape[0] += 1
+            shape[1] += query.duration
+        return {
+            sql: (count, duration)
+            for sql, (count, duration) in sorted(
+                shapes.items(), key=lambda item: item[1][0], reverse=True
+            )
+        }
+
+    def format_shapes(self) -> str:
+        """
+        Formats the recorded query shapes, one per line, for failure and log messages.
+        """
+        return "\n".join(
+            f"{count:4d}x {duration * 1000:8.3f}ms  {sql}"
+            for sql, (count, duration) in self.shapes().items()
+        )
+
+
+@contextmanager
+def record_queries():
+    """
+    Records the queries executed on every database connection of the current thread.
+
+        with record_queries() as recorder:
+            ...
+        recorder.count
+    """
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(recorder.wrapper(connection.alias))
+            )
+        yield recorder
+
+
+@dataclass
+class EndpointProfile:
+    requests: int = 0
+    queries: int = 0
+    duration: float = 0.0
+    shapes: dict[str, list] = field(default_factory=dict)
+
+
+class QueryProfile:
+    """
+    Aggregates query counts, time and shapes per endpoint across requests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, EndpointProfile] = {}
+
+    def add(self, endpoint: str, recorder: QueryRecorder) -> None:
+        shapes = recorder.shapes()
+        with self._lock:
+            profile = self._endpoints.setdefault(endpoint, EndpointProfile())
+            profile.requests += 1
+            profile.queries += recorder.count
+            profile.duration += recorder.duration
+            for sql, (count, duration) in shapes.items():
+                shape = profile.shapes.setdefault(sql, [0, 0.0])
+                shape[0] += count
+                shape[1] += duration
+
+    def report(self) -> dict:
+        """
+        Returns the aggregated profile, most query-heavy endpoints first.
+        """
+        with self._lock:
+            endpoints = sorted(
+                self._endpoints.items(), key=lambda item: item[1].queries, reverse=True
+            )
+            return {
+                endpoint: {
+                    "requests": profile.requests,
+                    "queries": profile.queries,
+                    "queries_per_request": profile.queries / profile.requests,
+                    "duration": profile.duration,
+                    "shapes": [
+                        {"sql": sql, "count": count, "duration": duration}
+                        for sql, (count, duration) in sorted(
+                            profile.shapes.items(),
+                            key=lambda item: item[1][0],
+                            reverse=True,
+                        )
+                    ],
+                }
+                for endpoint, profile in endpoints
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+
+
+QUERY_PROFILE = QueryProfile()
@@ -0,0 +1,71 @@
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Optional
+from unittest import mock
+
+from .config import get_query_budgets
+from .queries import record_queries
+
+
+if TYPE_CHECKING:
+    from django.test import SimpleTestCase
+
+    _Base = SimpleTestCase
+else:
+    _Base = object
+
+
+class QueryBudgetTestMixin(_Base):
+    """
+    TestCase mixin checking that requests stay within the query budget of their URL name.
+
+        class ViewsTestCase(QueryBudgetTestMixin, TestCase):
+            query_budgets = {"me": 2}
+
+            def test_me(self):
+                with self.assertQueryBudget("me"):
+                    self.client.get("/auth/me/")
+
+    Budgets default to MONITORING["QUERY_BUDGETS"]. Every request of the block must be
+    made with self.client and resolve to the URL name.
+    """
+
+    query_budgets: Optional[dict[str, int]] = None
+
+    def get_query_budget(self, url_name: str) -> int:
+        budgets = self.query_budgets
+        if budgets is None:
+            budgets = get_query_budgets()
+
+        if url_name not in budgets:
+            self.fail(f"No query budget declared for {url_name!r}")
+        return budgets[url_name]
+
+    @contextmanager
+    def assertQueryBudget(self, url_name: str):
+        budget = self.get_query_budget(url_name)
+        responses = []
+        request = self.client.request
+
+        def record_response(**kwargs):
+            response = request(**kwargs)
+            responses.append(response)
+            return response
+
+        with mock.patch.object(self.client, "request", record_response):
+            with record_queries() as recorder:
+                yield recorder
+
+        if not responses:
+            self.fail(f"No request to {url_name!r}")
+        for response in responses:
+            if response.resolver_match.url_name != url_name:
+                self.fail(
+                    f"A request resolved to {response.resolver_match.url_name!r}, "
+                    f"not {url_name!r}"
+                )
+
+        if recorder.count > budget:
+            self.fail(
+                f"{url_name!r} ran {recorder.count} queries, over its budget of {budget}:\n"
+                f"{recorder.format_shapes()}"
+            )
@@ -0,0 +1,521 @@
+import io
+import json
+import os
+import pstats
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from user_auth.models import CustomUser, Session
+
+from .importtime import StartupReport, parse_importtime
+from .metrics import (
+    Counter,
+    Histogram,
+    Registry,
+    DB_QUERY_BUDGET_EXCEEDED_TOTAL,
+    SIGN_IN_TOTAL,
+    FINGERPRINT_MISMATCH_TOTAL,
+)
+from .middleware import format_server_timing
+from .profiling import make_profile_token
+from .queries import QUERY_PROFILE, fingerprint
+from .tracing import (
+    BatchSpanProcessor,
+    InMemorySpanExporter,
+    JSONLinesFileSpanExporter,
+    Span,
+    get_span_processor,
+    parse_traceparent,
+)
+
+USER_AGENT = "Mozilla/5.0"
+
+
+class MetricsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter(self):
+        counter = Counter("test_events", "Test events", ("outcome",), self.registry)
+        counter.inc(outcome="success")
+        counter.inc(2, outcome="success")
+        counter.inc(outcome='fail"ure')
+
+        self.assertEqual(counter.get(outcome="success"), 3)
+        self.assertEqual(
+            self.registry.render(),
+            "# HELP test_events Test events\n"
+            "# TYPE test_events counter\n"
+            'test_events_total{outcome="fail\\"ure"} 1\n'
+            'test_events_total{outcome="success"} 3\n',
+        )
+
+    def test_histogram(self):
+        histogram = Histogram(
+            "test_duration_seconds",
+            "Test durations",
+            buckets=(0.1, 1.0),
+            registry=self.registry,
+        )
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        self.assertEqual(
+            self.registry.render().splitlines()[2:],
+            [
+                'test_duration_seconds_bucket{le="0.1"} 2',
+                'test_duration_seconds_bucket{le="1.0"} 3',
+                'test_duration_seconds_bucket{le="+Inf"} 4',
+                "test_duration_seconds_sum 2.65",
+                "test_duration_seconds_count 4",
+            ],
+        )
+
+    def test_format_server_timing(self):
+        self.assertEqual(
+            format_server_timing(
+                [("jwt_decode", 0.0001), ("db", 0.001), ("db", 0.002)], 0.005
+            ),
+            "jwt_decode;dur=0.100, db;dur=3.000, total;dur=5.000",
+        )
+
+
+class AuthInstrumentationTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username="testuser", email="testuser@moviements.ru", is_active=True
+        )
+        self.user.set_password("testpassword")
+        self.user.save()
+
+    def sign_in(self, password="testpassword"):
+        return self.client.post(
+            "/auth/signin/",
+            {"username": "testuser", "password": password},
+            content_type="application/json",
+            headers={"User-Agent": USER_AGENT},
+        )
+
+    def test_sign_in_outcomes(self):
+        success = SIGN_IN_TOTAL.get(outcome="success")
+        invalid_password = SIGN_IN_TOTAL.get(outcome="invalid_password")
+
+        self.assertEqual(self.sign_in().status_code, 200)
+        self.assertEqual(self.sign_in("wrong").status_code, 403)
+
+        self.assertEqual(SIGN_IN_TOTAL.get(outcome="success"), success + 1)
+        self.assertEqual(
+            SIGN_IN_TOTAL.get(outcome="invalid_password"), invalid_password + 1
+        )
+
+    @override_settings(MONITORING={"SERVER_TIMING": True})
+    def test_server_timing(self):
+        access_token = self.sign_in().json()["access_token"]
+
+        response = self.client.get(
+            "/auth/me/",
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "User-Agent": USER_AGENT,
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        phases = [
+            entry.split(";")[0] for entry in response["Server-Timing"].split(", ")
+        ]
+        self.assertEqual(
+            phases,
+            [
+                "jwt_decode",
+                "revocation_check",
+                "session_lookup",
+                "session_touch",
+                "serialize",
+                "total",
+            ],
+        )
+
+    def test_server_timing_is_opt_in(self):
+        response = self.sign_in()
+        self.assertNotIn("Server-Timing", response)
+
+    def test_metrics_endpoint(self):
+        session = Session.create_for_user(self.user, USER_AGENT, "127.0.0.1")
+        access_token, _ = session.create_token_pair()
+        mismatches = FINGERPRINT_MISMATCH_TOTAL.get()
+
+        self.client.get(
+            "/auth/me/",
+            headers={"Authorization": f"Bearer {access_token}", "User-Agent": "Other"},
+        )
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        with override_settings(INTERNAL_API_KEYS=["internal-key"]):
+            response = self.client.get(
+                "/metrics/", headers={"X-API-Key": "internal-key"}
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response["Content-Type"].startswith("text/plain; version=0.0.4")
+        )
+        content = response.content.decode()
+        self.assertIn(f"auth_fingerprint_mismatch_total {mismatches + 1}", content)
+        self.assertIn('auth_phase_duration_seconds_count{phase="jwt_decode"}', content)
+        self.assertIn(
+            'http_request_duration_seconds_count{endpoint="me",method="GET"}', content
+        )
+
+
+class QueryProfilerTestCase(TestCase):
+    def setUp(self):
+        QUERY_PROFILE.clear()
+        CustomUser.objects.create_user(
+            username="testuser",
+            email="testuser@moviements.ru",
+            password="testpassword",
+            is_active=True,
+        )
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint(
+                'SELECT "id" FROM "t" WHERE ("name" = \'O\'\'Brien\' AND "id" IN (%s, %s, %s))  LIMIT 21'
+            ),
+            'SELECT "id" FROM "t" WHERE ("name" = ? AND "id" IN (...)) LIMIT ?',
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO "t" ("a", "b") VALUES (...)',
+        )
+
+    @override_settings(
+        MONITORING={"QUERY_PROFILER": True, "QUERY_BUDGETS": {"sign_in": 1}}
+    )
+    def test_query_profile(self):
+        exceeded = DB_QUERY_BUDGET_EXCEEDED_TOTAL.get(endpoint="sign_in")
+
+        with self.assertLogs("monitoring.middleware", "WARNING"):
+            self.client.post(
+                "/auth/signin/",
+                {"username": "unknown", "password": "testpassword"},
+                content_type="application/json",
+            )
+            self.client.post(
+                "/auth/signin/",
+                {"username": "testuser", "password": "testpassword"},
+                content_type="application/json",
+                headers={"User-Agent": USER_AGENT},
+            )
+        self.assertEqual(self.client.get("/metrics/queries/").status_code, 403)
+        with override_settings(INTERNAL_API_KEYS=["internal-key"]):
+            report = self.client.get(
+                "/metrics/queries/", headers={"X-API-Key": "internal-key"}
+            ).json()
+
+        self.assertEqual(report["sign_in"]["requests"], 2)
+        self.assertEqual(report["sign_in"]["queries"], 4)
+        # Both user lookups share the same shape, whatever the username
+        self.assertEqual(report["sign_in"]["shapes"][0]["count"], 2)
+        self.assertEqual(
+            DB_QUERY_BUDGET_EXCEEDED_TOTAL.get(endpoint="sign_in"), exceeded + 1
+        )
+
+    @override_settings(MONITORING={"QUERY_PROFILER": False})
+    def test_query_profile_disabled(self):
+        self.assertEqual(self.client.get("/metrics/queries/").status_code, 404)
+
+
+class ProfilingTestCase(TestCase):
+    def setUp(self):
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        user = CustomUser.objects.create_user(
+            username="testuser", email="testuser@moviements.ru", is_active=True
+        )
+        session = Session.create_for_user(user, USER_AGENT, "127.0.0.1")
+        self.access_token, _ = session.create_token_pair()
+
+    def get_me(self, **headers):
+        return self.client.get(
+            "/auth/me/",
+            headers={
+                "Authorization": f"Bearer {self.access_token}",
+                "User-Agent": USER_AGENT,
+                **headers,
+            },
+        )
+
+    def profiler_settings(self, **config):
+        return override_settings(
+            MONITORING={"PROFILER": True, "PROFILER_DIR": self.directory, **config}
+        )
+
+    def test_signed_header(self):
+        with self.profiler_settings():
+            self.assertEqual(self.get_me().status_code, 200)
+            self.assertEqual(list(self.directory.iterdir()), [])
+
+            self.assertEqual(self.get_me(X_Profile="forged").status_code, 200)
+            self.assertEqual(list(self.directory.iterdir()), [])
+
+            self.assertEqual(
+                self.get_me(X_Profile=make_profile_token()).status_code, 200
+            )
+
+        (metadata_path,) = self.directory.glob("*.json")
+        metadata = json.loads(metadata_path.read_text())
+        self.assertEqual(metadata["url_name"], "me")
+        self.assertEqual(metadata["trigger"], "header")
+        self.assertIn("jwt_decode", metadata["phases"])
+        self.assertIn("session_lookup", metadata["phases"])
+        pstats.Stats(str(self.directory / metadata["profile"]))
+
+    def test_sampling(self):
+        with self.profiler_settings(
+            PROFILER_SAMPLE_RATE=1.0, PROFILER_MODE="sampling", PROFILER_INTERVAL=0.0001
+        ):
+            self.assertEqual(self.get_me().status_code, 200)
+
+        (metadata_path,) = self.directory.glob("*.json")
+        metadata = json.loads(metadata_path.read_text())
+        self.assertEqual(metadata["trigger"], "sample")
+        self.assertTrue(metadata["profile"].endswith(".collapsed"))
+        for line in (self.directory / metadata["profile"]).read_text().splitlines():
+            stack, count = line.rsplit(" ", 1)
+            self.assertGreater(int(count), 0)
+
+
+class TracingTestCase(TestCase):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    parent_id = "00f067aa0ba902b7"
+
+    def setUp(self):
+        CustomUser.objects.create_user(
+            username="testuser",
+            email="testuser@moviements.ru",
+            password="testpassword",
+            is_active=True,
+        )
+
+    def test_parse_traceparent(self):
+        self.assertEqual(
+            parse_traceparent(f"00-{self.trace_id}-{self.parent_id}-01"),
+            (self.trace_id, self.parent_id, True),
+        )
+        self.assertEqual(
+            parse_traceparent(f"00-{self.trace_id}-{self.parent_id}-00")[2], False
+        )
+        self.assertIsNone(parse_traceparent(f"00-{'0' * 32}-{self.parent_id}-01"))
+        self.assertIsNone(parse_traceparent("garbage"))
+
+    @override_settings(MONITORING={"TRACING": True, "TRACING_EXPORTER": "memory"})
+    def test_sign_in_trace(self):
+        response = self.client.post(
+            "/auth/signin/",
+            {"username": "testuser", "password": "testpassword"},
+            content_type="application/json",
+            headers={
+                "User-Agent": USER_AGENT,
+                "traceparent": f"00-{self.trace_id}-{self.parent_id}-01",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+
+        processor = get_span_processor()
+        processor.force_flush()
+        spans = processor.exporter.spans
+
+        root = spans[-1]
+        self.assertEqual(root.parent_id, self.parent_id)
+        self.assertEqual(root.attributes["http.route"], "sign_in")
+        self.assertEqual(root.attributes["http.status_code"], 200)
+        self.assertEqual(
+            response["traceresponse"], f"00-{self.trace_id}-{root.span_id}-01"
+        )
+        self.assertEqual({span.trace_id for span in spans}, {self.trace_id})
+
+        phases = [span.name for span in spans if span.parent_id == root.span_id]
+        self.assertEqual(
+            [name for name in phases if name != "db.query"],
+            ["user_lookup", "password_check", "session_create", "token_generate"],
+        )
+        # The user lookup query is a child of its phase
+        user_lookup = next(span for span in spans if span.name == "user_lookup")
+        self.assertTrue(
+            any(
+                span.name == "db.query" and span.parent_id == user_lookup.span_id
+                for span in spans
+            )
+        )
+
+    @override_settings(MONITORING={"TRACING": True, "TRACING_EXPORTER": "memory"})
+    def test_unsampled_traceparent(self):
+        self.client.get(
+            "/metrics/",
+            headers={"traceparent": f"00-{self.trace_id}-{self.parent_id}-00"},
+        )
+        processor = get_span_processor()
+        processor.force_flush()
+        self.assertEqual(processor.exporter.spans, [])
+
+
+def run_forked(function) -> str:
+    """
+    Runs the function in a forked process and returns what it returned.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            result = str(function())
+        except BaseException as e:
+            result = repr(e)
+        finally:
+            os.write(write_fd, result.encode())
+            os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as file:
+        result = file.read()
+    os.waitpid(pid, 0)
+    return result
+
+
+def make_span(name: str) -> Span:
+    return Span(
+        name=name,
+        trace_id="0" * 32,
+        span_id="1" * 16,
+        parent_id=None,
+        start_time=0,
+        end_time=1,
+    )
+
+
+class BatchSpanProcessorTestCase(SimpleTestCase):
+    def setUp(self):
+        self.processor = BatchSpanProcessor(InMemorySpanExporter(), schedule_delay=0.01)
+        self.addCleanup(self.processor.shutdown)
+
+    def wait_for_export(self) -> list[str]:
+        # Exported by the background thread, without force_flush
+        deadline = time.monotonic() + 5
+        while not self.processor.exporter.spans and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return [span.name for span in self.processor.exporter.spans]
+
+    def test_thread_is_started_lazily(self):
+        self.assertIsNone(self.processor._worker)
+
+        self.processor.on_end(make_span("span"))
+        self.assertEqual(self.wait_for_export(), ["span"])
+
+    def test_forked_process(self):
+        self.processor.on_end(make_span("parent"))
+        self.assertEqual(self.wait_for_export(), ["parent"])
+
+        def child():
+            self.processor.exporter.clear()
+            self.processor.on_end(make_span("child"))
+            return self.wait_for_export()
+
+        self.assertEqual(run_forked(child), "['child']")
+
+    def test_reinit_after_fork(self):
+        self.processor.on_end(make_span("parent"))
+        self.wait_for_export()
+        # Held by a thread of the parent when it forked
+        self.processor._export_lock.acquire()
+
+        def child():
+            self.processor.reinit_after_fork()
+            self.processor.exporter.clear()
+            self.processor.on_end(make_span("child"))
+            return self.wait_for_export()
+
+        self.assertEqual(run_forked(child), "['child']")
+        self.processor._export_lock.release()
+
+    def test_shutdown_without_thread(self):
+        self.processor.shutdown()
+        self.assertIsNone(self.processor._worker)
+
+
+class JSONLinesFileSpanExporterTestCase(SimpleTestCase):
+    def test_rotation(self):
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        exporter = JSONLinesFileSpanExporter(directory / "spans.jsonl", 300, 2)
+        spans = [
+            Span(
+                name=f"span{i}",
+                trace_id="0" * 32,
+                span_id="1" * 16,
+                parent_id=None,
+                start_time=0,
+                end_time=1,
+            )
+            for i in range(4)
+        ]
+
+        for span in spans:
+            exporter.export([span])
+
+        self.assertEqual(
+            sorted(path.name for path in directory.iterdir()),
+            ["spans.jsonl", "spans.jsonl.1", "spans.jsonl.2"],
+        )
+        self.assertEqual(
+            json.loads((directory / "spans.jsonl").read_text())["name"], "span3"
+        )
+
+
+IMPORTTIME_LOG = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     django.utils.version
+import time:       300 |        420 |   django.utils
+import time:       200 |        620 | django
+import time:      1000 |       1000 |   yaml.reader
+import time:        50 |       1050 | yaml
+"""
+
+
+class ImportTimeTestCase(SimpleTestCase):
+    def test_parse(self):
+        records = parse_importtime("Some warning\n" + IMPORTTIME_LOG)
+
+        self.assertEqual(
+            [
+                (record.module, record.self_us, record.cumulative_us, record.depth)
+                for record in records
+            ],
+            [
+                ("django.utils.version", 120, 120, 2),
+                ("django.utils", 300, 420, 1),
+                ("django", 200, 620, 0),
+                ("yaml.reader", 1000, 1000, 1),
+                ("yaml", 50, 1050, 0),
+            ],
+        )
+
+        report = StartupReport("full", [10.0, 30.0, 20.0], records)
+        self.assertEqual(report.by_package(), {"yaml": 1050, "django": 620})
+        self.assertEqual(
+            report.to_dict()["cold_start_ms"], {"min": 10.0, "median": 20.0}
+        )
+        self.assertEqual(report.import_ms, 1.67)
+
+    def test_command(self):
+        stdout = io.StringIO()
+        call_command(
+            "importtime_report", mode="api", repeat=1, json=True, stdout=stdout
+        )
+
+        (summary,) = json.loads(stdout.getvalue())
+        self.assertEqual(summary["mode"], "api")
+        self.assertIn("rest_framework", summary["packages"])
+        self.assertNotIn("drf_yasg", summary["packages"])
@@ -0,0 +1,70 @@
+"""
+Low-overhead timers for the phases of a request.
+
+Every phase is observed in the AUTH_PHASE_DURATION histogram. While a request is handled
+by ServerTimingMiddleware, the phases are also collected for its Server-Timing header,
+and while it is traced (see monitoring.tracing), they are recorded as spans.
+"""
+
+from contextvars import ContextVar
+from time import perf_counter
+
+from .metrics import AUTH_PHASE_DURATION
+from .tracing import span
+
+_timings: ContextVar[list | None] = ContextVar("monitoring_timings", default=None)
+
+
+class phase:
+    """
+    Context manager timing a phase of the current request.
+
+        with phase("jwt_decode"):
+            payload = decode_token(token)
+    """
+
+    __slots__ = ("name", "start", "span")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.span = span(name)
+
+    def __enter__(self):
+        self.span.__enter__()
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = perf_counter() - self.start
+        self.span.__exit__(exc_type, exc_value, traceback)
+        AUTH_PHASE_DURATION.observe(duration, phase=self.name)
+
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((self.name, duration))
+
+
+def start_collecting():
+    """
+    Starts collecting the phase timings of the current request.
+
+    Returns:
+        Token: The token to pass to stop_collecting.
+    """
+    return _timings.set([])
+
+
+def stop_collecting(token) -> list[tuple[str, float]]:
+    """
+    Stops collecting and returns the collected (phase, seconds) pairs in completion order.
+    """
+    timings = _timings.get() or []
+    _timings.reset(token)
+    return timings
+
+
+def get_timings() -> list[tuple[str, float]]:
+    """
+    Returns the phase timings collected so far for the current request.
+    """
+    return list(_timings.get() or ())
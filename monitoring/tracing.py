@@ -0,0 +1,445 @@
+"""
+In-process request tracing.
+
+TracingMiddleware opens a root span per request, continuing the trace of an incoming
+W3C traceparent header. The phases (see monitoring.timing) and the ORM queries of the
+request are recorded as its child spans. Finished spans are exported in batches, from a
+background thread, to a rotating JSON Lines file or, in tests, to memory.
+
+Outside of a traced request, span() does nothing.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .config import (
+    get_tracing_backup_count,
+    get_tracing_exporter,
+    get_tracing_file,
+    get_tracing_max_bytes,
+    get_tracing_sample_rate,
+    is_tracing_enabled,
+)
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "HTTP_TRACEPARENT"
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar(
+    "monitoring_current_span", default=None
+)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time: int
+    end_time: Optional[int] = None
+    attributes: dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        # Up to now for a span that has not ended
+        end_time = time.time_ns() if self.end_time is None else self.end_time
+        return (end_time - self.start_time) / 1e9
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def parse_traceparent(value: str) -> Optional[tuple[str, str, bool]]:
+    """
+    Parses a W3C traceparent header.
+
+    Returns:
+        tuple[str, str, bool] | None: The trace ID, the parent span ID and the sampled flag,
+        or None if the header is not valid.
+    """
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def format_traceparent(span: Span) -> str:
+    return f"00-{span.trace_id}-{span.span_id}-01"
+
+
+def _random_id(length: int) -> str:
+    return os.urandom(length // 2).hex()
+
+
+class span:
+    """
+    Context manager recording a child span of the current span.
+
+        with span("cache.get", {"cache.key": key}):
+            ...
+    """
+
+    __slots__ = ("name", "attributes", "span", "token")
+
+    def __init__(self, name: str, attributes: Optional[dict] = None):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Optional[Span]:
+        parent = _current_span.get()
+        if parent is None:
+            self.span = None
+            return None
+
+        self.span = Span(
+            name=self.name,
+            trace_id=parent.trace_id,
+            span_id=_random_id(16),
+            parent_id=parent.span_id,
+            start_time=time.time_ns(),
+            attributes=self.attributes or {},
+        )
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.span is None:
+            return
+
+        _current_span.reset(self.token)
+        self.span.end_time = time.time_ns()
+        if exc_type is not None:
+            self.span.error = exc_type.__name__
+        _processor.on_end(self.span)
+
+
+def get_current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class InMemorySpanExporter:
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        with self._lock:
+            self.spans.extend(spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+    def shutdown(self) -> None:
+        pass
+
+
+class JSONLinesFileSpanExporter:
+    """
+    Appends the spans to a JSON Lines file, one span per line.
+    The file is rotated to file.1, file.2... once it would grow over max_bytes.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, backup_count: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    def export(self, spans: list[Span]) -> None:
+        data = "".join(json.dumps(span.to_dict()) + "\n" for span in spans)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(data) > self.max_bytes:
+            self.rotate()
+
+        with self.path.open("a", encoding="utf-8") as file:
+            file.write(data)
+
+    def rotate(self) -> None:
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                source.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+
+        if self.backup_count:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def shutdown(self) -> None:
+        pass
+
+
+class BatchSpanProcessor:
+    """
+    Queues the finished spans and exports them in batches from a background thread,
+    so that requests never wait for the exporter. Spans are dropped when the queue is full.
+
+    The thread is started by the first span a process ends: a forked process (a gunicorn
+    worker of a preloaded master) does not inherit the thread of its parent, so it starts
+    its own, with its own queue. The spans the parent had queued are exported by the parent.
+    """
+
+    def __init__(
+        self,
+        exporter,
+        max_queue_size: int = 2048,
+        max_batch_size: int = 512,
+        schedule_delay: float = 1.0,
+    ):
+        self.exporter = exporter
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.schedule_delay = schedule_delay
+        self.dropped = 0
+        self._shutdown = False
+        self._start_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._queue: queue.Queue[Span] = queue.Queue(self.max_queue_size)
+        self._flush_requested = threading.Event()
+        self._export_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        # The process the worker thread runs in
+        self._worker_pid: Optional[int] = None
+
+    def reinit_after_fork(self) -> None:
+        """
+        Drops the state inherited from the parent process, including locks another of its
+        threads may have held when it forked. Called in the child right after the fork.
+        """
+        self._start_lock = threading.Lock()
+        self._reset()
+
+    def _ensure_worker(self) -> None:
+        pid = os.getpid()
+        if self._worker_pid == pid:
+            return
+
+        with self._start_lock:
+            if self._worker_pid == pid:
+                return
+            if self._worker_pid is not None:
+                # Forked without reinit_after_fork
+                self._reset()
+            self._worker = threading.Thread(
+                target=self._run, name="monitoring-span-exporter", daemon=True
+            )
+            self._worker.start()
+            self._worker_pid = pid
+
+    def on_end(self, span: Span) -> None:
+        if self._shutdown:
+            return
+        self._ensure_worker()
+
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+            return
+
+        if self._queue.qsize() >= self.max_batch_size:
+            self._flush_requested.set()
+
+    def _export_batches(self) -> None:
+        with self._export_lock:
+            self._export_queued()
+
+    def _export_queued(self) -> None:
+        while True:
+            batch: list[Span] = []
+            try:
+                while len(batch) < self.max_batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not batch:
+                return
+
+            try:
+                self.exporter.export(batch)
+            except Exception:
+                logger.exception("Could not export %d spans", len(batch))
+
+    def _run(self) -> None:
+        while not self._shutdown:
+            self._flush_requested.wait(self.schedule_delay)
+            self._flush_requested.clear()
+            self._export_batches()
+
+    def force_flush(self) -> None:
+        """
+        Exports the queued spans from the calling thread.
+        """
+        if self._worker_pid not in (None, os.getpid()):
+            # The spans and the lock are the parent's
+            self._reset()
+        self._export_batches()
+
+    def shutdown(self) -> None:
+        if self._shutdown:
+            return
+        self._shutdown = True
+        self._flush_requested.set()
+        # No thread was started in this process
+        if self._worker is not None and self._worker_pid == os.getpid():
+            self._worker.join()
+        self.force_flush()
+        self.exporter.shutdown()
+
+
+class NoOpSpanProcessor:
+    def on_end(self, span: Span) -> None:
+        pass
+
+    def reinit_after_fork(self) -> None:
+        pass
+
+    def force_flush(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+_processor: NoOpSpanProcessor | BatchSpanProcessor = NoOpSpanProcessor()
+
+
+def get_span_processor():
+    return _processor
+
+
+def configure_tracing() -> None:
+    """
+    Replaces the span processor with one exporting to the configured MONITORING["TRACING_EXPORTER"].
+    """
+    global _processor
+
+    exporter: InMemorySpanExporter | JSONLinesFileSpanExporter
+    if get_tracing_exporter() == "memory":
+        exporter = InMemorySpanExporter()
+    else:
+        exporter = JSONLinesFileSpanExporter(
+            get_tracing_file(), get_tracing_max_bytes(), get_tracing_backup_count()
+        )
+
+    previous, _processor = _processor, BatchSpanProcessor(exporter)
+    previous.shutdown()
+
+
+def reinit_tracing_after_fork() -> None:
+    """
+    Resets the span processor in a forked process, see BatchSpanProcessor.reinit_after_fork.
+    """
+    _processor.reinit_after_fork()
+
+
+atexit.register(lambda: _processor.shutdown())
+
+
+def trace_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper (see connection.execute_wrapper) recording every query as a span.
+    """
+    connection = context["connection"]
+    with span(
+        "db.query",
+        {
+            "db.system": connection.vendor,
+            "db.alias": connection.alias,
+            "db.statement": sql,
+        },
+    ):
+        return execute(sql, params, many, context)
+
+
+class TracingMiddleware:
+    """
+    Traces the requests, continuing the trace of an incoming traceparent header.
+
+    Enabled by MONITORING["TRACING"]. It should come first, so that the spans of the other
+    middleware (ForwardAuthMiddleware) belong to the request trace.
+    """
+
+    def __init__(self, get_response):
+        if not is_tracing_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = get_tracing_sample_rate()
+        configure_tracing()
+
+    def start_trace(self, request) -> Optional[Span]:
+        traceparent = request.META.get(TRACEPARENT_HEADER)
+        parent = parse_traceparent(traceparent) if traceparent else None
+
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = _random_id(32), None
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            return None
+
+        return Span(
+            name=f"{request.method} {request.path}",
+            trace_id=trace_id,
+            span_id=_random_id(16),
+            parent_id=parent_id,
+            start_time=time.time_ns(),
+            attributes={"http.method": request.method, "http.target": request.path},
+        )
+
+    def __call__(self, request):
+        root = self.start_trace(request)
+        if root is None:
+            return self.get_response(request)
+
+        token = _current_span.set(root)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(trace_query))
+                response = self.get_response(request)
+            root.attributes["http.status_code"] = response.status_code
+        except Exception as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            root.end_time = time.time_ns()
+
+            match = request.resolver_match
+            if match:
+                root.attributes["http.route"] = match.view_name
+            _processor.on_end(root)
+
+        response["traceresponse"] = format_traceparent(root)
+        return response
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import metrics, query_profile
+
+urlpatterns = [
+    path("metrics/", metrics, name="metrics"),
+    path("metrics/queries/", query_profile, name="query_profile"),
+]
@@ -0,0 +1,41 @@
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+)
+
+from tokens.permissions import HasInternalAPIKey
+
+from .config import is_metrics_endpoint_enabled, is_query_profiler_enabled
+from .metrics import REGISTRY
+from .queries import QUERY_PROFILE
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Serves the in-process metrics in the Prometheus text exposition format, to the
+    scrapers sending one of INTERNAL_API_KEYS in the X-API-Key header.
+    """
+    if not is_metrics_endpoint_enabled():
+        raise Http404
+    if not HasInternalAPIKey().has_permission(request, None):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def query_profile(request: HttpRequest) -> HttpResponse:
+    """
+    Serves the queries aggregated by the query profiler, by URL name and query shape,
+    to the clients sending one of INTERNAL_API_KEYS in the X-API-Key header.
+    """
+    if not is_query_profiler_enabled():
+        raise Http404
+    if not HasInternalAPIKey().has_permission(request, None):
+        return HttpResponseForbidden()
+
+    return JsonResponse(QUERY_PROFILE.report())
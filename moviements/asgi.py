@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moviements.settings')
 
 application = get_asgi_application()
+
+# See moviements/warmup.py
+from moviements.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -0,0 +1,158 @@
+"""
+Admin of the large and the sharded models.
+
+EstimatedCountPaginator keeps the changelists of large tables from counting every row.
+
+A changelist of a sharded model (see moviements.db.sharding) lists one shard at a time,
+chosen with the shard filter, which shows the row count of every shard (counted in parallel).
+The change and delete pages look the object up on every shard in parallel.
+"""
+
+from typing import Optional
+
+from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .config import get_shard_aliases
+from .sharding import fan_out, is_sharded
+
+
+def estimate_table_rows(model, alias: str) -> Optional[int]:
+    """
+    Returns the row count of the model table according to the statistics of the database
+    (PostgreSQL reltuples, SQLite sqlite_stat1 as maintained by ANALYZE or PRAGMA optimize),
+    or None without statistics.
+    """
+    connection = connections[alias]
+    table = model._meta.db_table
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [table],
+            )
+        elif connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table]
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+
+    if row is None:
+        return None
+    count = int(str(row[0]).split()[0])
+    # reltuples is -1 for a table that was never analyzed
+    return count if count >= 0 else None
+
+
+def approximate_count(queryset, limit: int) -> int:
+    """
+    Counts the queryset from the table statistics if it is not filtered and larger than
+    limit, or else up to limit + 1 rows.
+    """
+    if not queryset.query.where:
+        estimate = estimate_table_rows(queryset.model, queryset.db)
+        if estimate is not None and estimate > limit:
+            return estimate
+
+    return queryset[: limit + 1].count()
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator of the changelists of large tables. Unfiltered lists are counted from the
+    database statistics and filtered ones up to count_limit rows: the pages past the limit
+    are not reachable, narrow the filters instead.
+
+    Use it with show_full_result_count = False, which skips the count of the whole table.
+    """
+
+    count_limit = 10000
+
+    @cached_property
+    def count(self) -> int:
+        return approximate_count(self.object_list, self.count_limit)
+
+
+def get_request_shard(request) -> str:
+    shard = request.GET.get(ShardListFilter.parameter_name)
+    return shard if shard in get_shard_aliases() else get_shard_aliases()[0]
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    title = "shard"
+    parameter_name = "shard"
+
+    def lookups(self, request, model_admin):
+        counts = fan_out(
+            lambda alias: approximate_count(
+                model_admin.model._default_manager.using(alias),
+                EstimatedCountPaginator.count_limit,
+            )
+        )
+        return [(alias, f"{alias} ({count})") for alias, count in counts.items()]
+
+    def value(self):
+        return super().value() or get_shard_aliases()[0]
+
+    def choices(self, changelist):
+        # There is no "All" choice: a changelist cannot span several databases
+        for lookup, title in self.lookup_choices:
+            yield {
+                "selected": self.value() == lookup,
+                "query_string": changelist.get_query_string(
+                    {self.parameter_name: lookup}
+                ),
+                "display": title,
+            }
+
+    def queryset(self, request, queryset):
+        # ShardedModelAdmin.get_queryset already reads from the shard
+        return queryset
+
+
+class ShardedModelAdmin(admin.ModelAdmin):
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if not is_sharded(self.model):
+            return queryset
+        return queryset.using(get_request_shard(request))
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        if not is_sharded(self.model):
+            return list_filter
+        return (ShardListFilter, *list_filter)
+
+    def get_list_select_related(self, request):
+        # The related objects are not on the shard: never join them
+        if is_sharded(self.model):
+            return ()
+        return super().get_list_select_related(request)
+
+    def get_object(self, request, object_id, from_field=None):
+        if not is_sharded(self.model):
+            return super().get_object(request, object_id, from_field)
+
+        model = self.model
+        field = (
+            model._meta.pk if from_field is None else model._meta.get_field(from_field)
+        )
+        try:
+            object_id = field.to_python(object_id)
+        except (model.DoesNotExist, ValidationError, ValueError):
+            return None
+
+        queryset = super().get_queryset(request).filter(**{field.name: object_id})
+        found = fan_out(lambda alias: queryset.using(alias).first())
+        return next((obj for obj in found.values() if obj is not None), None)
@@ -0,0 +1,98 @@
+"""
+SQLite backend tuned for concurrent workers.
+
+On top of Django's SQLite backend, every new connection applies the PRAGMAS (WAL journal,
+so that readers and the writer do not block each other; a busy timeout; NORMAL synchronous
+commits, which are durable in WAL mode except on power loss; memory-mapped reads and a
+larger page cache). Settings OPTIONS:
+
+    "pragmas": overrides of PRAGMAS, a None value leaves the SQLite default.
+    "transaction_mode": "IMMEDIATE" takes the write lock when a transaction begins, instead
+        of failing with "database is locked" when a read transaction upgrades to a write.
+    "lock_retries": how many times a statement failing with "database is locked" outside of
+        a transaction is retried (with exponential backoff) once the busy timeout expired.
+
+Combine it with persistent connections (CONN_MAX_AGE), so that requests do not reopen the
+database and reapply the pragmas.
+"""
+
+import random
+import sqlite3 as Database
+import time
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    # In KiB when negative
+    "cache_size": -20000,
+    "temp_store": "MEMORY",
+}
+
+LOCK_RETRY_DELAY = 0.01
+LOCK_RETRY_MAX_DELAY = 0.5
+
+
+def is_locked_error(error: Exception) -> bool:
+    return isinstance(error, Database.OperationalError) and "database is locked" in str(
+        error
+    )
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    lock_retries = 0
+
+    def execute(self, query, params=None):
+        for attempt in range(self.lock_retries + 1):
+            try:
+                return super().execute(query, params)
+            except Database.OperationalError as e:
+                # Within a transaction, only the whole transaction could be retried
+                if (
+                    attempt == self.lock_retries
+                    or not is_locked_error(e)
+                    or self.connection.in_transaction
+                ):
+                    raise
+            delay = min(LOCK_RETRY_DELAY * 2**attempt, LOCK_RETRY_MAX_DELAY)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, settings_dict, alias=DEFAULT_DB_ALIAS):
+        super().__init__(settings_dict, alias)
+        options = self.settings_dict.get("OPTIONS", {})
+        self.pragmas = {
+            name: value
+            for name, value in (PRAGMAS | options.get("pragmas", {})).items()
+            if value is not None
+        }
+        self.transaction_mode = options.get("transaction_mode")
+        self.lock_retries = options.get("lock_retries", 3)
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for option in ("pragmas", "transaction_mode", "lock_retries"):
+            kwargs.pop(option, None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.lock_retries = self.lock_retries
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f"BEGIN {self.transaction_mode}")
+        else:
+            self.cursor().execute("BEGIN")
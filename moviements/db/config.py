@@ -0,0 +1,88 @@
+import datetime
+from typing import Any
+
+from django.conf import settings
+
+
+def get_replication_config(key: str, default: Any = None) -> Any:
+    """
+    get_replication_config function retrieves a specific configuration value from the DATABASE_REPLICATION dictionary in Django settings.
+
+    Parameters:
+        key (str): The key of the configuration value to retrieve.
+        default (Any, optional): A default value to return if the specified key is not found in the DATABASE_REPLICATION dictionary. Defaults to None.
+
+    Returns:
+        Any: The value associated with the specified key in the DATABASE_REPLICATION dictionary, or the default value if the key is not found.
+    """
+    return getattr(settings, "DATABASE_REPLICATION", {}).get(key, default)
+
+
+def get_replica_aliases() -> list[str]:
+    """
+    get_replica_aliases function retrieves the value of the "REPLICAS" configuration from the DATABASE_REPLICATION dictionary in Django settings.
+    If the key is not found, it returns the default value, which is an empty list (every query goes to the default database).
+
+    Returns:
+        list[str]: The aliases of the read replicas of the default database.
+    """
+    return get_replication_config("REPLICAS", [])
+
+
+def get_sticky_window() -> datetime.timedelta:
+    """
+    get_sticky_window function retrieves the value of the "STICKY_WINDOW" configuration from the DATABASE_REPLICATION dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 5 seconds.
+
+    Returns:
+        datetime.timedelta: How long the reads of a user stay on the primary after the user wrote to it.
+            It should exceed the replication lag.
+    """
+    return get_replication_config("STICKY_WINDOW", datetime.timedelta(seconds=5))
+
+
+def get_sticky_cache_alias() -> str:
+    """
+    get_sticky_cache_alias function retrieves the value of the "CACHE_ALIAS" configuration from the DATABASE_REPLICATION dictionary in Django settings.
+    If the key is not found, it returns the default value, which is "default".
+
+    Returns:
+        str: The cache storing the sticky-primary windows. It must be shared by all the workers.
+    """
+    return get_replication_config("CACHE_ALIAS", "default")
+
+
+def get_sharding_config(key: str, default: Any = None) -> Any:
+    """
+    get_sharding_config function retrieves a specific configuration value from the DATABASE_SHARDING dictionary in Django settings.
+
+    Parameters:
+        key (str): The key of the configuration value to retrieve.
+        default (Any, optional): A default value to return if the specified key is not found in the DATABASE_SHARDING dictionary. Defaults to None.
+
+    Returns:
+        Any: The value associated with the specified key in the DATABASE_SHARDING dictionary, or the default value if the key is not found.
+    """
+    return getattr(settings, "DATABASE_SHARDING", {}).get(key, default)
+
+
+def get_shard_aliases() -> list[str]:
+    """
+    get_shard_aliases function retrieves the value of the "SHARDS" configuration from the DATABASE_SHARDING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is an empty list (sharded models stay in the default database).
+
+    Returns:
+        list[str]: The aliases of the shards. Reordering them or changing their number moves the rows of most users.
+    """
+    return get_sharding_config("SHARDS", [])
+
+
+def get_sharded_models() -> list[str]:
+    """
+    get_sharded_models function retrieves the value of the "MODELS" configuration from the DATABASE_SHARDING dictionary in Django settings.
+    If the key is not found, it returns the default value, which is an empty list.
+
+    Returns:
+        list[str]: The labels ("app_label.ModelName") of the models spread across the shards by user.
+    """
+    return get_sharding_config("MODELS", [])
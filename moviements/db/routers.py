@@ -0,0 +1,111 @@
+"""
+Primary/replica routing.
+
+Writes always go to the primary (the default database). Reads go to a random replica only
+where PrimaryReplicaMiddleware allows it (safe requests to the API) and where they cannot
+miss a recent write:
+
+- inside a transaction on the primary;
+- within the sticky window of a user who just wrote to the primary (see stick_to_primary),
+  once the request has been identified as theirs (see pin_primary_if_sticky);
+- inside a use_primary() block.
+
+Everywhere else (unsafe requests, admin, management commands), reads stay on the primary.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .config import get_replica_aliases, get_sticky_cache_alias, get_sticky_window
+
+_replica_reads: ContextVar[bool] = ContextVar("db_replica_reads", default=False)
+
+
+def allow_replica_reads():
+    """
+    Lets the reads of the current context go to the replicas.
+
+    Returns:
+        Token: The token to pass to reset_replica_reads.
+    """
+    return _replica_reads.set(bool(get_replica_aliases()))
+
+
+def reset_replica_reads(token) -> None:
+    _replica_reads.reset(token)
+
+
+def pin_primary() -> None:
+    """
+    Sends the remaining reads of the current context (request) to the primary.
+    """
+    _replica_reads.set(False)
+
+
+@contextmanager
+def use_primary():
+    """
+    Sends the reads of the block to the primary.
+    """
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _sticky_key(user_id) -> str:
+    return f"db:sticky:{user_id}"
+
+
+def stick_to_primary(user_id) -> None:
+    """
+    Keeps the reads of the user's requests on the primary for the sticky window,
+    so that they read their own writes despite the replication lag.
+    """
+    if get_replica_aliases():
+        caches[get_sticky_cache_alias()].set(
+            _sticky_key(user_id), True, get_sticky_window().total_seconds()
+        )
+
+
+def pin_primary_if_sticky(user_id: Optional[str]) -> None:
+    """
+    Pins the current request to the primary if its user is within their sticky window.
+    """
+    if user_id is None or not _replica_reads.get():
+        return
+    if caches[get_sticky_cache_alias()].get(_sticky_key(user_id)):
+        pin_primary()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return DEFAULT_DB_ALIAS
+
+        # Related objects are read from the database their instance came from
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in (
+            DEFAULT_DB_ALIAS,
+            *get_replica_aliases(),
+        ):
+            return instance._state.db
+
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(get_replica_aliases())
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,148 @@
+"""
+Horizontal sharding by user.
+
+The rows of the sharded models (DATABASE_SHARDING["MODELS"]) are placed on one of the
+DATABASE_SHARDING["SHARDS"] aliases by a hash of their user id (their `user_id` field), so all
+the rows of a user live on the same shard. Users themselves stay in the default database:
+queries cannot join a sharded model to the user table, and foreign keys to the user are not
+enforced by the database.
+
+Queries of a user's rows go through ShardedManager.for_user (or a related manager of the user,
+routed by ShardRouter). Queries across users go through fan_out.
+Without shards, for_user and fan_out use the default database.
+"""
+
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections, models
+
+from .config import get_shard_aliases, get_sharded_models
+
+T = TypeVar("T")
+
+SHARD_KEY = "user_id"
+
+
+def is_sharded(model) -> bool:
+    return bool(get_shard_aliases()) and model._meta.label in get_sharded_models()
+
+
+def shard_for(user_id) -> str:
+    """
+    Returns the alias of the shard holding the rows of the user.
+    Rows without a user all live on the first shard.
+    """
+    shards = get_shard_aliases()
+    if not shards:
+        return DEFAULT_DB_ALIAS
+    if user_id is None:
+        return shards[0]
+
+    try:
+        key = uuid.UUID(str(user_id)).int
+    except ValueError:
+        key = zlib.crc32(str(user_id).encode())
+    return shards[key % len(shards)]
+
+
+def fan_out(
+    fn: Callable[[str], T], aliases: Optional[list[str]] = None
+) -> dict[str, T]:
+    """
+    Calls fn with every shard alias in parallel, one thread per shard.
+
+    Parameters:
+        fn (Callable): Called with the alias of a shard.
+        aliases (list[str], optional): The shards to query. Defaults to all of them (or the default database).
+
+    Returns:
+        dict[str, T]: The result of fn, by alias.
+    """
+    aliases = aliases or get_shard_aliases() or [DEFAULT_DB_ALIAS]
+    if len(aliases) == 1:
+        return {aliases[0]: fn(aliases[0])}
+
+    def run(alias: str):
+        try:
+            return fn(alias)
+        finally:
+            # Database connections are per thread
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+        return dict(zip(aliases, executor.map(run, aliases)))
+
+
+class ShardedManager(models.Manager):
+    def for_user(self, user_id) -> models.QuerySet:
+        """
+        Returns the queryset of the shard holding the rows of the user.
+        """
+        if not is_sharded(self.model):
+            return self.get_queryset()
+        return self.get_queryset().using(shard_for(user_id))
+
+    def for_shard(self, alias: str) -> models.QuerySet:
+        """
+        Returns the queryset of a shard (of the default routing without shards), e.g. in fan_out.
+        """
+        if not is_sharded(self.model):
+            return self.get_queryset()
+        return self.get_queryset().using(alias)
+
+    def bulk_create_sharded(self, objs: list, **kwargs) -> list:
+        """
+        bulk_create, with the objects grouped by shard.
+        """
+        if not is_sharded(self.model):
+            return self.bulk_create(objs, **kwargs)
+
+        shards: dict[str, list] = {}
+        for obj in objs:
+            shards.setdefault(shard_for(getattr(obj, SHARD_KEY)), []).append(obj)
+        for alias, shard_objs in shards.items():
+            self.using(alias).bulk_create(shard_objs, **kwargs)
+        return objs
+
+
+class ShardRouter:
+    """
+    Routes the queries of the sharded models given an instance of the model or of its user,
+    e.g. for save(), delete() and user.sessions. Other queries are left to the next router.
+    """
+
+    def get_shard(self, model, hints) -> Optional[str]:
+        if not is_sharded(model):
+            return None
+
+        instance = hints.get("instance")
+        if instance is None:
+            return None
+        if is_sharded(type(instance)):
+            return shard_for(getattr(instance, SHARD_KEY))
+        if isinstance(instance, get_user_model()):
+            return shard_for(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self.get_shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.get_shard(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_sharded(type(obj1)) or is_sharded(type(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in get_shard_aliases():
+            return None
+        # Shards only hold the tables of the sharded models
+        return model_name is not None and f"{app_label}.{model_name}" in {
+            label.lower() for label in get_sharded_models()
+        }
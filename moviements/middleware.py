@@ -0,0 +1,91 @@
+"""
+Path-aware versions of the browser middleware.
+
+JSON API routes (API_PATH_PREFIXES) are authenticated with bearer tokens, so they have
+no use for the cookie session, CSRF protection, session authentication and messages.
+These subclasses pass API requests straight to the next middleware and behave exactly
+like their parents everywhere else (admin, swagger).
+"""
+
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware import csrf
+
+from tokens.jwt.config import get_forward_auth_path
+
+from .db.config import get_replica_aliases
+from .db.routers import allow_replica_reads, reset_replica_reads
+
+
+class BrowserOnlyMiddlewareMixin:
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.api_path_prefixes = tuple(getattr(settings, "API_PATH_PREFIXES", ()))
+
+    def is_api_request(self, request) -> bool:
+        return request.path_info.startswith(self.api_path_prefixes)
+
+    def __call__(self, request):
+        if self.is_api_request(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(
+    BrowserOnlyMiddlewareMixin, sessions_middleware.SessionMiddleware
+):
+    pass
+
+
+class CsrfViewMiddleware(BrowserOnlyMiddlewareMixin, csrf.CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if self.is_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class AuthenticationMiddleware(
+    BrowserOnlyMiddlewareMixin, auth_middleware.AuthenticationMiddleware
+):
+    pass
+
+
+class MessageMiddleware(
+    BrowserOnlyMiddlewareMixin, messages_middleware.MessageMiddleware
+):
+    pass
+
+
+class PrimaryReplicaMiddleware:
+    """
+    Lets the reads of safe API requests (and forward-auth checks) go to the read replicas,
+    see moviements.db.routers. Not used without DATABASE_REPLICATION["REPLICAS"].
+
+    Must come before ForwardAuthMiddleware.
+    """
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        if not get_replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.path_prefixes = (
+            *getattr(settings, "API_PATH_PREFIXES", ()),
+            get_forward_auth_path(),
+        )
+
+    def __call__(self, request):
+        if request.method not in self.SAFE_METHODS or not request.path_info.startswith(
+            self.path_prefixes
+        ):
+            return self.get_response(request)
+
+        token = allow_replica_reads()
+        try:
+            return self.get_response(request)
+        finally:
+            reset_replica_reads(token)
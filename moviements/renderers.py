@@ -0,0 +1,53 @@
+"""
+JSON renderer backed by orjson when it is installed.
+
+The output is byte-for-byte identical to rest_framework.renderers.JSONRenderer with the
+default COMPACT_JSON/UNICODE_JSON settings: datetimes in UTC end with "Z", UUIDs are
+rendered natively, and everything orjson does not know (lazy strings, Decimal, querysets)
+goes through DRF's JSONEncoder.default. Payloads orjson cannot encode exactly like the
+stdlib (integers over 64 bits, pretty-printing, non-default DRF JSON settings) fall back
+to the stock renderer.
+
+Known difference: floats use orjson's shortest representation (1e16 instead of 1e+16)
+and non-finite floats are rendered as null. The API does not return floats.
+"""
+
+from types import ModuleType
+from typing import Optional
+
+from rest_framework.renderers import JSONRenderer
+
+orjson: Optional[ModuleType]
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self._default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same \u2028 and \u2029 escaping as JSONRenderer
+        if b"\xe2\x80" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
+
+    def _default(self, obj):
+        return self.encoder_class().default(obj)
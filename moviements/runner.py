@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the tests with the audit log disabled: its in-process buffer outlives the test
+    databases, and would be written to the development database when the process exits.
+    The tests of the audit log enable it with override_settings.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.audit_log_override = override_settings(
+            AUDIT_LOG={**settings.AUDIT_LOG, "ENABLED": False}
+        )
+        self.audit_log_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.audit_log_override.disable()
+        super().teardown_test_environment(**kwargs)
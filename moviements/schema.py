@@ -0,0 +1,178 @@
+"""
+OpenAPI schema of the API.
+
+Generating the schema introspects every view and serializer, so it is done once:
+either ahead of time with `manage.py generate_openapi_schema`, which writes the
+artifacts to OPENAPI_SCHEMA["DIR"], or lazily on the first request if no artifact
+exists. The documents are then served from memory with a strong ETag.
+
+An artifact records the version of the code it was generated from (get_code_version)
+and is only served by that code: after a deploy that did not regenerate it, the schema
+is generated on the first request again instead of describing the previous release.
+Deploys should still run `manage.py generate_openapi_schema` after installing the code.
+"""
+
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Optional
+
+import drf_yasg
+from django.apps import apps
+from django.conf import settings
+from django.http import Http404, HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from rest_framework import permissions
+from drf_yasg import openapi
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.views import get_schema_view
+
+API_INFO = openapi.Info(
+    title="Moviements API",
+    default_version="v1",
+    # description="Test description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="tinytengu@yandex.ru"),
+    license=openapi.License(name="BSD License"),
+)
+
+schema_view = get_schema_view(
+    API_INFO,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+)
+
+SCHEMA_FORMATS = {
+    ".json": (OpenAPICodecJson, "application/json"),
+    ".yaml": (OpenAPICodecYaml, "application/yaml"),
+}
+
+
+@dataclass(frozen=True)
+class SchemaDocument:
+    content: bytes
+    content_type: str
+    etag: str
+
+
+_documents: dict[str, SchemaDocument] = {}
+_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def get_schema_path(format: str) -> Path:
+    return Path(str(settings.OPENAPI_SCHEMA["DIR"])) / f"swagger{format}"
+
+
+def get_version_path(format: str) -> Path:
+    path = get_schema_path(format)
+    return path.with_name(f"{path.name}.version")
+
+
+@cache
+def get_code_version() -> str:
+    """
+    Returns a digest of the sources the schema is generated from: the modules of the
+    project (its apps and the package of the settings) and the drf_yasg version.
+    """
+    base_dir = Path(settings.BASE_DIR).resolve()
+    roots = {Path(app.path).resolve() for app in apps.get_app_configs()}
+    roots.add(Path(__file__).resolve().parent)
+
+    digest = hashlib.sha256(drf_yasg.__version__.encode())
+    for root in sorted(root for root in roots if root.is_relative_to(base_dir)):
+        for source in sorted(root.rglob("*.py")):
+            digest.update(str(source.relative_to(base_dir)).encode())
+            digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def read_schema(format: str) -> Optional[bytes]:
+    """
+    Returns the artifact of the format, or None if there is none or it was generated
+    from another version of the code.
+    """
+    path, version_path = get_schema_path(format), get_version_path(format)
+    if not path.exists():
+        return None
+    if not version_path.exists() or version_path.read_text() != get_code_version():
+        logger.warning("Ignoring %s generated from another version of the code", path)
+        return None
+    return path.read_bytes()
+
+
+def generate_schema(format: str = ".json") -> bytes:
+    """
+    Generates the public OpenAPI schema by introspecting the URL configuration.
+
+    Parameters:
+        format (str, optional): ".json" or ".yaml". Defaults to ".json".
+
+    Returns:
+        bytes: The encoded schema.
+    """
+    codec_class, _ = SCHEMA_FORMATS[format]
+    generator = swagger_settings.DEFAULT_GENERATOR_CLASS(API_INFO)
+    schema = generator.get_schema(request=None, public=True)
+    return codec_class(validators=[]).encode(schema)
+
+
+def write_schema(format: str = ".json") -> Path:
+    """
+    Generates the schema and stores it as an artifact in OPENAPI_SCHEMA["DIR"].
+
+    Returns:
+        Path: The path of the written artifact.
+    """
+    path = get_schema_path(format)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(generate_schema(format))
+    get_version_path(format).write_text(get_code_version())
+    _documents.pop(format, None)
+    return path
+
+
+def get_schema_document(format: str = ".json") -> SchemaDocument:
+    """
+    Returns the cached schema document, loading the artifact or generating it on first use.
+    """
+    document = _documents.get(format)
+    if document is not None:
+        return document
+
+    with _lock:
+        if format not in _documents:
+            content = read_schema(format)
+            if content is None:
+                content = generate_schema(format)
+            _documents[format] = SchemaDocument(
+                content=content,
+                content_type=SCHEMA_FORMATS[format][1],
+                etag=f'"{hashlib.sha256(content).hexdigest()}"',
+            )
+        return _documents[format]
+
+
+def schema_document_view(request: HttpRequest, format: str) -> HttpResponse:
+    """
+    Serves the cached schema document with a strong ETag and answers 304 when it is unchanged.
+    """
+    if format not in SCHEMA_FORMATS:
+        raise Http404
+
+    document = get_schema_document(format)
+    response = get_conditional_response(request, etag=document.etag)
+    if response is None:
+        response = HttpResponse(document.content, content_type=document.content_type)
+
+    response["ETag"] = document.etag
+    patch_cache_control(
+        response, public=True, max_age=settings.OPENAPI_SCHEMA["MAX_AGE"]
+    )
+    return response
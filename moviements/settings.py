@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -31,6 +34,11 @@ ALLOWED_HOSTS = ["*"]
 
 # Application definition
 
+# API-only processes (MOVIEMENTS_API_ONLY=1) leave out the admin, the OpenAPI schema and
+# UIs and the browser middleware, most of the startup imports (see manage.py
+# importtime_report). They only serve the token-authenticated API routes.
+API_ONLY = os.environ.get("MOVIEMENTS_API_ONLY", "") == "1"
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -43,19 +51,55 @@ INSTALLED_APPS = [
     "drf_yasg",
     "tokens",
     "user_auth",
+    "monitoring",
 ]
 
 MIDDLEWARE = [
+    "monitoring.tracing.TracingMiddleware",
+    "moviements.middleware.PrimaryReplicaMiddleware",
+    "tokens.middleware.ForwardAuthMiddleware",
+    "monitoring.middleware.ServerTimingMiddleware",
+    "monitoring.middleware.QueryProfilerMiddleware",
+    "monitoring.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "moviements.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "moviements.middleware.CsrfViewMiddleware",
+    "moviements.middleware.AuthenticationMiddleware",
+    "moviements.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+if API_ONLY:
+    INSTALLED_APPS = [
+        app
+        for app in INSTALLED_APPS
+        if app
+        not in (
+            "django.contrib.admin",
+            "django.contrib.sessions",
+            "django.contrib.messages",
+            "django.contrib.staticfiles",
+            "drf_yasg",
+        )
+    ]
+    MIDDLEWARE = [
+        middleware
+        for middleware in MIDDLEWARE
+        if middleware
+        not in (
+            "moviements.middleware.SessionMiddleware",
+            "moviements.middleware.CsrfViewMiddleware",
+            "moviements.middleware.AuthenticationMiddleware",
+            "moviements.middleware.MessageMiddleware",
+        )
+    ]
+
+# Token-authenticated JSON routes. The session, CSRF, authentication and messages
+# middleware from moviements.middleware skip them.
+API_PATH_PREFIXES = ("/auth/", "/tokens/")
+
 ROOT_URLCONF = "moviements.urls"
 
 TEMPLATES = [
@@ -76,17 +120,107 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "moviements.wsgi.application"
 
+# Disables the audit log for the test suite (see moviements.runner)
+TEST_RUNNER = "moviements.runner.TestRunner"
+
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# SQLite with WAL and tuned pragmas (see moviements.db.backends.sqlite3), and connections
+# kept open across requests
+SQLITE_DATABASE = {
+    "ENGINE": "moviements.db.backends.sqlite3",
+    "CONN_MAX_AGE": 600,
+    "CONN_HEALTH_CHECKS": True,
+    "OPTIONS": {
+        "transaction_mode": "IMMEDIATE",
+        "lock_retries": 3,
+    },
+}
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        **SQLITE_DATABASE,
         "NAME": BASE_DIR / "db.sqlite3",
     }
 }
 
+# Read replicas of the default database: MOVIEMENTS_DB_REPLICAS=2 adds the "replica1" and
+# "replica2" aliases (SQLite files standing in for replicas in development). In tests,
+# they mirror the default database.
+DATABASE_REPLICAS = [
+    f"replica{index}"
+    for index in range(1, int(os.environ.get("MOVIEMENTS_DB_REPLICAS", 0)) + 1)
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        **SQLITE_DATABASE,
+        "NAME": BASE_DIR / f"db.{alias}.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    }
+
+# Shards of the sessions and revoked tokens: MOVIEMENTS_DB_SHARDS=4 adds the "shard0" to
+# "shard3" aliases (SQLite files standing in for separate servers in development).
+# Run "manage.py migrate --database shardN" for each of them. The test suite runs unsharded,
+# except for "MOVIEMENTS_DB_SHARDS=2 manage.py test moviements.tests.ShardingTestCase".
+DATABASE_SHARDS = [
+    f"shard{index}" for index in range(int(os.environ.get("MOVIEMENTS_DB_SHARDS", 0)))
+]
+for alias in DATABASE_SHARDS:
+    DATABASES[alias] = {
+        **SQLITE_DATABASE,
+        "NAME": BASE_DIR / f"db.{alias}.sqlite3",
+    }
+
+DATABASE_ROUTERS = [
+    "moviements.db.sharding.ShardRouter",
+    "moviements.db.routers.PrimaryReplicaRouter",
+]
+
+DATABASE_REPLICATION = {
+    "REPLICAS": DATABASE_REPLICAS,
+    # Reads of a user stay on the primary for this long after they wrote to it
+    "STICKY_WINDOW": timedelta(seconds=5),
+    # Must be shared by all the workers in production
+    "CACHE_ALIAS": "default",
+}
+
+DATABASE_SHARDING = {
+    "SHARDS": DATABASE_SHARDS,
+    # Models spread across the shards by their user_id
+    "MODELS": ["user_auth.Session", "tokens.Blacklist"],
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "permissions": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "permissions",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "idempotency": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "idempotency",
+        # How long the responses are replayed
+        "TIMEOUT": 600,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
+# Cache of per-user permission sets, see user_auth/permissions_cache.py
+PERMISSION_CACHE_ALIAS = "permissions"
+
+# Cache of the responses replayed for Idempotency-Key retries, see user_auth/idempotency.py
+IDEMPOTENCY_CACHE_ALIAS = "idempotency"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -135,17 +269,23 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "user_auth.CustomUser"
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 
 JWT_CONFIG = {
     "SIGNING_KEY": SECRET_KEY,
     "SIGNING_ALGORITHM": "HS256",
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "FORWARD_AUTH_PATH": "/tokens/verify/",
+    "SESSION_TOUCH_INTERVAL": timedelta(minutes=1),
 }
 
+# Keys accepted in the X-API-Key header of internal service endpoints
+INTERNAL_API_KEYS: list[str] = []
+
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "moviements.renderers.FastJSONRenderer",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
         # "rest_framework.authentication.SessionAuthentication",
@@ -155,6 +295,79 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_PARSER_CLASSES": [
-        "rest_framework.parsers.JSONParser",
+        "moviements.parsers.FastJSONParser",
     ],
 }
+
+AUDIT_LOG = {
+    "ENABLED": True,
+    # Write the buffered events once there are this many...
+    "FLUSH_SIZE": 200,
+    # ...or the oldest one is this old (checked at the end of the requests)
+    "FLUSH_INTERVAL": timedelta(seconds=5),
+    # Write them right away past this many
+    "MAX_BUFFER_SIZE": 10000,
+    # Deleted by manage.py purge_auth_events past this age
+    "RETENTION": timedelta(days=90),
+}
+
+# Bulk password hashing, see user_auth/hashing.py
+PASSWORD_HASHING = {
+    # Hashing processes of a batch, defaults to one per CPU
+    "WORKERS": None,
+    # Smaller batches are hashed in the calling process
+    "MIN_POOL_BATCH": 8,
+}
+
+# Staff-only bulk sign-up, see user_auth/provisioning.py
+BULK_PROVISIONING = {
+    "MAX_BATCH_SIZE": 1000,
+}
+
+EMAIL_OUTBOX = {
+    "BATCH_SIZE": 100,
+    "MAX_ATTEMPTS": 5,
+    "BACKOFF_BASE": timedelta(seconds=30),
+    "BACKOFF_MAX": timedelta(hours=1),
+    # How long a batch being sent is hidden from the other workers
+    "LEASE": timedelta(minutes=5),
+}
+
+# Pre-generated OpenAPI schema, see moviements/schema.py
+OPENAPI_SCHEMA = {
+    "DIR": BASE_DIR / "openapi",
+    "MAX_AGE": 3600,
+}
+
+# The UIs load the cached schema document instead of generating their own
+SWAGGER_SETTINGS = {
+    "SPEC_URL": ("schema-json", {"format": ".json"}),
+}
+
+REDOC_SETTINGS = {
+    "SPEC_URL": ("schema-json", {"format": ".json"}),
+}
+
+MONITORING = {
+    # Send the authentication phase timings in the Server-Timing response header
+    "SERVER_TIMING": False,
+    # Serve the Prometheus metrics at /metrics/, to the scrapers sending one of
+    # INTERNAL_API_KEYS in the X-API-Key header
+    "METRICS_ENDPOINT": True,
+    # Record the queries of each request by URL name (served at /metrics/queries/)
+    "QUERY_PROFILER": DEBUG,
+    # Maximum number of queries of a single request, by URL name
+    "QUERY_BUDGETS": {},
+    # Profile the requests with a signed X-Profile header (manage.py profile_token)
+    "PROFILER": False,
+    # Fraction of the other requests to profile
+    "PROFILER_SAMPLE_RATE": 0.0,
+    # "cprofile" (pstats files) or "sampling" (collapsed stacks)
+    "PROFILER_MODE": "cprofile",
+    "PROFILER_DIR": BASE_DIR / "profiles",
+    # Trace the requests and export their spans to TRACING_FILE (rotated JSON Lines)
+    "TRACING": False,
+    "TRACING_SAMPLE_RATE": 1.0,
+    "TRACING_EXPORTER": "file",
+    "TRACING_FILE": BASE_DIR / "traces" / "spans.jsonl",
+}
@@ -0,0 +1,670 @@
+import contextvars
+import datetime
+import decimal
+import io
+import os
+import runpy
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zoneinfo
+from unittest import mock, skipIf, skipUnless
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.urls import path, register_converter
+from django.utils.translation import gettext_lazy
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from monitoring import tracing
+from tokens.introspection import introspect_tokens
+from tokens.models import Blacklist
+from user_auth.models import CustomUser, Session
+from user_auth.serializers import SessionSerializer
+
+from . import schema, warmup
+from .db.routers import (
+    PrimaryReplicaRouter,
+    allow_replica_reads,
+    pin_primary_if_sticky,
+    reset_replica_reads,
+    stick_to_primary,
+    use_primary,
+)
+from .db.sharding import ShardRouter, fan_out, shard_for
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+
+from .middleware import (
+    SessionMiddleware,
+    CsrfViewMiddleware,
+    AuthenticationMiddleware,
+    MessageMiddleware,
+)
+
+
+class BrowserMiddlewareTestCase(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(request)
+            return HttpResponse()
+
+        self.view = view
+        self.chain = SessionMiddleware(
+            AuthenticationMiddleware(MessageMiddleware(CsrfViewMiddleware(view)))
+        )
+
+    def test_api_request_skips_browser_middleware(self):
+        response = self.chain(self.factory.get("/auth/me/"))
+
+        self.assertEqual(response.status_code, 200)
+        request = self.seen[0]
+        self.assertFalse(hasattr(request, "session"))
+        self.assertFalse(hasattr(request, "user"))
+        self.assertFalse(hasattr(request, "_messages"))
+        self.assertNotIn("Set-Cookie", response)
+
+    def test_browser_request_keeps_browser_middleware(self):
+        self.chain(self.factory.get("/admin/"))
+
+        request = self.seen[0]
+        self.assertTrue(hasattr(request, "session"))
+        self.assertTrue(hasattr(request, "user"))
+        self.assertTrue(hasattr(request, "_messages"))
+
+    def test_csrf_is_not_enforced_for_api_requests(self):
+        middleware = CsrfViewMiddleware(self.view)
+
+        api_request = self.factory.post("/auth/signin/")
+        self.assertIsNone(middleware.process_view(api_request, self.view, (), {}))
+
+        browser_request = self.factory.post("/admin/login/")
+        response = middleware.process_view(browser_request, self.view, (), {})
+        self.assertEqual(response.status_code, 403)
+
+
+@skipIf(settings.API_ONLY, "API-only processes do not serve the schema")
+class OpenAPISchemaTestCase(SimpleTestCase):
+    def setUp(self):
+        self.schema_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.schema_dir.cleanup)
+        self.enterContext(
+            override_settings(
+                OPENAPI_SCHEMA={"DIR": self.schema_dir.name, "MAX_AGE": 60}
+            )
+        )
+        schema._documents.clear()
+        self.addCleanup(schema._documents.clear)
+
+    def test_schema_is_generated_once(self):
+        with mock.patch.object(
+            schema, "generate_schema", wraps=schema.generate_schema
+        ) as generate_schema:
+            first = self.client.get("/swagger.json/")
+            second = self.client.get("/swagger.json/")
+
+        self.assertEqual(generate_schema.call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertFalse(first["ETag"].startswith("W/"))
+        self.assertIn("max-age=60", first["Cache-Control"])
+
+    def test_artifact_is_served(self):
+        path = schema.write_schema(".json")
+
+        with mock.patch.object(schema, "generate_schema") as generate_schema:
+            response = self.client.get("/swagger.json/")
+
+        generate_schema.assert_not_called()
+        self.assertEqual(response.content, path.read_bytes())
+
+    def test_stale_artifact_is_not_served(self):
+        path = schema.write_schema(".json")
+        schema.get_version_path(".json").write_text("previous")
+
+        with mock.patch.object(
+            schema, "generate_schema", wraps=schema.generate_schema
+        ) as generate_schema, self.assertLogs("moviements.schema", "WARNING"):
+            self.client.get("/swagger.json/")
+
+        generate_schema.assert_called_once_with(".json")
+        self.assertTrue(path.exists())
+
+    def test_not_modified(self):
+        etag = self.client.get("/swagger.json/")["ETag"]
+
+        response = self.client.get("/swagger.json/", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        response = self.client.get("/swagger.json/", headers={"If-None-Match": '"x"'})
+        self.assertEqual(response.status_code, 200)
+
+
+class FastJSONTestCase(SimpleTestCase):
+    def assertRendersLikeDRF(self, data, accepted_media_type=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def test_scalars(self):
+        for value in (None, True, False, 0, -1, 2**63 - 1, 2**70, "", "ascii", 1.5):
+            self.assertRendersLikeDRF({"value": value})
+
+    def test_unicode(self):
+        self.assertRendersLikeDRF({"name": "Фильм 映画 🎬", "text": "a\u2028b\u2029c"})
+
+    def test_datetimes(self):
+        self.assertRendersLikeDRF(
+            [
+                datetime.datetime(2024, 4, 28, 11, 58, tzinfo=datetime.timezone.utc),
+                datetime.datetime(
+                    2024, 4, 28, 11, 58, 1, 123456, tzinfo=zoneinfo.ZoneInfo("UTC")
+                ),
+                datetime.datetime(
+                    2024, 4, 28, 11, 58, tzinfo=zoneinfo.ZoneInfo("Europe/Moscow")
+                ),
+                datetime.datetime(2024, 4, 28, 11, 58, 1, 5),
+                datetime.date(2024, 4, 28),
+                datetime.time(11, 58, 1),
+            ]
+        )
+
+    def test_fallback_types(self):
+        self.assertRendersLikeDRF(
+            {
+                "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+                "lazy": gettext_lazy("users"),
+                "decimal": decimal.Decimal("1.5"),
+                "timedelta": datetime.timedelta(minutes=5),
+                "tuple": (1, 2),
+                1: "int key",
+            }
+        )
+
+    def test_indent(self):
+        self.assertRendersLikeDRF({"a": [1, 2]}, "application/json; indent=4")
+
+    def test_serializer_data(self):
+        user_id = uuid.uuid4()
+        sessions = [
+            Session(
+                id=uuid.uuid4(),
+                user_id=user_id,
+                user_agent="Mozilla/5.0",
+                ip_address="127.0.0.1",
+                created_at=datetime.datetime(2024, 4, 28, tzinfo=datetime.timezone.utc),
+                updated_at=datetime.datetime(
+                    2024, 4, 28, 0, 0, 0, 42, tzinfo=datetime.timezone.utc
+                ),
+            )
+            for _ in range(3)
+        ]
+        self.assertRendersLikeDRF(
+            {"sessions": SessionSerializer(sessions, many=True).data}
+        )
+
+    def test_parser(self):
+        content = '{"username": "Пользователь", "tokens": ["a", "b"], "n": 1}'.encode()
+
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(content)),
+            JSONParser().parse(io.BytesIO(content)),
+        )
+
+        for invalid in (b"", b"{", b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(invalid))
+
+
+@override_settings(DATABASE_REPLICATION={"REPLICAS": ["replica1", "replica2"]})
+class PrimaryReplicaRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        token = allow_replica_reads()
+        self.addCleanup(reset_replica_reads, token)
+
+    def test_reads(self):
+        self.assertIn(self.router.db_for_read(Session), ["replica1", "replica2"])
+        self.assertEqual(self.router.db_for_write(Session), DEFAULT_DB_ALIAS)
+
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Session), DEFAULT_DB_ALIAS)
+        self.assertNotEqual(self.router.db_for_read(Session), DEFAULT_DB_ALIAS)
+
+    def test_reads_outside_requests(self):
+        self.assertEqual(
+            contextvars.Context().run(self.router.db_for_read, Session),
+            DEFAULT_DB_ALIAS,
+        )
+
+    def test_related_reads(self):
+        session = Session()
+        session._state.db = "replica2"
+        self.assertEqual(
+            self.router.db_for_read(CustomUser, instance=session), "replica2"
+        )
+
+    def test_sticky_primary(self):
+        user_id, other_user_id = str(uuid.uuid4()), str(uuid.uuid4())
+        stick_to_primary(user_id)
+
+        pin_primary_if_sticky(other_user_id)
+        self.assertNotEqual(self.router.db_for_read(Session), DEFAULT_DB_ALIAS)
+
+        pin_primary_if_sticky(user_id)
+        self.assertEqual(self.router.db_for_read(Session), DEFAULT_DB_ALIAS)
+
+
+@skipUnless(
+    settings.DATABASE_REPLICAS,
+    "Set MOVIEMENTS_DB_REPLICAS to route the reads to replicas",
+)
+class ReplicaReadsTestCase(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username="testuser",
+            email="testuser@moviements.ru",
+            password="testpassword",
+            is_active=True,
+        )
+
+    def request(self, method, path, token=None, data=None):
+        headers = {"User-Agent": "Mozilla/5.0"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return getattr(self.client, method)(
+            path, data, content_type="application/json", headers=headers
+        )
+
+    def test_replica_reads(self):
+        session = Session.create_for_user(self.user, "Mozilla/5.0", "127.0.0.1")
+        access_token, _ = session.create_token_pair()
+
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            self.assertEqual(
+                self.request("get", "/auth/sessions/", access_token).status_code, 200
+            )
+
+        # Only the session touch writes go to the primary
+        self.assertTrue(primary.captured_queries)
+        self.assertTrue(
+            all(query["sql"].startswith("UPDATE") for query in primary.captured_queries)
+        )
+
+    def test_read_your_writes(self):
+        tokens = self.request(
+            "post",
+            "/auth/signin/",
+            data={"username": "testuser", "password": "testpassword"},
+        ).json()
+
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            self.assertEqual(
+                self.request("get", "/auth/me/", tokens["access_token"]).status_code,
+                200,
+            )
+
+        self.assertTrue(
+            any(query["sql"].startswith("SELECT") for query in primary.captured_queries)
+        )
+
+    def test_revoked_token_reuse(self):
+        tokens = self.request(
+            "post",
+            "/auth/signin/",
+            data={"username": "testuser", "password": "testpassword"},
+        ).json()
+        # Revokes the access token, within the sticky window of the user
+        self.request("post", "/auth/refresh/", tokens["refresh_token"])
+
+        for url, status_code in (("/auth/me/", 403), ("/tokens/verify/", 401)):
+            with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+                self.assertEqual(
+                    self.request("get", url, tokens["access_token"]).status_code,
+                    status_code,
+                )
+
+            # The revocation check reads from the primary
+            self.assertTrue(
+                any(
+                    Blacklist._meta.db_table in query["sql"]
+                    for query in primary.captured_queries
+                )
+            )
+
+
+@override_settings(
+    DATABASE_SHARDING={
+        "SHARDS": ["shard0", "shard1"],
+        "MODELS": ["user_auth.Session", "tokens.Blacklist"],
+    }
+)
+class ShardRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.router = ShardRouter()
+
+    def test_shard_for(self):
+        user_ids = [uuid.uuid4() for _ in range(64)]
+        shards = [shard_for(user_id) for user_id in user_ids]
+
+        self.assertEqual(set(shards), {"shard0", "shard1"})
+        self.assertEqual(shards, [shard_for(str(user_id)) for user_id in user_ids])
+        self.assertEqual(shard_for(None), "shard0")
+
+    def test_routing(self):
+        user = CustomUser(id=uuid.uuid4())
+        session = Session(user=user)
+        shard = shard_for(user.pk)
+
+        self.assertEqual(self.router.db_for_write(Session, instance=session), shard)
+        self.assertEqual(self.router.db_for_read(Session, instance=user), shard)
+        self.assertEqual(Session.objects.for_user(user.pk).db, shard)
+        # Left to the next router
+        self.assertIsNone(self.router.db_for_read(Session))
+        self.assertIsNone(self.router.db_for_read(CustomUser, instance=session))
+
+    def test_migrations(self):
+        self.assertTrue(self.router.allow_migrate("shard1", "user_auth", "session"))
+        self.assertTrue(self.router.allow_migrate("shard1", "tokens", "blacklist"))
+        self.assertFalse(self.router.allow_migrate("shard1", "user_auth", "customuser"))
+        self.assertIsNone(
+            self.router.allow_migrate(DEFAULT_DB_ALIAS, "user_auth", "session")
+        )
+
+    def test_fan_out(self):
+        self.assertEqual(fan_out(str.upper), {"shard0": "SHARD0", "shard1": "SHARD1"})
+        self.assertEqual(fan_out(str.upper, ["shard1"]), {"shard1": "SHARD1"})
+
+
+@skipUnless(
+    len(settings.DATABASE_SHARDS) > 1,
+    "Set MOVIEMENTS_DB_SHARDS to spread the sessions across shards",
+)
+@override_settings(INTERNAL_API_KEYS=["internal-key"])
+class ShardingTestCase(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        # Users on two different shards
+        self.users = {}
+        for index in range(64):
+            user_id = uuid.uuid4()
+            self.users.setdefault(shard_for(user_id), user_id)
+        self.users = [
+            CustomUser.objects.create_user(
+                id=user_id,
+                username=f"testuser{index}",
+                email=f"testuser{index}@moviements.ru",
+                password="testpassword",
+                is_active=True,
+            )
+            for index, user_id in enumerate(list(self.users.values())[:2])
+        ]
+
+    def request(self, method, path, token=None, data=None):
+        headers = {"User-Agent": "Mozilla/5.0"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return getattr(self.client, method)(
+            path, data, content_type="application/json", headers=headers
+        )
+
+    def sign_in(self, user) -> dict:
+        return self.request(
+            "post",
+            "/auth/signin/",
+            data={"username": user.username, "password": "testpassword"},
+        ).json()
+
+    def test_sessions(self):
+        for user in self.users:
+            tokens = self.sign_in(user)
+            shard = shard_for(user.pk)
+
+            self.assertEqual(
+                Session.objects.using(shard).filter(user_id=user.pk).count(), 1
+            )
+            self.assertFalse(Session.objects.using(DEFAULT_DB_ALIAS).exists())
+
+            self.assertEqual(
+                self.request("get", "/auth/me/", tokens["access_token"]).status_code,
+                200,
+            )
+            response = self.request("get", "/auth/sessions/", tokens["access_token"])
+            self.assertEqual(len(response.json()["sessions"]), 1)
+
+            refreshed = self.request("post", "/auth/refresh/", tokens["refresh_token"])
+            self.assertEqual(refreshed.status_code, 200)
+            self.assertEqual(
+                Blacklist.objects.using(shard).filter(user_id=user.pk).count(), 2
+            )
+            self.assertEqual(
+                self.request("get", "/auth/me/", tokens["access_token"]).status_code,
+                403,
+            )
+
+            response = self.request(
+                "get", "/tokens/verify/", refreshed.json()["access_token"]
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["X-Auth-Username"], user.username)
+
+    def test_introspection(self):
+        tokens = [self.sign_in(user)["access_token"] for user in self.users]
+        results = introspect_tokens(tokens)
+
+        self.assertTrue(all(result["active"] for result in results))
+        self.assertEqual(
+            [result["username"] for result in results],
+            [user.username for user in self.users],
+        )
+
+    def test_user_deletion(self):
+        user = self.users[0]
+        self.sign_in(user)
+        user.delete()
+
+        self.assertFalse(Session.objects.for_user(user.pk).exists())
+
+    def test_admin(self):
+        admin = CustomUser.objects.create_superuser(
+            username="admin", email="admin@moviements.ru", password="adminpassword"
+        )
+        self.client.force_login(admin)
+        sessions = [
+            Session.create_for_user(user, "Mozilla/5.0", "127.0.0.1")
+            for user in self.users
+        ]
+
+        for session in sessions:
+            shard = shard_for(session.user_id)
+            response = self.client.get(f"/admin/user_auth/session/?shard={shard}")
+            self.assertContains(response, str(session.pk))
+
+            response = self.client.get(f"/admin/user_auth/session/{session.pk}/change/")
+            self.assertEqual(response.status_code, 200)
+
+            response = self.client.get(
+                f"/admin/user_auth/customuser/{session.user_id}/change/"
+            )
+            self.assertContains(response, session.user_agent)
+
+        response = self.client.get("/admin/user_auth/customuser/")
+        for session in sessions:
+            self.assertContains(response, f"?user__id__exact={session.user_id}")
+
+
+class SQLiteBackendTestCase(SimpleTestCase):
+    def connect(self, **options):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f"{directory.name}/db.sqlite3"
+
+        connection = ConnectionHandler(
+            {
+                "default": {
+                    "ENGINE": "moviements.db.backends.sqlite3",
+                    "NAME": self.path,
+                    "OPTIONS": options,
+                }
+            }
+        )["default"]
+        self.addCleanup(connection.close)
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY)")
+        return connection
+
+    def lock(self) -> sqlite3.Connection:
+        locker = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False
+        )
+        self.addCleanup(locker.close)
+        locker.execute("BEGIN IMMEDIATE")
+        return locker
+
+    def pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        connection = self.connect(pragmas={"cache_size": -1000, "mmap_size": None})
+
+        self.assertEqual(self.pragma(connection, "journal_mode"), "wal")
+        self.assertEqual(self.pragma(connection, "synchronous"), 1)
+        self.assertEqual(self.pragma(connection, "busy_timeout"), 5000)
+        self.assertEqual(self.pragma(connection, "cache_size"), -1000)
+        self.assertEqual(self.pragma(connection, "mmap_size"), 0)
+
+    def test_lock_retries(self):
+        connection = self.connect(pragmas={"busy_timeout": 0}, lock_retries=10)
+        locker = self.lock()
+        threading.Timer(0.05, locker.rollback).start()
+
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO item VALUES (1)")
+            cursor.execute("SELECT COUNT(*) FROM item")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_lock_retries_exhausted(self):
+        connection = self.connect(pragmas={"busy_timeout": 0}, lock_retries=1)
+        self.lock()
+
+        with self.assertRaisesMessage(OperationalError, "database is locked"):
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO item VALUES (1)")
+
+
+class HexConverter:
+    regex = "[0-9a-f]+"
+
+    def to_python(self, value):
+        return int(value, 16)
+
+    def to_url(self, value):
+        return f"{value:x}"
+
+
+class WarmUpTestCase(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(warmup, "_warm_up_duration", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_readiness(self):
+        response = self.client.get("/ready/")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {"ready": False})
+
+        with mock.patch.object(schema, "get_schema_document") as get_schema_document:
+            warmup.warm_up()
+            warmup.warm_up()
+        if settings.API_ONLY:
+            get_schema_document.assert_not_called()
+        else:
+            get_schema_document.assert_called_once_with(".json")
+
+        response = self.client.get("/ready/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["ready"])
+
+    def test_prepare_fork(self):
+        warmup.open_connections()
+        with mock.patch("gc.freeze") as freeze, mock.patch.object(
+            warmup.connections, "close_all"
+        ) as close_all:
+            warmup.prepare_fork()
+        freeze.assert_called_once_with()
+        close_all.assert_called_once_with()
+
+    @override_settings(MONITORING={"TRACING": True, "TRACING_EXPORTER": "memory"})
+    def test_post_fork_exports_spans(self):
+        with mock.patch("gc.disable"):
+            config = runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))
+        # As the preloaded master does when it builds the middleware chain
+        tracing.configure_tracing()
+        processor = tracing.get_span_processor()
+        span = tracing.Span(
+            name="worker",
+            trace_id="0" * 32,
+            span_id="1" * 16,
+            parent_id=None,
+            start_time=0,
+        )
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            exported = ""
+            try:
+                with mock.patch.object(warmup, "open_connections"):
+                    config["post_fork"](None, None)
+                processor.on_end(span)
+                # Exported by the thread of the worker, without force_flush
+                deadline = time.monotonic() + 5
+                while not processor.exporter.spans and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                exported = ",".join(span.name for span in processor.exporter.spans)
+            finally:
+                os.write(write_fd, exported.encode())
+                os._exit(0)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd) as file:
+            exported = file.read()
+        os.waitpid(pid, 0)
+        self.assertEqual(exported, "worker")
+
+    def test_route_samples(self):
+        self.assertEqual(
+            warmup.get_sample_kwargs(path("items/<int:pk>/<uuid:key>/", HttpResponse)),
+            {"pk": "1", "key": "00000000-0000-0000-0000-000000000000"},
+        )
+
+        register_converter(HexConverter, "hex")
+        self.assertIsNone(
+            warmup.get_sample_kwargs(path("items/<hex:value>/", HttpResponse))
+        )
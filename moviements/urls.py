@@ -1,35 +1,33 @@
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Moviements API",
-        default_version="v1",
-        # description="Test description",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="tinytengu@yandex.ru"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from .warmup import readiness_view
 
 urlpatterns = [
-    # Swagger
-    path(
-        "swagger<format>/", schema_view.without_ui(cache_timeout=0), name="schema-json"
-    ),
-    path(
-        "swagger/",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
-    path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
     # Apps
-    path("admin/", admin.site.urls),
     path("auth/", include("user_auth.urls")),
+    path("tokens/", include("tokens.urls")),
+    path("", include("monitoring.urls")),
+    path("ready/", readiness_view, name="ready"),
 ]
+
+# Left out of API-only processes, along with their imports (see settings.API_ONLY)
+if not settings.API_ONLY:
+    from django.contrib import admin
+
+    from .schema import schema_view, schema_document_view
+
+    urlpatterns = [
+        # Swagger
+        path("swagger<format>/", schema_document_view, name="schema-json"),
+        path(
+            "swagger/",
+            schema_view.with_ui("swagger", cache_timeout=0),
+            name="schema-swagger-ui",
+        ),
+        path(
+            "redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"
+        ),
+        path("admin/", admin.site.urls),
+        *urlpatterns,
+    ]
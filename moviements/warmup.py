@@ -0,0 +1,200 @@
+"""
+Warm-up of the worker processes.
+
+URL resolvers, DRF settings and view configuration, serializers, password hashers, the
+JWT code paths and database connections are otherwise initialized lazily, by the first
+requests each worker serves. warm_up() does it ahead of time: it runs when the WSGI or
+ASGI application is created, so in the gunicorn master with preload_app (see
+gunicorn.conf.py), before the workers are forked. Everything it initializes is then
+shared by the workers, and prepare_fork() freezes it out of the garbage collector so that
+collections in the workers do not write to (and copy) the shared pages. The database
+connections cannot be shared: they are closed before forking and opened again by
+open_connections() in every worker.
+
+The readiness endpoint answers 503 until warm-up is finished.
+"""
+
+import gc
+import logging
+import threading
+import time
+import uuid
+from importlib import import_module
+from typing import Optional
+
+from django.contrib.auth.hashers import get_hasher
+from django.db import connections
+from django.http import HttpRequest, JsonResponse
+from django.urls import (
+    NoReverseMatch,
+    Resolver404,
+    URLPattern,
+    converters,
+    get_resolver,
+    resolve,
+    reverse,
+)
+
+from rest_framework.serializers import BaseSerializer
+from rest_framework.views import APIView
+
+from tokens.jwt import decode_token, generate_token_pair
+from tokens.models import Blacklist
+
+logger = logging.getLogger(__name__)
+
+# Resolved and instantiated route by route
+URLCONFS = ("user_auth.urls", "tokens.urls")
+SERIALIZER_MODULES = ("user_auth.serializers", "tokens.serializers")
+# Route arguments reversed by warm_up_routes, by path converter
+CONVERTER_SAMPLES = {
+    converters.IntConverter: "1",
+    converters.StringConverter: "warm-up",
+    converters.SlugConverter: "warm-up",
+    converters.UUIDConverter: str(uuid.UUID(int=0)),
+    converters.PathConverter: "warm-up",
+}
+
+_lock = threading.Lock()
+_warm_up_duration: Optional[float] = None
+
+
+def is_warmed_up() -> bool:
+    return _warm_up_duration is not None
+
+
+def get_sample_kwargs(pattern: URLPattern) -> Optional[dict[str, str]]:
+    """
+    Returns arguments for every converter of the route, or None if one of its converters
+    has no sample in CONVERTER_SAMPLES.
+    """
+    kwargs = {}
+    for name, converter in pattern.pattern.converters.items():
+        sample = CONVERTER_SAMPLES.get(type(converter))
+        if sample is None:
+            return None
+        kwargs[name] = sample
+    return kwargs
+
+
+def warm_up_routes() -> None:
+    """
+    Populates the URL resolvers, then reverses and resolves every named route of URLCONFS
+    and loads the renderers, parsers, authenticators and permissions of their views.
+    Routes that cannot be reversed with the CONVERTER_SAMPLES arguments are skipped.
+    """
+    resolver = get_resolver()
+    # Populated for every namespace and language on first access
+    resolver.reverse_dict
+    resolver.namespace_dict
+
+    for urlconf in URLCONFS:
+        for pattern in get_resolver(urlconf).url_patterns:
+            if not isinstance(pattern, URLPattern) or pattern.name is None:
+                continue
+            kwargs = get_sample_kwargs(pattern)
+            if kwargs is None:
+                logger.debug("Not warming up the %s route", pattern.name)
+                continue
+            try:
+                match = resolve(reverse(pattern.name, kwargs=kwargs))
+            except (NoReverseMatch, Resolver404):
+                logger.debug("Not warming up the %s route", pattern.name)
+                continue
+
+            view_class = getattr(match.func, "cls", None)
+            if view_class is not None and issubclass(view_class, APIView):
+                view = view_class(**getattr(match.func, "initkwargs", {}))
+                view.get_renderers()
+                view.get_parsers()
+                view.get_authenticators()
+                view.get_permissions()
+                view.get_content_negotiator()
+
+
+def warm_up_serializers() -> None:
+    """
+    Builds the fields of every serializer of SERIALIZER_MODULES.
+    """
+    for module_name in SERIALIZER_MODULES:
+        module = import_module(module_name)
+        for value in vars(module).values():
+            if (
+                isinstance(value, type)
+                and issubclass(value, BaseSerializer)
+                and value.__module__ == module_name
+            ):
+                value().fields
+
+
+def warm_up_tokens() -> None:
+    """
+    Runs the token code paths once: the JWT algorithm and signing key, the blacklist
+    digest and the default password hasher.
+    """
+    access_token, refresh_token = generate_token_pair({"session_id": str(uuid.uuid4())})
+    decode_token(access_token)
+    decode_token(refresh_token)
+    Blacklist.digest(refresh_token)
+    get_hasher()
+
+
+def warm_up_schema() -> None:
+    # Left out of API-only processes
+    try:
+        reverse("schema-json", kwargs={"format": ".json"})
+    except NoReverseMatch:
+        return
+
+    from .schema import get_schema_document
+
+    get_schema_document(".json")
+
+
+def open_connections() -> None:
+    """
+    Connects to every database of the current thread.
+    """
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def warm_up() -> None:
+    """
+    Initializes the process ahead of its first request. Runs once per process: the
+    forked workers inherit the warm-up of the master.
+    """
+    global _warm_up_duration
+
+    with _lock:
+        if _warm_up_duration is not None:
+            return
+
+        start = time.perf_counter()
+        warm_up_routes()
+        warm_up_serializers()
+        warm_up_tokens()
+        warm_up_schema()
+        open_connections()
+        _warm_up_duration = time.perf_counter() - start
+
+    logger.info("Warmed up in %.0f ms", _warm_up_duration * 1000)
+
+
+def prepare_fork() -> None:
+    """
+    Closes the database connections and moves every object to the permanent generation
+    of the garbage collector, right before forking a worker.
+    """
+    connections.close_all()
+    gc.freeze()
+
+
+def readiness_view(request: HttpRequest) -> JsonResponse:
+    """
+    Answers 200 once the process is warmed up, 503 before.
+    """
+    duration = _warm_up_duration
+    if duration is None:
+        return JsonResponse({"ready": False}, status=503)
+    return JsonResponse({"ready": True, "warm_up_ms": round(duration * 1000, 1)})
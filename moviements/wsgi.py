@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moviements.settings')
 
 application = get_wsgi_application()
+
+# See moviements/warmup.py
+from moviements.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -1,10 +1,15 @@
+import uuid
+
 from django.contrib import admin
+from django.db.models import Q
+
+from moviements.db.admin import EstimatedCountPaginator, ShardedModelAdmin
 
 from .models import Blacklist
 
 
 @admin.register(Blacklist)
-class BlacklistAdmin(admin.ModelAdmin):
+class BlacklistAdmin(ShardedModelAdmin):
     list_display = (
         "id",
         "token_type",
@@ -15,8 +20,30 @@ class BlacklistAdmin(admin.ModelAdmin):
     )
     readonly_fields = (
         "id",
+        "user_id",
+        "token_digest",
         "created_at",
         "updated_at",
     )
     list_filter = ("token_type",)
-    search_fields = ("token", "token_type")
+    search_fields = ("=token_digest",)
+    search_help_text = "Token, token SHA-256 digest, entry id or user id"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        try:
+            search_id = uuid.UUID(search_term)
+        except ValueError:
+            # Exact matches of the indexed digest, never a scan of the tokens
+            return (
+                queryset.filter(
+                    token_digest__in={search_term, Blacklist.digest(search_term)}
+                ),
+                False,
+            )
+        return queryset.filter(Q(pk=search_id) | Q(user_id=search_id)), False
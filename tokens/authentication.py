@@ -1,14 +1,23 @@
 from dataclasses import dataclass
 
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils import timezone
+from django.utils.translation import gettext as _
 
 from rest_framework.authentication import BaseAuthentication, get_authorization_header
 from rest_framework import exceptions
 from rest_framework.request import Request
 
-from user_auth.models import Session
+from monitoring.metrics import FINGERPRINT_MISMATCH_TOTAL
+from monitoring.timing import phase
+from moviements.db.routers import pin_primary_if_sticky
+from moviements.db.sharding import is_sharded
+from user_auth.audit import record_auth_event
+from user_auth.models import AuthEvent, Session
 
 from .jwt import decode_token, get_token_type
+from .jwt.config import get_session_touch_interval
 from .jwt.types import TokenType
 from .models import Blacklist
 
@@ -24,6 +33,109 @@ class AuthenticationData:
         return decode_token(self.token)
 
 
+def read_token(token: str) -> dict:
+    """
+    Decodes the token, without checking whether it is revoked (see check_token_revocation).
+
+    Parameters:
+        token (str): The token to decode.
+
+    Returns:
+        dict: The decoded token payload.
+
+    Raises:
+        exceptions.AuthenticationFailed: If the token is invalid or expired.
+    """
+    try:
+        with phase("jwt_decode"):
+            return decode_token(token)
+    except Exception:
+        raise exceptions.AuthenticationFailed("Invalid or expired token")
+
+
+def check_token_revocation(token: str, token_payload: dict) -> None:
+    """
+    Checks that the token is not revoked. Runs after pin_primary_if_sticky, so that the
+    revocation by a sign-out or a refresh is read from the primary within the sticky
+    window, rather than missed on a lagging replica.
+
+    Parameters:
+        token (str): The token to check.
+        token_payload (dict): The decoded token payload.
+
+    Raises:
+        exceptions.AuthenticationFailed: If the token is revoked.
+    """
+    with phase("revocation_check"):
+        revoked = Blacklist.is_revoked(token, token_payload.get("user_id"))
+    if revoked:
+        raise exceptions.AuthenticationFailed("Invalid or expired token")
+
+
+def get_token_session(token: str) -> tuple[dict, Session]:
+    """
+    Verifies the token and resolves its session and user.
+
+    Parameters:
+        token (str): The token to verify.
+
+    Returns:
+        tuple[dict, Session]: The decoded token payload and the token session.
+
+    Raises:
+        exceptions.AuthenticationFailed: If the token, the session or the user is not valid.
+    """
+    token_payload = read_token(token)
+    pin_primary_if_sticky(token_payload.get("user_id"))
+    check_token_revocation(token, token_payload)
+
+    sessions = Session.objects.for_user(token_payload.get("user_id"))
+    if not is_sharded(Session):
+        sessions = sessions.select_related("user")
+
+    try:
+        with phase("session_lookup"):
+            token_session = sessions.get(id=str(token_payload.get("session_id")))
+            # A sharded session is not on the database of its user: one more query
+            user = token_session.user
+    except (
+        Session.DoesNotExist,
+        Session.user.RelatedObjectDoesNotExist,
+        ValidationError,
+    ):
+        raise exceptions.AuthenticationFailed("Invalid session")
+
+    if user.is_active is False:
+        raise exceptions.AuthenticationFailed("User is inactive")
+
+    return token_payload, token_session
+
+
+def touch_session(session: Session) -> None:
+    """
+    Updates the session activity timestamp and the user last login.
+    Both are written at most once per SESSION_TOUCH_INTERVAL, so that consecutive
+    requests do not write to the database (nor change the user and session representations).
+
+    Parameters:
+        session (Session): The session to touch. Its user must be loaded.
+    """
+    now = timezone.now()
+    interval = get_session_touch_interval()
+
+    with phase("session_touch"):
+        if now - session.updated_at >= interval:
+            Session.objects.for_user(session.user_id).filter(pk=session.pk).update(
+                updated_at=now
+            )
+            session.updated_at = now
+
+        user = session.user
+        if user.last_login is None or now - user.last_login >= interval:
+            type(user).objects.filter(pk=user.pk).update(last_login=now)
+            user.last_login = now
+
+
 class JWTAuthentication(BaseAuthentication):
     def authenticate(self, request: Request):
         header = get_authorization_header(request)
@@ -35,35 +147,39 @@ class JWTAuthentication(BaseAuthentication):
         if not token:
             return None
 
-        try:
-            token_payload = decode_token(token)
-        except Exception:
-            raise exceptions.AuthenticationFailed("Invalid or expired token")
-
-        if Blacklist.objects.filter(token=token):
-            raise exceptions.AuthenticationFailed("Invalid or expired token")
-
-        try:
-            token_session = Session.objects.get(id=str(token_payload.get("session_id")))
-        except Session.DoesNotExist:
-            raise exceptions.AuthenticationFailed("Invalid session")
-
-        if token_session.user.is_active is False:
-            raise exceptions.AuthenticationFailed("User is inactive")
-
-        token_session.save()
-        token_session.user.last_login = timezone.now()
-        token_session.user.save()
-
-        if (
-            token_session.user_agent != request.META["HTTP_USER_AGENT"]
-            or token_session.ip_address != request.META["REMOTE_ADDR"]
-        ):
-            token_session.delete()
+        token_payload, token_session = get_token_session(token)
+
+        if token_session.user_agent != request.META.get(
+            "HTTP_USER_AGENT"
+        ) or token_session.ip_address != request.META.get("REMOTE_ADDR"):
+            FINGERPRINT_MISMATCH_TOTAL.inc()
+            record_auth_event(
+                AuthEvent.Type.FINGERPRINT_MISMATCH,
+                request,
+                user_id=token_session.user_id,
+                session_id=token_session.pk,
+                session_user_agent=token_session.user_agent,
+                session_ip_address=token_session.ip_address,
+            )
+            with transaction.atomic():
+                token_session.user.email_user(
+                    _("Session terminated"),
+                    _(
+                        "Your session from %(user_agent)s (%(ip_address)s) was used "
+                        "from another device and has been terminated."
+                    )
+                    % {
+                        "user_agent": token_session.user_agent,
+                        "ip_address": token_session.ip_address,
+                    },
+                )
+                token_session.delete()
             raise exceptions.AuthenticationFailed(
                 "Invalid session fingerprint. Logged out."
             )
 
+        touch_session(token_session)
+
         payload = AuthenticationData(
             token=token, session=token_session, token_type=get_token_type(token)
         )
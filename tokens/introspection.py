@@ -0,0 +1,121 @@
+import uuid
+from typing import Any
+
+from moviements.db.sharding import fan_out, is_sharded, shard_for
+from user_auth.models import CustomUser, Session
+
+from .jwt import decode_token
+from .models import Blacklist
+
+__all__ = ["introspect_tokens"]
+
+
+def _parse_session_id(payload: dict) -> str | None:
+    try:
+        return str(uuid.UUID(str(payload.get("session_id"))))
+    except ValueError:
+        return None
+
+
+def introspect_tokens(tokens: list[str]) -> list[dict]:
+    """
+    Introspects a batch of tokens (in the spirit of RFC 7662).
+
+    Revocation and session state of the whole batch are resolved with two set-based queries,
+    whatever the number of tokens. With sharding, each shard holding some of the tokens is
+    queried in parallel, and the users are then resolved with one more query.
+
+    Parameters:
+        tokens (list[str]): The tokens to introspect.
+
+    Returns:
+        list[dict]: One result per token, in the same order. Inactive tokens are reported as {"active": False} only.
+    """
+    payloads = {}
+    shard_tokens: dict[str, list[str]] = {}
+    for token in set(tokens):
+        try:
+            payloads[token] = decode_token(token)
+        except Exception:
+            continue
+        shard_tokens.setdefault(shard_for(payloads[token].get("user_id")), []).append(
+            token
+        )
+
+    sharded = is_sharded(Session)
+
+    def introspect_shard(alias: str) -> tuple[set[str], list[tuple]]:
+        digests = {Blacklist.digest(token): token for token in shard_tokens[alias]}
+        revoked = {
+            digests[digest]
+            for digest in Blacklist.objects.for_shard(alias)
+            .filter(token_digest__in=digests)
+            .values_list("token_digest", flat=True)
+        }
+        session_ids = {
+            _parse_session_id(payloads[token])
+            for token in shard_tokens[alias]
+            if token not in revoked
+        } - {None}
+        fields: tuple[str, ...] = ("id", "user_id")
+        if not sharded:
+            fields += ("user__username", "user__is_active")
+        sessions = list(
+            Session.objects.for_shard(alias)
+            .filter(id__in=session_ids)
+            .values_list(*fields)
+        )
+        return revoked, sessions
+
+    revoked, session_rows = set(), []
+    if shard_tokens:
+        for shard_revoked, shard_sessions in fan_out(
+            introspect_shard, list(shard_tokens)
+        ).values():
+            revoked |= shard_revoked
+            session_rows += shard_sessions
+
+    if sharded:
+        users = {
+            user_id: (username, is_active)
+            for user_id, username, is_active in CustomUser.objects.filter(
+                pk__in={user_id for _, user_id in session_rows}
+            ).values_list("id", "username", "is_active")
+        }
+        session_rows = [
+            (session_id, user_id, *users[user_id])
+            for session_id, user_id in session_rows
+            if user_id in users
+        ]
+
+    sessions = {
+        str(session_id): (user_id, username, is_active)
+        for session_id, user_id, username, is_active in session_rows
+    }
+
+    results: list[dict[str, Any]] = []
+    for token in tokens:
+        payload = payloads.get(token)
+        session_id = _parse_session_id(payload) if payload else None
+        if payload is None or token in revoked or session_id not in sessions:
+            results.append({"active": False})
+            continue
+
+        user_id, username, is_active = sessions[session_id]
+        if not is_active:
+            results.append({"active": False})
+            continue
+
+        results.append(
+            {
+                "active": True,
+                "token_type": payload.get("type"),
+                "exp": payload.get("exp"),
+                "iat": payload.get("iat"),
+                "sub": str(user_id),
+                "username": username,
+                "session_id": session_id,
+            }
+        )
+
+    return results
@@ -61,3 +61,25 @@ def get_refresh_token_lifetime() -> datetime.timedelta:
         datetime.timedelta: The lifetime of the refresh token in days and minutes.
     """
     return get_jwt_config("REFRESH_TOKEN_LIFETIME", datetime.timedelta(days=30))
+
+
+def get_forward_auth_path() -> str:
+    """
+    get_forward_auth_path function retrieves the value of the "FORWARD_AUTH_PATH" configuration from the JWT_CONFIG dictionary in Django settings.
+    If the key is not found, it returns the default value, which is "/tokens/verify/".
+
+    Returns:
+        str: The request path answered by the forward-auth middleware.
+    """
+    return get_jwt_config("FORWARD_AUTH_PATH", "/tokens/verify/")
+
+
+def get_session_touch_interval() -> datetime.timedelta:
+    """
+    get_session_touch_interval function retrieves the value of the "SESSION_TOUCH_INTERVAL" configuration from the JWT_CONFIG dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 1 minute.
+
+    Returns:
+        datetime.timedelta: The minimal delay between two writes of the session activity and user last login timestamps.
+    """
+    return get_jwt_config("SESSION_TOUCH_INTERVAL", datetime.timedelta(minutes=1))
@@ -1,3 +1,5 @@
+import uuid
+
 import jwt
 from typing import Optional
 
@@ -26,6 +28,8 @@ def generate_access_token(payload: Optional[dict] = None) -> str:
         "type": TokenType.ACCESS.value,
         "exp": timezone.now() + get_access_token_lifetime(),
         "iat": timezone.now(),
+        # Unique even for tokens issued within the same second (exp and iat have a one second resolution)
+        "jti": uuid.uuid4().hex,
     } | (payload or {})
 
     access_token = jwt.encode(
@@ -52,6 +56,8 @@ def generate_refresh_token(access_token: str, payload: Optional[dict] = None) ->
         "type": TokenType.REFRESH.value,
         "exp": timezone.now() + get_refresh_token_lifetime(),
         "iat": timezone.now(),
+        # See generate_access_token
+        "jti": uuid.uuid4().hex,
     } | payload
 
     refresh_token = jwt.encode(
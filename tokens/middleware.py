@@ -0,0 +1,20 @@
+from .jwt.config import get_forward_auth_path
+from .views import forward_auth
+
+
+class ForwardAuthMiddleware:
+    """
+    Serves the forward-auth endpoint ahead of the rest of the middleware stack.
+
+    Must come before the session, CSRF, authentication and messages middleware,
+    which are skipped entirely for forward-auth requests.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.path = get_forward_auth_path()
+
+    def __call__(self, request):
+        if request.path_info == self.path:
+            return forward_auth(request)
+        return self.get_response(request)
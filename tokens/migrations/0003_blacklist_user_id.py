@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tokens', '0002_alter_blacklist_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blacklist',
+            name='user_id',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_token_digests(apps, schema_editor):
+    Blacklist = apps.get_model("tokens", "Blacklist")
+    entries = Blacklist.objects.using(schema_editor.connection.alias)
+
+    batch = []
+    for entry in entries.only("id", "token").iterator(chunk_size=2000):
+        entry.token_digest = hashlib.sha256(entry.token.encode()).hexdigest()
+        batch.append(entry)
+        if len(batch) == 2000:
+            entries.bulk_update(batch, ["token_digest"])
+            batch = []
+    entries.bulk_update(batch, ["token_digest"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tokens', '0003_blacklist_user_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blacklist',
+            name='token_digest',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        # The hint also runs it on the shards (see moviements.db.sharding.ShardRouter)
+        migrations.RunPython(
+            fill_token_digests,
+            migrations.RunPython.noop,
+            hints={"model_name": "blacklist"},
+        ),
+    ]
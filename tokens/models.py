@@ -1,27 +1,64 @@
+import hashlib
 import uuid
 from datetime import datetime
+from typing import ClassVar, Optional
 
 from django.db import models
 from django.utils import timezone
 
+from moviements.db.sharding import ShardedManager
 from tokens.jwt.types import TokenType
 from tokens.jwt import decode_token, decode_token_no_exp, get_token_type
 
 
 class Blacklist(models.Model):
-    objects: models.Manager["Blacklist"]
+    objects: ClassVar[ShardedManager] = ShardedManager()
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     token_type = models.CharField(max_length=255, blank=False, null=False)
     token = models.TextField(max_length=1024, blank=False, null=False)
+    # Fixed-size indexed key of the token, set on save (see digest)
+    token_digest = models.CharField(max_length=64, db_index=True, editable=False)
     expires_at = models.DateTimeField(blank=False, null=False)
+    # The owner of the token, whose shard holds the entry (see moviements.db.sharding)
+    user_id = models.UUIDField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @staticmethod
+    def digest(token: str) -> str:
+        """
+        Returns the SHA-256 hex digest of the token, the key of the blacklist lookups.
+        """
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.token_digest = self.digest(self.token)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def is_revoked(cls, token: str, user_id: Optional[str] = None) -> bool:
+        """
+        Checks whether the token has been blacklisted.
+
+        Parameters:
+            token (str): The token to check.
+            user_id (str, optional): The owner of the token (its "user_id" claim).
+
+        Returns:
+            bool: True if the token is blacklisted.
+        """
+        return (
+            cls.objects.for_user(user_id)
+            .filter(token_digest=cls.digest(token))
+            .exists()
+        )
+
     @classmethod
     def from_token(cls, token: str, verify_exp: bool = False):
         payload = decode_token_no_exp(token)
-        cls.objects.create(
+        cls.objects.for_user(payload.get("user_id")).create(
+            user_id=payload.get("user_id"),
             token=token,
             token_type=get_token_type(token).value,
             expires_at=datetime.fromtimestamp(payload.get("exp", 0)),
@@ -30,8 +67,11 @@ class Blacklist(models.Model):
     @classmethod
     def blacklist_refresh_token(cls, refresh_token: str):
         refresh_token_payload = decode_token_no_exp(refresh_token)
+        user_id = refresh_token_payload.get("user_id")
+        blacklist = cls.objects.for_user(user_id)
 
-        cls.objects.create(
+        blacklist.create(
+            user_id=user_id,
             token=refresh_token,
             token_type=TokenType.REFRESH.value,
             expires_at=datetime.fromtimestamp(
@@ -43,7 +83,8 @@ class Blacklist(models.Model):
             access_token = str(refresh_token_payload.get("access_token"))
             access_token_payload = decode_token(access_token)
 
-            cls.objects.create(
+            blacklist.create(
+                user_id=user_id,
                 token=access_token,
                 token_type=TokenType.ACCESS.value,
                 expires_at=datetime.fromtimestamp(
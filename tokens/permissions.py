@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework.permissions import BasePermission
 
 from .jwt.types import TokenType
@@ -27,3 +30,25 @@ class IsAccessToken(BasePermission):
             return True
 
         return obj.get_owner() == request.user
+
+
+class IsStaff(BasePermission):
+    """A custom permission class that checks if the user is a staff member."""
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_staff)
+
+
+class HasInternalAPIKey(BasePermission):
+    """A custom permission class that checks the X-API-Key header against INTERNAL_API_KEYS."""
+
+    def has_permission(self, request, view):
+        api_key = request.headers.get("X-API-Key")
+        if not api_key:
+            return False
+
+        # compare_digest only accepts ASCII strings, and headers are decoded as latin-1
+        return any(
+            hmac.compare_digest(api_key.encode(), key.encode())
+            for key in getattr(settings, "INTERNAL_API_KEYS", ())
+        )
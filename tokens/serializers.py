@@ -4,3 +4,9 @@ from rest_framework import serializers
 class TokenPairSerializer(serializers.Serializer):
     access_token = serializers.CharField()
     refresh_token = serializers.CharField()
+
+
+class IntrospectionRequestSerializer(serializers.Serializer):
+    tokens = serializers.ListField(
+        child=serializers.CharField(), allow_empty=False, max_length=1000
+    )
@@ -1,4 +1,7 @@
-from django.test import TestCase
+from unittest import skipIf
+
+from django.conf import settings
+from django.test import TestCase, override_settings
 
 from .jwt import (
     generate_token_pair,
@@ -8,6 +11,10 @@ from .jwt import (
     get_token_type,
 )
 from .jwt.types import TokenType
+from .introspection import introspect_tokens
+from .models import Blacklist
+
+from user_auth.models import CustomUser, Session
 
 
 class TokensTestCase(TestCase):
@@ -31,3 +38,173 @@ class TokensTestCase(TestCase):
         self.assertIsInstance(token_pair, tuple)
         self.assertIsInstance(token_pair[0], str)
         self.assertIsInstance(token_pair[1], str)
+
+    def test_token_pairs_are_unique(self):
+        # Pairs issued within the same second must differ, or refreshing would
+        # return the tokens it has just blacklisted
+        payload = {"session_id": "session"}
+        self.assertNotEqual(generate_token_pair(payload), generate_token_pair(payload))
+
+    def test_jti_claim(self):
+        access_token, refresh_token = generate_token_pair()
+        access_jti = decode_token(access_token)["jti"]
+        refresh_jti = decode_token(refresh_token)["jti"]
+
+        self.assertEqual(len(access_jti), 32)
+        self.assertNotEqual(access_jti, refresh_jti)
+
+    def test_refresh_right_after_sign_in(self):
+        user = CustomUser.objects.create_user(
+            username="testuser", email="testuser@moviements.ru", is_active=True
+        )
+        _, refresh_token = Session.create_for_user(
+            user, "Mozilla/5.0", "127.0.0.1"
+        ).create_token_pair()
+        headers = {"User-Agent": "Mozilla/5.0"}
+
+        response = self.client.post(
+            "/auth/refresh/",
+            headers={**headers, "Authorization": f"Bearer {refresh_token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        # Issued within the same second, the new pair must not be the one just revoked
+        self.assertNotEqual(response.json()["refresh_token"], refresh_token)
+
+        response = self.client.get(
+            "/auth/me/",
+            headers={
+                **headers,
+                "Authorization": f"Bearer {response.json()['access_token']}",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class ForwardAuthTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username="testuser", email="testuser@moviements.ru", is_active=True
+        )
+        self.session = Session.create_for_user(self.user, "Mozilla/5.0", "127.0.0.1")
+        self.access_token, self.refresh_token = self.session.create_token_pair()
+
+    def verify(self, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return self.client.get("/tokens/verify/", headers=headers)
+
+    def test_valid_access_token(self):
+        response = self.verify(self.access_token)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Auth-User-Id"], str(self.user.id))
+        self.assertEqual(response["X-Auth-Username"], self.user.username)
+        self.assertEqual(response["X-Auth-Session-Id"], str(self.session.id))
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.verify(self.access_token).status_code, 200)
+
+    def test_invalid_tokens(self):
+        self.assertEqual(self.verify().status_code, 401)
+        self.assertEqual(self.verify("invalid").status_code, 401)
+        self.assertEqual(self.verify(self.refresh_token).status_code, 401)
+
+    def test_revoked_token(self):
+        Blacklist.blacklist_refresh_token(self.refresh_token)
+        self.assertEqual(self.verify(self.access_token).status_code, 401)
+
+    def test_deleted_session(self):
+        self.session.delete()
+        self.assertEqual(self.verify(self.access_token).status_code, 401)
+
+    def test_inactive_user(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.verify(self.access_token).status_code, 401)
+
+
+@override_settings(INTERNAL_API_KEYS=["internal-key"])
+class IntrospectionTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username="testuser", email="testuser@moviements.ru", is_active=True
+        )
+        self.sessions = [
+            Session.create_for_user(self.user, "Mozilla/5.0", "127.0.0.1")
+            for _ in range(3)
+        ]
+        self.token_pairs = [session.create_token_pair() for session in self.sessions]
+
+    def introspect(self, tokens, api_key="internal-key"):
+        return self.client.post(
+            "/tokens/introspect/",
+            {"tokens": tokens},
+            content_type="application/json",
+            headers={"X-API-Key": api_key},
+        )
+
+    def test_requires_api_key(self):
+        response = self.introspect([self.token_pairs[0][0]], api_key="wrong")
+        self.assertEqual(response.status_code, 403)
+
+    def test_non_ascii_api_key(self):
+        response = self.introspect([self.token_pairs[0][0]], api_key="internal-kéy")
+        self.assertEqual(response.status_code, 403)
+
+        with override_settings(INTERNAL_API_KEYS=["internal-kéy"]):
+            response = self.introspect([self.token_pairs[0][0]], api_key="internal-kéy")
+        self.assertEqual(response.status_code, 200)
+
+    def test_batch(self):
+        Blacklist.blacklist_refresh_token(self.token_pairs[1][1])
+        self.sessions[2].delete()
+
+        tokens = [
+            self.token_pairs[0][0],
+            self.token_pairs[0][1],
+            self.token_pairs[1][0],
+            self.token_pairs[2][0],
+            "invalid",
+            self.token_pairs[0][0],
+        ]
+        with self.assertNumQueries(2):
+            results = introspect_tokens(tokens)
+
+        self.assertEqual(
+            [result["active"] for result in results],
+            [True, True, False, False, False, True],
+        )
+        self.assertEqual(results[0]["token_type"], TokenType.ACCESS.value)
+        self.assertEqual(results[1]["token_type"], TokenType.REFRESH.value)
+        self.assertEqual(results[0]["sub"], str(self.user.id))
+        self.assertEqual(results[0]["session_id"], str(self.sessions[0].id))
+
+        response = self.introspect(tokens)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], results)
+
+
+@skipIf(settings.API_ONLY, "API-only processes do not serve the admin")
+class BlacklistAdminTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            CustomUser.objects.create_superuser(
+                username="superuser",
+                email="superuser@moviements.ru",
+                password="superpassword",
+            )
+        )
+        self.access_token, self.refresh_token = generate_token_pair()
+        Blacklist.blacklist_refresh_token(self.refresh_token)
+
+    def search(self, term):
+        return self.client.get("/admin/tokens/blacklist/", {"q": term})
+
+    def test_search(self):
+        entry = Blacklist.objects.get(token=self.refresh_token)
+        self.assertEqual(entry.token_digest, Blacklist.digest(self.refresh_token))
+
+        self.assertContains(self.search(self.refresh_token), str(entry.pk))
+        self.assertContains(self.search(entry.token_digest), str(entry.pk))
+        self.assertContains(self.search(str(entry.pk)), str(entry.pk))
+        # No substring matches
+        self.assertNotContains(self.search(self.refresh_token[:40]), str(entry.pk))
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import forward_auth, IntrospectionView
+
+urlpatterns = [
+    path("verify/", forward_auth, name="verify"),
+    path("introspect/", IntrospectionView.as_view(), name="introspect"),
+]
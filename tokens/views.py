@@ -1,3 +1,165 @@
-from django.shortcuts import render
+import uuid
+from typing import cast
 
-# Create your views here.
+from django.core.exceptions import ValidationError
+from django.db import connections, models, router
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from rest_framework import exceptions, status
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.request import Request
+
+from moviements.db.routers import pin_primary_if_sticky
+from moviements.db.sharding import is_sharded
+from user_auth.models import Session, CustomUser
+
+from .authentication import check_token_revocation, read_token
+from .introspection import introspect_tokens
+from .jwt import get_request_token
+from .jwt.types import TokenType
+from .models import Blacklist
+from .permissions import HasInternalAPIKey
+from .serializers import IntrospectionRequestSerializer
+
+
+@csrf_exempt
+def forward_auth(request: HttpRequest) -> HttpResponse:
+    """
+    Forward-auth endpoint for the reverse proxy (nginx `auth_request` and similar).
+
+    Answers 200 with the user and session identity in response headers if the request
+    carries a valid access token, and 401 otherwise. It is a plain Django view, so it
+    does not go through the DRF request/response cycle, and ForwardAuthMiddleware serves
+    it before the rest of the middleware stack. Without shards, the revocation check and
+    the session and user lookup are a single SQL query (see get_identity_sql).
+
+    The session fingerprint is not checked and the session is not touched: the request
+    comes from the proxy, not from the client that owns the session.
+    """
+    token = get_request_token(request)
+    if not token:
+        return _unauthorized()
+
+    try:
+        token_payload = read_token(token)
+        if token_payload.get("type") != TokenType.ACCESS.value:
+            return _unauthorized()
+
+        pin_primary_if_sticky(token_payload.get("user_id"))
+        if is_sharded(Session):
+            identity = get_sharded_identity(token, token_payload)
+        else:
+            identity = get_identity(token, token_payload)
+    except (
+        exceptions.AuthenticationFailed,
+        Session.DoesNotExist,
+        CustomUser.DoesNotExist,
+        ValidationError,
+    ):
+        return _unauthorized()
+
+    user_id, username, is_active = identity
+    if not is_active:
+        return _unauthorized()
+
+    response = HttpResponse(status=200)
+    response["X-Auth-User-Id"] = str(user_id)
+    response["X-Auth-Username"] = username
+    response["X-Auth-Session-Id"] = str(token_payload.get("session_id"))
+    return response
+
+
+_identity_sql: dict[str, str] = {}
+
+
+def get_identity_sql(alias: str) -> str:
+    """
+    Returns the query of get_identity for a database, built once per database: the ORM
+    spends more time compiling the two lookups than the database running them.
+    """
+    if alias not in _identity_sql:
+        quote_name = connections[alias].ops.quote_name
+        session, user, blacklist = (
+            quote_name(model._meta.db_table)
+            for model in (Session, CustomUser, Blacklist)
+        )
+        _identity_sql[alias] = (
+            f"SELECT u.{quote_name('id')}, u.{quote_name('username')}, "
+            f"u.{quote_name('is_active')}, EXISTS ("
+            f"SELECT 1 FROM {blacklist} b WHERE b.{quote_name('token_digest')} = %s) "
+            f"FROM {session} s INNER JOIN {user} u "
+            f"ON u.{quote_name('id')} = s.{quote_name('user_id')} "
+            f"WHERE s.{quote_name('id')} = %s"
+        )
+    return _identity_sql[alias]
+
+
+def get_identity(token: str, token_payload: dict) -> tuple[uuid.UUID, str, bool]:
+    """
+    Checks that the token is not revoked and looks up the identity of its session, in a
+    single query on the database the router reads the sessions from.
+
+    Raises:
+        exceptions.AuthenticationFailed: If the token is revoked.
+        Session.DoesNotExist: If the session does not exist.
+        ValidationError: If the session id of the token is not a UUID.
+    """
+    alias = router.db_for_read(Session)
+    connection = connections[alias]
+    session_id = cast(models.UUIDField, Session._meta.pk).get_db_prep_value(
+        token_payload.get("session_id"), connection
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(get_identity_sql(alias), [Blacklist.digest(token), session_id])
+        row = cursor.fetchone()
+
+    if row is None:
+        raise Session.DoesNotExist
+    user_id, username, is_active, revoked = row
+    if revoked:
+        raise exceptions.AuthenticationFailed("Invalid or expired token")
+    return uuid.UUID(str(user_id)), username, bool(is_active)
+
+
+def get_sharded_identity(
+    token: str, token_payload: dict
+) -> tuple[uuid.UUID, str, bool]:
+    """
+    get_identity with shards: the revoked tokens and the session are on the shard of the
+    user, and the users are not.
+    """
+    check_token_revocation(token, token_payload)
+
+    user_id = (
+        Session.objects.for_user(token_payload.get("user_id"))
+        .values_list("user_id", flat=True)
+        .get(id=str(token_payload.get("session_id")))
+    )
+    username, is_active = CustomUser.objects.values_list("username", "is_active").get(
+        pk=user_id
+    )
+    return user_id, username, is_active
+
+
+def _unauthorized() -> HttpResponse:
+    response = HttpResponse(status=401)
+    response["WWW-Authenticate"] = 'Bearer realm="api"'
+    return response
+
+
+class IntrospectionView(APIView):
+    authentication_classes: list[type[BaseAuthentication]] = []
+    permission_classes = [HasInternalAPIKey]
+
+    def post(self, request: Request, *args, **kwargs):
+        serializer = IntrospectionRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(
+            {"results": introspect_tokens(serializer.validated_data["tokens"])},
+            status=status.HTTP_200_OK,
+        )
@@ -1,18 +1,117 @@
+import uuid
 from datetime import datetime
+from typing import NamedTuple, Optional
 
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Count, Max, Q
+from django.forms.models import BaseInlineFormSet
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.html import format_html
 
-from .models import CustomUser, Session, UserRequest
+from moviements.db.admin import EstimatedCountPaginator, ShardedModelAdmin
+from moviements.db.sharding import fan_out, is_sharded, shard_for
+
+from .models import AuthEvent, CustomUser, Session, UserRequest, EmailOutbox
+from .transfer import CONTENT_TYPES, export_lines, iter_rows
+
+# Sessions shown on the change page of a user, the most recently active first
+RECENT_SESSIONS = 20
+
+
+def parse_uuid(term: str) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(term.strip())
+    except ValueError:
+        return None
+
+
+class SessionStats(NamedTuple):
+    session_count: int
+    last_session_at: Optional[datetime]
+
+
+def load_session_stats(users) -> None:
+    """
+    Sets the session_count and last_session_at of the users, with one query per shard
+    (in parallel) for all of them.
+    """
+    shard_users: dict[str, list] = {}
+    for user in users:
+        shard_users.setdefault(shard_for(user.pk), []).append(user.pk)
+
+    def get_stats(alias: str) -> list[dict]:
+        return list(
+            Session.objects.for_shard(alias)
+            .filter(user_id__in=shard_users[alias])
+            .values("user_id")
+            .annotate(count=Count("id"), last_session_at=Max("updated_at"))
+            .order_by()
+        )
+
+    stats: dict[uuid.UUID, dict] = {}
+    if shard_users:
+        for shard_stats in fan_out(get_stats, list(shard_users)).values():
+            stats.update((row["user_id"], row) for row in shard_stats)
+
+    for user in users:
+        row = stats.get(user.pk, {})
+        user.session_count = row.get("count", 0)
+        user.last_session_at = row.get("last_session_at")
+
+
+def export_action(format: str):
+    """
+    Returns an admin action streaming the selected rows as a file (see user_auth.transfer).
+    """
+
+    def export(modeladmin, request, queryset):
+        model = queryset.model
+        response = StreamingHttpResponse(
+            export_lines(model, iter_rows(model, queryset), format),
+            content_type=CONTENT_TYPES[format],
+        )
+        filename = f"{model._meta.verbose_name_plural}.{format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    export.__name__ = f"export_{format}"
+    return admin.action(
+        description=f"Export selected %(verbose_name_plural)s as {format.upper()}"
+    )(export)
+
+
+class UserChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # Evaluates the page, whose users then carry their session statistics
+        load_session_stats(list(self.result_list))
+
+
+class RecentSessionsFormSet(BaseInlineFormSet):
+    def get_queryset(self):
+        return super().get_queryset()[:RECENT_SESSIONS]
 
 
 class SessionInline(admin.TabularInline):
     model = Session
+    formset = RecentSessionsFormSet
     extra = 0
     show_change_link = True
     classes = ("collapse",)
     fields = ("id", "user_agent", "ip_address", "created_at", "updated_at")
     readonly_fields = ("id", "created_at", "updated_at")
+    ordering = ("-updated_at",)
+    verbose_name_plural = f"sessions (the {RECENT_SESSIONS} most recent)"
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if not is_sharded(self.model):
+            return queryset
+        # The sessions of the user being edited are on its shard
+        return queryset.using(shard_for(request.resolver_match.kwargs.get("object_id")))
 
 
 @admin.register(CustomUser)
@@ -46,7 +145,8 @@ class CustomUserAdmin(admin.ModelAdmin):
         ),
     )
     readonly_fields = ("id", "date_joined", "get_last_login")
-    search_fields = ("id", "username", "email")
+    search_fields = ("^username", "^email")
+    search_help_text = "Id, or beginning of the username or email"
 
     list_display = (
         "id",
@@ -61,8 +161,28 @@ class CustomUserAdmin(admin.ModelAdmin):
     )
     list_display_links = ("id", "username", "email")
     list_filter = ("is_active", "is_staff", "is_superuser")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     inlines = (SessionInline,)
+    actions = (export_action("csv"), export_action("jsonl"))
+
+    def get_changelist(self, request, **kwargs):
+        return UserChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        user_id = parse_uuid(search_term)
+        if user_id is not None:
+            return queryset.filter(pk=user_id), False
+        return super().get_search_results(request, queryset, search_term)
+
+    def get_session_stats(self, obj: CustomUser) -> SessionStats:
+        # Outside of the changelist (on the change page)
+        if not hasattr(obj, "session_count"):
+            load_session_stats([obj])
+        return SessionStats(
+            getattr(obj, "session_count"), getattr(obj, "last_session_at")
+        )
 
     @admin.display(description="Last login")
     def get_last_login(self, obj: CustomUser) -> datetime:
@@ -75,31 +195,56 @@ class CustomUserAdmin(admin.ModelAdmin):
         Returns:
             datetime: The timestamp of the last login for the given user. If the user has never logged in, it returns the current time.
         """
-        session = obj.sessions.order_by("-updated_at").first()
-        if not session:
+        last_session_at = self.get_session_stats(obj).last_session_at
+        if not last_session_at:
             return timezone.now()
-        return session.updated_at
+        return last_session_at
 
     @admin.display(description="Active sessions")
-    def get_user_sessions_count(self, obj: CustomUser) -> int:
+    def get_user_sessions_count(self, obj: CustomUser) -> str:
         """
-        This method returns the count of active sessions for the given user.
+        This method returns the count of active sessions for the given user,
+        linked to the list of these sessions.
 
         Args:
             obj (CustomUser): The user object for which the active sessions count is to be retrieved.
 
         Returns:
-            int: The count of active sessions for the given user.
+            str: The count of active sessions for the given user, as a link.
         """
-        return obj.sessions.order_by("-updated_at").all().count()
+        url = (
+            f"{reverse('admin:user_auth_session_changelist')}?user__id__exact={obj.pk}"
+        )
+        if is_sharded(Session):
+            url += f"&shard={shard_for(obj.pk)}"
+        return format_html(
+            '<a href="{}">{}</a>', url, self.get_session_stats(obj).session_count
+        )
 
 
 @admin.register(Session)
-class SessionAdmin(admin.ModelAdmin):
+class SessionAdmin(ShardedModelAdmin):
     list_display = ("id", "user", "ip_address", "created_at", "updated_at")
-    list_filter = ("user", "ip_address")
-    search_fields = ("user", "user_agent", "ip_address")
+    search_fields = ("=ip_address",)
+    search_help_text = "Session or user id, or IP address"
+    raw_id_fields = ("user",)
     readonly_fields = ("id", "created_at", "updated_at")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = (export_action("csv"), export_action("jsonl"))
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if is_sharded(self.model):
+            # The users cannot be joined, one query loads those of the page
+            queryset = queryset.prefetch_related("user")
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        search_id = parse_uuid(search_term)
+        if search_id is not None:
+            return queryset.filter(Q(pk=search_id) | Q(user_id=search_id)), False
+        return super().get_search_results(request, queryset, search_term)
 
 
 @admin.register(UserRequest)
@@ -111,3 +256,50 @@ class UserRequestAdmin(admin.ModelAdmin):
         "created_at",
     )
     readonly_fields = ("id", "created_at")
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "to",
+        "subject",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "sent_at",
+        "created_at",
+    )
+    readonly_fields = ("id", "created_at", "updated_at")
+    list_filter = ("status",)
+    search_fields = ("to",)
+
+
+@admin.register(AuthEvent)
+class AuthEventAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "type", "user_id", "session_id", "ip_address")
+    list_filter = ("type",)
+    search_fields = ("=ip_address",)
+    search_help_text = "User or session id, or IP address"
+    ordering = ("-created_at",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        search_id = parse_uuid(search_term)
+        if search_id is not None:
+            return (
+                queryset.filter(Q(user_id=search_id) | Q(session_id=search_id)),
+                False,
+            )
+        return super().get_search_results(request, queryset, search_term)
+
+    # The audit log is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -6,3 +6,6 @@ class UserAuthConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "user_auth"
     verbose_name = _("user auth")
+
+    def ready(self):
+        from . import signals  # noqa: F401
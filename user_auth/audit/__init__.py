@@ -0,0 +1 @@
+from .audit import *
@@ -0,0 +1,173 @@
+"""
+Buffered writer of the authentication audit log.
+
+record_auth_event only appends the event to an in-process buffer. The buffer is written
+with one bulk_create once it holds FLUSH_SIZE events or its oldest event is older than
+FLUSH_INTERVAL, checked when a request finishes (after its response is sent), so that
+requests never wait for the audit log. A buffer reaching MAX_BUFFER_SIZE is written right
+away, and whatever is left is written when the process exits.
+
+purge_auth_events deletes the events past the retention period one day at a time, the
+oldest first, so that no single statement locks or rewrites a large part of the table.
+"""
+
+import atexit
+import datetime
+import logging
+import threading
+import time
+from typing import Optional
+
+from django.utils import timezone
+
+from user_auth.models import AuthEvent
+
+from .config import (
+    get_flush_interval,
+    get_flush_size,
+    get_max_buffer_size,
+    get_retention,
+    is_audit_log_enabled,
+)
+
+__all__ = [
+    "AuditLogWriter",
+    "get_audit_writer",
+    "purge_auth_events",
+    "record_auth_event",
+]
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    def __init__(self):
+        self._buffer: list[AuthEvent] = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def record(self, event: AuthEvent) -> None:
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(event)
+            full = len(self._buffer) >= get_max_buffer_size()
+
+        if full:
+            self.flush()
+
+    def is_due(self) -> bool:
+        with self._lock:
+            if not self._buffer or self._oldest is None:
+                return False
+            return (
+                len(self._buffer) >= get_flush_size()
+                or time.monotonic() - self._oldest
+                >= get_flush_interval().total_seconds()
+            )
+
+    def flush_if_due(self) -> int:
+        return self.flush() if self.is_due() else 0
+
+    def flush(self) -> int:
+        """
+        Writes the buffered events with a single bulk_create.
+        The events of a failed write are logged and dropped.
+
+        Returns:
+            int: The number of written events.
+        """
+        with self._lock:
+            events, self._buffer, self._oldest = self._buffer, [], None
+        if not events:
+            return 0
+
+        try:
+            AuthEvent.objects.bulk_create(events)
+        except Exception:
+            logger.exception("Could not write %d authentication events", len(events))
+            return 0
+        return len(events)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buffer, self._oldest = [], None
+
+
+_writer = AuditLogWriter()
+
+
+def get_audit_writer() -> AuditLogWriter:
+    return _writer
+
+
+atexit.register(lambda: _writer.flush())
+
+
+def record_auth_event(
+    type: AuthEvent.Type,
+    request=None,
+    user_id=None,
+    session_id=None,
+    **data,
+) -> None:
+    """
+    Buffers an authentication event. Nothing is written until the buffer is flushed.
+
+    Parameters:
+        type (AuthEvent.Type): The type of the event.
+        request (HttpRequest, optional): The request, whose user agent and IP address are recorded.
+        user_id (UUID, optional): The user concerned by the event.
+        session_id (UUID, optional): The session concerned by the event.
+        **data: Additional JSON-serializable details of the event.
+    """
+    if not is_audit_log_enabled():
+        return
+
+    meta = request.META if request is not None else {}
+    _writer.record(
+        AuthEvent(
+            type=type,
+            user_id=user_id,
+            session_id=session_id,
+            user_agent=meta.get("HTTP_USER_AGENT", "")[:255],
+            ip_address=meta.get("REMOTE_ADDR", "")[:255],
+            data=data,
+        )
+    )
+
+
+def purge_auth_events(
+    older_than: Optional[datetime.timedelta] = None,
+    bucket: datetime.timedelta = datetime.timedelta(days=1),
+) -> int:
+    """
+    Deletes the authentication events older than the retention period, one time bucket
+    (and one DELETE statement) at a time, starting from the oldest event.
+
+    Parameters:
+        older_than (datetime.timedelta, optional): The age of the deleted events. Defaults to the "RETENTION" setting.
+        bucket (datetime.timedelta, optional): The time span deleted per statement. Defaults to one day.
+
+    Returns:
+        int: The number of deleted events.
+    """
+    if older_than is None:
+        older_than = get_retention()
+    cutoff = timezone.now() - older_than
+    until = (
+        AuthEvent.objects.filter(created_at__lt=cutoff)
+        .order_by("created_at")
+        .values_list("created_at", flat=True)
+        .first()
+    )
+
+    deleted = 0
+    while until is not None and until < cutoff:
+        until = min(until + bucket, cutoff)
+        count, _ = AuthEvent.objects.filter(created_at__lt=until).delete()
+        deleted += count
+    return deleted
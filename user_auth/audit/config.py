@@ -0,0 +1,73 @@
+import datetime
+from typing import Any
+
+from django.conf import settings
+
+
+def get_audit_config(key: str, default: Any = None) -> Any:
+    """
+    get_audit_config function retrieves a specific configuration value from the AUDIT_LOG dictionary in Django settings.
+
+    Parameters:
+        key (str): The key of the configuration value to retrieve.
+        default (Any, optional): A default value to return if the specified key is not found in the AUDIT_LOG dictionary. Defaults to None.
+
+    Returns:
+        Any: The value associated with the specified key in the AUDIT_LOG dictionary, or the default value if the key is not found.
+    """
+    return getattr(settings, "AUDIT_LOG", {}).get(key, default)
+
+
+def is_audit_log_enabled() -> bool:
+    """
+    is_audit_log_enabled function retrieves the value of the "ENABLED" configuration from the AUDIT_LOG dictionary in Django settings.
+    If the key is not found, it returns the default value, which is True.
+
+    Returns:
+        bool: Whether the authentication events are recorded.
+    """
+    return get_audit_config("ENABLED", True)
+
+
+def get_flush_size() -> int:
+    """
+    get_flush_size function retrieves the value of the "FLUSH_SIZE" configuration from the AUDIT_LOG dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 200.
+
+    Returns:
+        int: The number of buffered events written at once, at the end of a request.
+    """
+    return get_audit_config("FLUSH_SIZE", 200)
+
+
+def get_flush_interval() -> datetime.timedelta:
+    """
+    get_flush_interval function retrieves the value of the "FLUSH_INTERVAL" configuration from the AUDIT_LOG dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 5 seconds.
+
+    Returns:
+        datetime.timedelta: The age of the oldest buffered event after which the buffer is written at the end of a request, however small.
+    """
+    return get_audit_config("FLUSH_INTERVAL", datetime.timedelta(seconds=5))
+
+
+def get_max_buffer_size() -> int:
+    """
+    get_max_buffer_size function retrieves the value of the "MAX_BUFFER_SIZE" configuration from the AUDIT_LOG dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 10000.
+
+    Returns:
+        int: The number of buffered events at which the buffer is written right away (outside of requests, e.g. in commands).
+    """
+    return get_audit_config("MAX_BUFFER_SIZE", 10000)
+
+
+def get_retention() -> datetime.timedelta:
+    """
+    get_retention function retrieves the value of the "RETENTION" configuration from the AUDIT_LOG dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 90 days.
+
+    Returns:
+        datetime.timedelta: How long the events are kept by the purge_auth_events command.
+    """
+    return get_audit_config("RETENTION", datetime.timedelta(days=90))
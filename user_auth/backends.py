@@ -25,7 +25,7 @@ class AuthBackend(BaseBackend):
         user_agent = request.META["HTTP_USER_AGENT"] if request else "Internal"
         remote_addr = request.META["REMOTE_ADDR"] if request else "127.0.0.1"
 
-        session, created = Session.objects.get_or_create(
+        session, created = Session.objects.for_user(user.pk).get_or_create(
             user=user, user_agent=user_agent, ip_address=remote_addr
         )
 
@@ -42,16 +42,21 @@ class AuthBackend(BaseBackend):
             return None
 
     def get_user_permissions(self, user_obj, obj=None):
-        return set()
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        return set(user_obj.permission_data.user_permissions)
 
     def get_group_permissions(self, user_obj, obj=None):
-        return set()
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        return set(user_obj.permission_data.group_permissions)
 
     def get_all_permissions(self, user_obj, obj=None):
-        return {
-            *self.get_user_permissions(user_obj, obj=obj),
-            *self.get_group_permissions(user_obj, obj=obj),
-        }
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        return set(user_obj.permission_data.all_permissions)
 
     def has_perm(self, user_obj, perm, obj=None):
-        return perm in self.get_all_permissions(user_obj, obj=obj)
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return False
+        return perm in user_obj.permission_data.all_permissions
@@ -0,0 +1,45 @@
+import hashlib
+from typing import Callable
+
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from rest_framework.request import Request
+
+
+def make_etag(*parts) -> str:
+    """
+    Builds a weak ETag from cheap version values (ids, timestamps, counters).
+
+    Returns:
+        str: The quoted weak ETag.
+    """
+    digest = hashlib.md5(
+        "|".join(map(str, parts)).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def conditional_response(
+    request: Request, etag: str, get_response: Callable[[], HttpResponseBase]
+) -> HttpResponseBase:
+    """
+    Answers 304 if the client already has the representation identified by etag,
+    otherwise builds the response with get_response. The ETag must be computed
+    without serializing the resource, so that a 304 costs nothing more.
+
+    Parameters:
+        request (Request): The request.
+        etag (str): The ETag of the current representation.
+        get_response (Callable): Builds the full response.
+
+    Returns:
+        HttpResponseBase: The 304 or the full response, with ETag and Cache-Control headers.
+    """
+    response: HttpResponseBase | None = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = get_response()
+
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,98 @@
+"""
+Password hashing of large batches in a process pool.
+
+Password hashers are deliberately slow and hold the GIL, so a batch is hashed by a pool
+of processes, one per CPU by default (PASSWORD_HASHING["WORKERS"]) but never more than
+the passwords of the batch. Its processes are spawned rather than forked: forking a
+multithreaded server process is unsafe. They only load the settings (from
+DJANGO_SETTINGS_MODULE), which is all make_password needs.
+
+The pool is started for each batch and shut down once it is hashed: a pool kept by every
+web server worker would leave workers × CPUs idle processes behind. Code hashing many
+batches in a row (manage.py provision_users) keeps one pool for all of them with
+hashing_pool().
+
+Batches smaller than PASSWORD_HASHING["MIN_POOL_BATCH"] are hashed in the calling process.
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+__all__ = ["hash_passwords", "hashing_pool"]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def get_hashing_config(key: str, default=None):
+    """
+    Retrieves a configuration value from the PASSWORD_HASHING dictionary in Django settings.
+    """
+    return getattr(settings, "PASSWORD_HASHING", {}).get(key, default)
+
+
+def get_hashing_workers() -> int:
+    return get_hashing_config("WORKERS") or os.cpu_count() or 1
+
+
+def start_pool(max_workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+@contextmanager
+def hashing_pool():
+    """
+    Keeps one pool of get_hashing_workers() processes for the hash_passwords calls of the
+    block, instead of one per call. Nested blocks share the outer pool.
+    """
+    global _pool
+
+    with _lock:
+        if _pool is not None:
+            pool = None
+        else:
+            pool = _pool = start_pool(get_hashing_workers())
+    if pool is None:
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        with _lock:
+            _pool = None
+        pool.shutdown()
+
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """
+    Hashes the passwords with the default hasher, in a process pool for large batches.
+
+    Parameters:
+        passwords (list[str]): The raw passwords.
+
+    Returns:
+        list[str]: The encoded passwords, in the same order.
+    """
+    if len(passwords) < get_hashing_config("MIN_POOL_BATCH", 8):
+        return [make_password(password) for password in passwords]
+
+    workers = min(get_hashing_workers(), len(passwords))
+    # A few chunks per process balance the load without a round trip per password
+    chunksize = math.ceil(len(passwords) / (workers * 4))
+
+    pool = _pool
+    if pool is not None:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+    with start_pool(workers) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
@@ -0,0 +1,142 @@
+"""
+Idempotency-Key support for the POST views that clients retry.
+
+The first response to a request carrying an Idempotency-Key header is stored, and the
+retries of that request are answered with it (and an Idempotent-Replayed header) instead
+of being executed again. The keys are scoped by user: the authenticated user, or for the
+anonymous views the client fingerprint (user agent and IP address) sessions are bound to.
+Reusing a key for another request is answered 422. A retry arriving while the first
+request is in flight waits for its response; the first response to a request that failed
+with a server error is not stored, so that it can be retried.
+
+IDEMPOTENCY_CACHE_ALIAS selects the cache, whose TIMEOUT is how long the responses are
+replayed. With the in-process LocMemCache, only the retries reaching the same process are
+deduplicated: use a shared backend (Redis, Memcached) with several workers.
+
+The stored responses are replayed as they were sent: those of the sign-in views hold live
+access and refresh tokens until the cache TIMEOUT. The cache must be private to the
+application, like the database. The request bodies, which hold passwords, are only
+stored as an HMAC keyed by SECRET_KEY (see get_request_digest).
+"""
+
+import functools
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.crypto import salted_hmac
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+# How long a request in flight holds its key, and how long its retries wait for it
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+
+def get_idempotency_cache_key(request: Request, key: str) -> str:
+    if request.user.is_authenticated:
+        scope = str(request.user.pk)
+    else:
+        scope = "|".join(
+            (
+                request.META.get("HTTP_USER_AGENT", ""),
+                request.META.get("REMOTE_ADDR", ""),
+            )
+        )
+    digest = hashlib.sha256(f"{scope}|{key}".encode()).hexdigest()
+    return f"user_auth:idempotency:{digest}"
+
+
+def get_request_digest(request: Request) -> str:
+    """
+    Fingerprints the request, to tell a retry from another request with the same key.
+    The body holds passwords: a plain hash would be a fast offline oracle for them in
+    the cache, so it is an HMAC keyed by SECRET_KEY instead.
+    """
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return salted_hmac(
+        "user_auth.idempotency",
+        f"{request.method}|{request.path}|{body}",
+        algorithm="sha256",
+    ).hexdigest()
+
+
+def replay(stored: dict, digest: str) -> Response:
+    if stored["digest"] != digest:
+        return Response(
+            {"error": f"{HEADER} was used for another request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(
+        stored["data"], status=stored["status"], headers={"Idempotent-Replayed": "true"}
+    )
+
+
+def idempotent(handler):
+    """
+    Decorates a view handler so that its requests with an Idempotency-Key header are
+    executed once (see the module docstring).
+    """
+
+    @functools.wraps(handler)
+    def wrapper(view, request: Request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return handler(view, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"Invalid {HEADER}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cache = caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+        cache_key = get_idempotency_cache_key(request, key)
+        lock_key = f"{cache_key}:lock"
+        digest = get_request_digest(request)
+
+        token = str(uuid.uuid4())
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while True:
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return replay(stored, digest)
+            if cache.add(lock_key, token, LOCK_TIMEOUT):
+                break
+            # Another request with the key is in flight
+            if time.monotonic() >= deadline:
+                return Response(
+                    {"error": f"A request with this {HEADER} is in progress"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            # It may have finished between the lookup and the lock
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return replay(stored, digest)
+
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code < 500:
+                cache.set(
+                    cache_key,
+                    {
+                        "digest": digest,
+                        "status": response.status_code,
+                        "data": response.data,
+                    },
+                )
+            return response
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    return wrapper
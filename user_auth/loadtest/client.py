@@ -0,0 +1,116 @@
+"""
+A minimal asyncio HTTP/1.1 client with keep-alive, enough to drive the JSON API
+without a third-party HTTP library.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+
+
+@dataclass
+class HTTPResponse:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+
+class HTTPConnection:
+    """
+    A persistent connection to one server. It reconnects when the server closes it.
+    Requests on a connection are sequential: each virtual user owns one connection.
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        parts = urlsplit(url)
+        if parts.scheme != "http":
+            raise ValueError("Only http:// servers are supported")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        headers: Optional[dict[str, str]] = None,
+        data=None,
+    ) -> HTTPResponse:
+        body = json.dumps(data).encode() if data is not None else b""
+        head = [f"{method} {path} HTTP/1.1", f"Host: {self.host_header}"]
+        for name, value in (headers or {}).items():
+            head.append(f"{name}: {value}")
+        if data is not None:
+            head.append("Content-Type: application/json")
+        head.append(f"Content-Length: {len(body)}")
+        message = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+        reused = self.writer is not None
+        if not reused:
+            await self.connect()
+        try:
+            return await self.send(message)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+
+        # The server closed the kept-alive connection before reading the request
+        await self.connect()
+        return await self.send(message)
+
+    async def send(self, message: bytes) -> HTTPResponse:
+        if self.reader is None or self.writer is None:
+            raise ConnectionError("Not connected")
+        self.writer.write(message)
+        await self.writer.drain()
+        return await asyncio.wait_for(self.read_response(self.reader), self.timeout)
+
+    async def read_response(self, reader: asyncio.StreamReader) -> HTTPResponse:
+        status_line = await reader.readuntil(b"\r\n")
+        status = int(status_line.split(b" ", 2)[1])
+
+        headers = {}
+        while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while size := int((await reader.readuntil(b"\r\n")).split(b";")[0], 16):
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            await reader.readuntil(b"\r\n")
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        elif status in (204, 304):
+            body = b""
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+
+        return HTTPResponse(status, headers, body)
@@ -0,0 +1,275 @@
+"""
+Concurrent load test of the authentication API.
+
+Every virtual user owns a keep-alive connection and an account. It repeatedly picks a flow
+from the mix, signing in again whenever it has no valid token pair, and refreshes its
+tokens before the access token expires, like a well-behaved client would.
+"""
+
+import asyncio
+import collections
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+import jwt
+
+from .client import HTTPConnection, HTTPResponse
+
+__all__ = ["DEFAULT_MIX", "LoadTest", "parse_mix"]
+
+FLOWS = ("signup", "signin", "refresh", "me", "session_delete")
+DEFAULT_MIX = {"signup": 1, "signin": 2, "refresh": 2, "me": 12, "session_delete": 1}
+
+# Refresh the access token this many seconds before it expires
+REFRESH_MARGIN = 5
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """
+    Parses a flow mix such as "signin=2,me=10,refresh=1".
+    """
+    mix = {}
+    for item in value.split(","):
+        flow, _, weight = item.partition("=")
+        flow = flow.strip()
+        if flow not in FLOWS:
+            raise ValueError(
+                f"Unknown flow {flow!r}, expected one of {', '.join(FLOWS)}"
+            )
+        mix[flow] = float(weight or 1)
+    return mix
+
+
+def percentile(latencies: list[float], fraction: float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    # HTTP statuses and connection error names, as strings
+    statuses: collections.Counter[str] = field(default_factory=collections.Counter)
+
+    def summary(self, elapsed: float) -> dict:
+        latencies = sorted(self.latencies)
+        requests = len(latencies)
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": self.errors / requests if requests else 0.0,
+            "rps": requests / elapsed,
+            "p50_ms": percentile(latencies, 0.50) * 1000 if requests else None,
+            "p95_ms": percentile(latencies, 0.95) * 1000 if requests else None,
+            "p99_ms": percentile(latencies, 0.99) * 1000 if requests else None,
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+class VirtualUser:
+    def __init__(self, test: "LoadTest", index: int, username: Optional[str]):
+        self.test = test
+        self.index = index
+        self.rng = random.Random(f"{test.seed}-{index}")
+        self.connection = HTTPConnection(test.url)
+        self.user_agent = f"moviements-load-test/{index}"
+        self.username = username
+        self.signups = 0
+        self.clear_tokens()
+
+    def clear_tokens(self) -> None:
+        self.access_token = self.refresh_token = self.session_id = None
+        self.access_expires_at = 0.0
+
+    async def call(
+        self,
+        endpoint: str,
+        method: str,
+        path: str,
+        data=None,
+        token: Optional[str] = None,
+        expected: tuple[int, ...] = (200,),
+    ) -> Optional[HTTPResponse]:
+        headers = {"User-Agent": self.user_agent, "Accept": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        stats = self.test.stats[endpoint]
+        start = time.perf_counter()
+        try:
+            response = await self.connection.request(method, path, headers, data)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            stats.latencies.append(time.perf_counter() - start)
+            stats.errors += 1
+            stats.statuses[type(e).__name__] += 1
+            return None
+
+        stats.latencies.append(time.perf_counter() - start)
+        stats.statuses[str(response.status)] += 1
+        if response.status not in expected:
+            stats.errors += 1
+            return None
+        return response
+
+    def store_tokens(self, response: HTTPResponse) -> None:
+        tokens = response.json()
+        self.access_token = access_token = tokens["access_token"]
+        self.refresh_token = tokens["refresh_token"]
+
+        payload = jwt.decode(access_token, options={"verify_signature": False})
+        self.session_id = payload["session_id"]
+        self.access_expires_at = payload["exp"]
+
+    async def signup(self) -> None:
+        self.signups += 1
+        username = f"lt{self.test.run_id}-{self.index}-{self.signups}"
+
+        response = await self.call(
+            "sign_up",
+            "POST",
+            "/auth/signup/",
+            {
+                "username": username,
+                "email": f"{username}@loadtest.moviements.ru",
+                "password": self.test.password,
+            },
+            expected=(201,),
+        )
+        if response is None:
+            return
+
+        response = await self.call(
+            "sign_up_complete",
+            "POST",
+            f"/auth/signup/complete/{response.json()['request_id']}",
+        )
+        if response is not None:
+            self.username = username
+            self.clear_tokens()
+
+    async def signin(self) -> None:
+        response = await self.call(
+            "sign_in",
+            "POST",
+            "/auth/signin/",
+            {"username": self.username, "password": self.test.password},
+        )
+        if response is None:
+            self.clear_tokens()
+        else:
+            self.store_tokens(response)
+
+    async def refresh(self) -> None:
+        response = await self.call(
+            "refresh", "POST", "/auth/refresh/", token=self.refresh_token
+        )
+        if response is None:
+            self.clear_tokens()
+        else:
+            self.store_tokens(response)
+
+    async def me(self) -> None:
+        await self.call("me", "GET", "/auth/me/", token=self.access_token)
+
+    async def session_delete(self) -> None:
+        await self.call(
+            "session_delete",
+            "DELETE",
+            f"/auth/sessions/{self.session_id}/",
+            token=self.access_token,
+        )
+        self.clear_tokens()
+
+    async def run(self, deadline: float) -> None:
+        flows, weights = zip(*self.test.mix.items())
+        try:
+            while time.monotonic() < deadline:
+                flow = self.rng.choices(flows, weights)[0]
+
+                if self.username is None or flow == "signup":
+                    await self.signup()
+                elif self.access_token is None or flow == "signin":
+                    await self.signin()
+                elif (
+                    flow == "refresh"
+                    or self.access_expires_at - time.time() < REFRESH_MARGIN
+                ):
+                    await self.refresh()
+                else:
+                    await getattr(self, flow)()
+        finally:
+            await self.connection.close()
+
+
+class LoadTest:
+    """
+    Runs `concurrency` virtual users against the server at `url` for `duration` seconds.
+
+    Virtual users sign in as the existing accounts `{account_prefix}0` to `{account_prefix}{accounts - 1}`
+    (see the seed_data command) or, without accounts, sign up first.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        concurrency: int = 10,
+        duration: float = 30.0,
+        mix: Optional[dict[str, float]] = None,
+        accounts: int = 0,
+        account_prefix: str = "seed",
+        password: str = "password",
+        seed: int = 0,
+    ):
+        self.url = url.rstrip("/")
+        self.concurrency = concurrency
+        self.duration = duration
+        self.mix = mix or DEFAULT_MIX
+        self.accounts = accounts
+        self.account_prefix = account_prefix
+        self.password = password
+        self.seed = seed
+        self.run_id = uuid.uuid4().hex[:8]
+        self.stats: dict[str, EndpointStats] = collections.defaultdict(EndpointStats)
+
+    async def run(self) -> dict:
+        """
+        Runs the load test.
+
+        Returns:
+            dict: The totals and the statistics of every endpoint.
+        """
+        users = [
+            VirtualUser(
+                self,
+                index,
+                f"{self.account_prefix}{index % self.accounts}"
+                if self.accounts
+                else None,
+            )
+            for index in range(self.concurrency)
+        ]
+
+        start = time.monotonic()
+        await asyncio.gather(*(user.run(start + self.duration) for user in users))
+        elapsed = time.monotonic() - start
+
+        endpoints = {
+            endpoint: stats.summary(elapsed)
+            for endpoint, stats in sorted(self.stats.items())
+        }
+        requests = sum(stats["requests"] for stats in endpoints.values())
+        errors = sum(stats["errors"] for stats in endpoints.values())
+        return {
+            "url": self.url,
+            "concurrency": self.concurrency,
+            "duration": elapsed,
+            "mix": self.mix,
+            "requests": requests,
+            "errors": errors,
+            "error_rate": errors / requests if requests else 0.0,
+            "rps": requests / elapsed,
+            "endpoints": endpoints,
+        }
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from user_auth.transfer import FORMATS, MODELS, export_lines, get_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams the users or the sessions to a CSV or JSON Lines file (or the standard output), "
+        "in constant memory. Password hashes are exported as they are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=sorted(MODELS))
+        parser.add_argument(
+            "--output",
+            help="File to write, whose extension gives the format (default: stdout)",
+        )
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Format, when writing to stdout (default: csv)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Rows fetched from the database at once",
+        )
+
+    def handle(self, *args, **options):
+        model = MODELS[options["model"]]
+        try:
+            format = options["format"] or (
+                get_format(options["output"]) if options["output"] else "csv"
+            )
+        except ValueError as e:
+            raise CommandError(e)
+
+        lines = export_lines(
+            model, iter_rows(model, chunk_size=options["chunk_size"]), format
+        )
+        if options["output"] is None:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        with open(options["output"], "w", encoding="utf-8", newline="") as file:
+            file.writelines(lines)
+
+        self.stderr.write(
+            self.style.SUCCESS(
+                f"Exported the {options['model']} to {options['output']}"
+            )
+        )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from user_auth.transfer import FORMATS, MODELS, get_format, import_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports users or sessions from a file written by export_data, streaming it and "
+        "inserting in batches. Password hashes are kept as they are. Import the users first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=sorted(MODELS))
+        parser.add_argument(
+            "file", help="File to read, whose extension gives the format"
+        )
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--skip-existing",
+            action="store_true",
+            help="Skip the rows whose id (or unique username and email) already exist",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            format = options["format"] or get_format(options["file"])
+        except ValueError as e:
+            raise CommandError(e)
+
+        with open(options["file"], encoding="utf-8", newline="") as file:
+            try:
+                count = import_records(
+                    MODELS[options["model"]],
+                    file,
+                    format,
+                    batch_size=options["batch_size"],
+                    ignore_conflicts=options["skip_existing"],
+                )
+            except IntegrityError as e:
+                raise CommandError(
+                    f"{e} (use --skip-existing to skip the existing rows)"
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {count} {options['model']} from {options['file']}"
+            )
+        )
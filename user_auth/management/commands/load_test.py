@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user_auth.loadtest import DEFAULT_MIX, LoadTest, parse_mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Load tests a running server with concurrent virtual users replaying the "
+        "signup, signin, refresh, me and session deletion flows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", default="http://127.0.0.1:8000", help="Base URL of the server"
+        )
+        parser.add_argument(
+            "-c", "--concurrency", type=int, default=50, help="Number of virtual users"
+        )
+        parser.add_argument(
+            "-d", "--duration", type=float, default=30.0, help="Duration in seconds"
+        )
+        parser.add_argument(
+            "--mix",
+            default=",".join(
+                f"{flow}={weight}" for flow, weight in DEFAULT_MIX.items()
+            ),
+            help="Relative weights of the flows (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--accounts",
+            type=int,
+            default=0,
+            help="Number of existing accounts to sign in as (see seed_data). "
+            "Without accounts, every virtual user signs up first",
+        )
+        parser.add_argument(
+            "--account-prefix",
+            default="seed",
+            help="Username prefix of the existing accounts",
+        )
+        parser.add_argument(
+            "--password", default="password", help="Password of the accounts"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options["mix"])
+        except ValueError as e:
+            raise CommandError(e)
+
+        load_test = LoadTest(
+            options["url"],
+            concurrency=options["concurrency"],
+            duration=options["duration"],
+            mix=mix,
+            accounts=options["accounts"],
+            account_prefix=options["account_prefix"],
+            password=options["password"],
+            seed=options["seed"],
+        )
+        results = asyncio.run(load_test.run())
+
+        self.stdout.write(
+            f"{'endpoint':<20} {'requests':>9} {'errors':>7} {'rps':>9} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+        for endpoint, stats in results["endpoints"].items():
+            self.stdout.write(
+                f"{endpoint:<20} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>9.1f} "
+                f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+            )
+
+        style = self.style.SUCCESS if not results["errors"] else self.style.WARNING
+        self.stdout.write(
+            style(
+                f"{results['requests']} requests in {results['duration']:.1f}s: "
+                f"{results['rps']:.1f} req/s, {results['error_rate']:.2%} errors"
+            )
+        )
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(results, file, indent=2)
@@ -0,0 +1,58 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from user_auth.hashing import hashing_pool
+from user_auth.provisioning import provision_users
+from user_auth.transfer import FORMATS, get_format, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Signs up the users of a CSV or JSON Lines file (username, email and password "
+        "columns) in batches, each inserted in one transaction, and reports the invalid "
+        "rows. The users receive the sign-up verification email."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "file", help="File to read, whose extension gives the format"
+        )
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            format = options["format"] or get_format(options["file"])
+        except ValueError as e:
+            raise CommandError(e)
+
+        created = failed = 0
+        # One pool of hashing processes for all the batches
+        with open(
+            options["file"], encoding="utf-8", newline=""
+        ) as file, hashing_pool():
+            records = read_records(file, format)
+            offset = 0
+            while batch := list(islice(records, options["batch_size"])):
+                try:
+                    result = provision_users(batch)
+                except IntegrityError as e:
+                    raise CommandError(
+                        f"{e} (rows {offset + 1} to {offset + len(batch)}, "
+                        f"{created} users created before)"
+                    )
+
+                for row in result.errors:
+                    for field, messages in row["errors"].items():
+                        self.stderr.write(
+                            f"Row {offset + row['index'] + 1}: {field}: {' '.join(map(str, messages))}"
+                        )
+                created += len(result.created)
+                failed += len(result.errors)
+                offset += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {created} users, {failed} invalid rows")
+        )
@@ -0,0 +1,26 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from user_auth.audit import purge_auth_events
+
+
+class Command(BaseCommand):
+    help = "Deletes the authentication events older than the retention period, one day at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=None,
+            help="Age in days of the deleted events (defaults to AUDIT_LOG['RETENTION'])",
+        )
+
+    def handle(self, *args, **options):
+        older_than = options["older_than"]
+        deleted = purge_auth_events(
+            datetime.timedelta(days=older_than) if older_than is not None else None
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} authentication events")
+        )
@@ -0,0 +1,237 @@
+import datetime
+import random
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from tokens.jwt import generate_access_token, generate_refresh_token
+from tokens.jwt.types import TokenType
+from tokens.models import Blacklist
+from user_auth.models import CustomUser, Session, UserRequest
+from user_auth.transfer import explicit_timestamps
+
+USER_AGENTS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0",
+    "Moviements/2.3 (Android 14; Pixel 8)",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic users, sessions, blacklisted tokens and pending requests "
+        "for scale testing. The same seed always generates the same data "
+        "(with timestamps relative to the current time)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Number of users")
+        parser.add_argument(
+            "--sessions-per-user",
+            type=float,
+            default=2.0,
+            help="Mean number of sessions per user (geometrically distributed)",
+        )
+        parser.add_argument(
+            "--revoked-fraction",
+            type=float,
+            default=0.1,
+            help="Fraction of the sessions whose tokens are blacklisted",
+        )
+        parser.add_argument(
+            "--expiry-spread",
+            type=int,
+            default=30,
+            help="Days over which session activity and blacklisted token expiries are spread",
+        )
+        parser.add_argument(
+            "--inactive-fraction",
+            type=float,
+            default=0.05,
+            help="Fraction of the users that did not complete their registration",
+        )
+        parser.add_argument(
+            "--password-reset-fraction",
+            type=float,
+            default=0.02,
+            help="Fraction of the active users with a pending password reset request",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix",
+            default="seed",
+            help="Prefix of the generated usernames and emails, to seed several populations",
+        )
+        parser.add_argument(
+            "--password", default="password", help="Password of every generated user"
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options["sessions_per_user"] < 0:
+            raise CommandError("--sessions-per-user must be positive")
+        if CustomUser.objects.filter(username=f"{options['prefix']}0").exists():
+            raise CommandError(
+                f"Users prefixed with {options['prefix']!r} already exist, use another --prefix"
+            )
+
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        self.now = timezone.now()
+        # Hashing is deliberately slow: every user shares one hash (and salt)
+        self.password = make_password(
+            options["password"], salt=f"seed{options['seed']}"
+        )
+
+        counts = dict.fromkeys(("users", "sessions", "blacklist", "requests"), 0)
+        total, batch_size = options["users"], options["batch_size"]
+
+        with explicit_timestamps(CustomUser, Session, Blacklist, UserRequest):
+            for start in range(0, total, batch_size):
+                with transaction.atomic():
+                    for name, count in self.seed_batch(
+                        start, min(start + batch_size, total)
+                    ).items():
+                        counts[name] += count
+
+                if options["verbosity"] > 1:
+                    self.stdout.write(
+                        f"Seeded {min(start + batch_size, total)}/{total} users"
+                    )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Seeded {users} users, {sessions} sessions, {blacklist} blacklisted tokens "
+                "and {requests} pending requests".format(**counts)
+            )
+        )
+
+    def uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def past(self, days: float) -> datetime.datetime:
+        return self.now - datetime.timedelta(seconds=self.rng.uniform(0, days * 86400))
+
+    def seed_batch(self, start: int, end: int) -> dict[str, int]:
+        rng, options = self.rng, self.options
+        prefix = options["prefix"]
+        spread = options["expiry_spread"]
+        # Geometric distribution with the requested mean
+        continue_probability = options["sessions_per_user"] / (
+            options["sessions_per_user"] + 1
+        )
+
+        users, sessions, blacklist, requests = [], [], [], []
+        for index in range(start, end):
+            date_joined = self.past(365 * 3)
+            is_active = rng.random() >= options["inactive_fraction"]
+            user = CustomUser(
+                id=self.uuid(),
+                username=f"{prefix}{index}",
+                email=f"{prefix}{index}@seed.moviements.ru",
+                password=self.password,
+                is_active=is_active,
+                date_joined=date_joined,
+                updated_at=date_joined,
+            )
+            users.append(user)
+
+            if not is_active:
+                requests.append(
+                    UserRequest(
+                        id=self.uuid(),
+                        user=user,
+                        type=UserRequest.UserRequestType.SIGNUP_COMPLETE,
+                        created_at=date_joined,
+                        updated_at=date_joined,
+                    )
+                )
+                continue
+
+            if rng.random() < options["password_reset_fraction"]:
+                created_at = self.past(1)
+                requests.append(
+                    UserRequest(
+                        id=self.uuid(),
+                        user=user,
+                        type=UserRequest.UserRequestType.PASSWORD_RESET,
+                        created_at=created_at,
+                        updated_at=created_at,
+                    )
+                )
+
+            last_login = None
+            while rng.random() < continue_probability:
+                updated_at = self.past(spread)
+                session = Session(
+                    id=self.uuid(),
+                    user=user,
+                    user_agent=rng.choice(USER_AGENTS),
+                    ip_address="{}.{}.{}.{}".format(
+                        rng.randint(1, 223), *(rng.randint(0, 255) for _ in range(3))
+                    ),
+                    created_at=min(updated_at, self.past(spread * 2)),
+                    updated_at=updated_at,
+                )
+                sessions.append(session)
+                last_login = max(last_login or updated_at, updated_at)
+
+                if rng.random() < options["revoked_fraction"]:
+                    blacklist.extend(self.revoke(session, spread))
+
+            user.last_login = last_login
+
+        CustomUser.objects.bulk_create(users)
+        Session.objects.bulk_create_sharded(sessions)
+        Blacklist.objects.bulk_create_sharded(blacklist)
+        UserRequest.objects.bulk_create(requests)
+
+        return {
+            "users": len(users),
+            "sessions": len(sessions),
+            "blacklist": len(blacklist),
+            "requests": len(requests),
+        }
+
+    def revoke(self, session: Session, spread: int) -> list[Blacklist]:
+        """
+        Returns the blacklist entries of a refreshed token pair of the session,
+        expiring within `spread` days of now (in the past or the future).
+        """
+        revoked_at = self.past(spread)
+        access_expires_at = self.now + datetime.timedelta(
+            seconds=self.rng.uniform(-spread * 86400, spread * 86400)
+        )
+        refresh_expires_at = access_expires_at + datetime.timedelta(days=1)
+
+        payload = {
+            "session_id": str(session.id),
+            "user_id": str(session.user_id),
+            "iat": revoked_at,
+        }
+        access_token = generate_access_token(payload | {"exp": access_expires_at})
+        refresh_token = generate_refresh_token(
+            access_token, payload | {"exp": refresh_expires_at}
+        )
+
+        return [
+            Blacklist(
+                id=self.uuid(),
+                user_id=session.user_id,
+                token=token,
+                token_digest=Blacklist.digest(token),
+                token_type=token_type.value,
+                expires_at=expires_at,
+                created_at=revoked_at,
+                updated_at=revoked_at,
+            )
+            for token, token_type, expires_at in (
+                (refresh_token, TokenType.REFRESH, refresh_expires_at),
+                (access_token, TokenType.ACCESS, access_expires_at),
+            )
+        ]
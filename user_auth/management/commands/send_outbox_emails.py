@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user_auth.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Sends queued outbox emails in batches over a single connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Maximum number of emails sent per connection",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep draining the outbox until interrupted",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to sleep when the outbox is empty (with --loop)",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                sent = drain_outbox(options["batch_size"])
+                total += sent
+
+                if sent and options["verbosity"] > 1:
+                    self.stdout.write(f"Sent {sent} emails")
+
+                if not options["loop"]:
+                    if not sent:
+                        break
+                    continue
+
+                if not sent:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {total} emails"))
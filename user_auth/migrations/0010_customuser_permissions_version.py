@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0009_customuser_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='permissions_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented whenever the user groups or permissions change.', verbose_name='permissions version'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.4 on 2026-10-18 23:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0010_customuser_permissions_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='session',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.4 on 2026-10-18 23:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0011_alter_session_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('type', models.CharField(choices=[('sign_in', 'sign in'), ('sign_in_failed', 'failed sign in'), ('refresh', 'refresh'), ('fingerprint_mismatch', 'fingerprint mismatch'), ('password_reset', 'password reset'), ('session_delete', 'session delete')], max_length=255)),
+                ('user_id', models.UUIDField(blank=True, null=True)),
+                ('session_id', models.UUIDField(blank=True, null=True)),
+                ('user_agent', models.CharField(blank=True, max_length=255)),
+                ('ip_address', models.CharField(blank=True, max_length=255)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'authentication event',
+                'verbose_name_plural': 'authentication events',
+                'indexes': [models.Index(fields=['user_id', 'created_at'], name='user_auth_a_user_id_464236_idx')],
+            },
+        ),
+    ]
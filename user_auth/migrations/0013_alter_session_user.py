@@ -0,0 +1,22 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from moviements.db.config import get_shard_aliases
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0012_authevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='session',
+            name='user',
+            field=models.ForeignKey(db_constraint=not get_shard_aliases(), on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,16 +1,20 @@
 import uuid
 from typing import ClassVar
 
+from django.conf import settings
 from django.db import models
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, UserManager
 from django.contrib.auth.validators import UnicodeUsernameValidator
 
+from moviements.db.config import get_shard_aliases
+from moviements.db.sharding import ShardedManager
 from tokens.jwt import generate_token_pair
 
 from .mixins import OwnedModelMixin
+from .permissions_cache import PermissionData, get_permission_data
 
 
 class CustomUserManager(UserManager):
@@ -69,6 +73,13 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     )
 
     date_joined = models.DateTimeField(_("date joined"), default=timezone.now)
+    updated_at = models.DateTimeField(_("updated at"), auto_now=True)
+    permissions_version = models.PositiveIntegerField(
+        _("permissions version"),
+        default=0,
+        editable=False,
+        help_text=_("Incremented whenever the user groups or permissions change."),
+    )
 
     EMAIL_FIELD = "email"
     USERNAME_FIELD = "username"
@@ -80,9 +91,14 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         super().clean()
         self.email = self.__class__.objects.normalize_email(self.email)
 
+    @property
+    def permission_data(self) -> PermissionData:
+        """Groups and permissions of this user, served from the permission cache."""
+        return get_permission_data(self)
+
     def email_user(self, subject, message, from_email=None, **kwargs):
-        """Send an email to this user."""
-        send_mail(subject, message, from_email, [self.email], **kwargs)
+        """Queue an email to this user. It is delivered by the outbox worker."""
+        return EmailOutbox.enqueue(self.email, subject, message, from_email)
 
     class Meta:
         verbose_name = _("user")
@@ -90,11 +106,16 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
 
 class Session(OwnedModelMixin):
-    objects: models.Manager["Session"]
+    objects: ClassVar[ShardedManager] = ShardedManager()
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # With shards, sessions live on another database than their user (see
+    # moviements.db.sharding), where no constraint can reference the users table
     user = models.ForeignKey(
-        CustomUser, on_delete=models.CASCADE, related_name="sessions"
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="sessions",
+        db_constraint=not get_shard_aliases(),
     )
     user_agent = models.CharField(max_length=255)
     ip_address = models.CharField(max_length=255)
@@ -110,7 +131,9 @@ class Session(OwnedModelMixin):
         Returns:
             A tuple containing the access token and the refresh token.
         """
-        access_token, refresh_token = generate_token_pair({"session_id": str(self.id)})
+        access_token, refresh_token = generate_token_pair(
+            {"session_id": str(self.id), "user_id": str(self.user_id)}
+        )
         return access_token, refresh_token
 
     @classmethod
@@ -126,7 +149,7 @@ class Session(OwnedModelMixin):
         Returns:
             Session: The newly created session object.
         """
-        session = cls.objects.create(
+        session = cls.objects.for_user(user.pk).create(
             user=user, user_agent=user_agent, ip_address=ip_address
         )
         return session
@@ -139,6 +162,11 @@ class Session(OwnedModelMixin):
 class UserRequest(models.Model):
     objects: models.Manager["UserRequest"]
 
+    EMAIL_SUBJECTS = {
+        "signup_complete": _("Complete your registration"),
+        "password_reset": _("Reset your password"),
+    }
+
     class UserRequestType(models.TextChoices):
         SIGNUP_COMPLETE = "signup_complete", _("signup complete")
         PASSWORD_RESET = "password_reset", _("password reset")
@@ -154,3 +182,126 @@ class UserRequest(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    def send_email(self) -> "EmailOutbox":
+        """
+        Queues an email with the request id to the request user.
+        Must be called in the same transaction that creates the request.
+
+        Returns:
+            EmailOutbox: The queued email.
+        """
+        return self.user.email_user(*self.get_email())
+
+    def get_email(self) -> tuple[str, str]:
+        """
+        Returns the subject and the body of the email with the request id.
+        """
+        return (
+            str(self.EMAIL_SUBJECTS[self.type]),
+            _("Your request id: %(request_id)s") % {"request_id": self.id},
+        )
+
+
+class EmailOutbox(models.Model):
+    objects: models.Manager["EmailOutbox"]
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("pending")
+        SENT = "sent", _("sent")
+        FAILED = "failed", _("failed")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    to = models.EmailField(max_length=255)
+    from_email = models.CharField(max_length=255, blank=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(
+        max_length=255, choices=Status.choices, default=Status.PENDING.value
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def enqueue(
+        cls, to: str, subject: str, body: str, from_email: str | None = None
+    ) -> "EmailOutbox":
+        """
+        Stores an email in the outbox. Nothing is sent until the outbox worker picks it up.
+
+        Args:
+            to (str): The recipient email address.
+            subject (str): The email subject.
+            body (str): The email body.
+            from_email (str, optional): The sender address. Defaults to DEFAULT_FROM_EMAIL.
+
+        Returns:
+            EmailOutbox: The queued email.
+        """
+        email = cls.build(to, subject, body, from_email)
+        email.save(force_insert=True)
+        return email
+
+    @classmethod
+    def build(
+        cls, to: str, subject: str, body: str, from_email: str | None = None
+    ) -> "EmailOutbox":
+        """
+        Returns an unsaved outbox email, to be queued in bulk with bulk_create.
+        """
+        return cls(
+            to=to, subject=str(subject), body=str(body), from_email=from_email or ""
+        )
+
+    def to_message(self, connection=None) -> EmailMessage:
+        """
+        Builds an EmailMessage for the given email backend connection.
+        """
+        return EmailMessage(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email or settings.DEFAULT_FROM_EMAIL,
+            to=[self.to],
+            connection=connection,
+        )
+
+    class Meta:
+        verbose_name = _("outbox email")
+        verbose_name_plural = _("outbox emails")
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+
+class AuthEvent(models.Model):
+    """
+    Append-only log of the authentication events, written in batches (see user_auth.audit).
+    The user and session are plain ids: events outlive them and may be on another database.
+    """
+
+    objects: models.Manager["AuthEvent"]
+
+    class Type(models.TextChoices):
+        SIGN_IN = "sign_in", _("sign in")
+        SIGN_IN_FAILED = "sign_in_failed", _("failed sign in")
+        REFRESH = "refresh", _("refresh")
+        FINGERPRINT_MISMATCH = "fingerprint_mismatch", _("fingerprint mismatch")
+        PASSWORD_RESET = "password_reset", _("password reset")
+        SESSION_DELETE = "session_delete", _("session delete")
+
+    id = models.BigAutoField(primary_key=True)
+    type = models.CharField(max_length=255, choices=Type.choices)
+    user_id = models.UUIDField(null=True, blank=True)
+    session_id = models.UUIDField(null=True, blank=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+    ip_address = models.CharField(max_length=255, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    # Set when the event happens, not when the batch is written
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = _("authentication event")
+        verbose_name_plural = _("authentication events")
+        indexes = [models.Index(fields=["user_id", "created_at"])]
@@ -0,0 +1,73 @@
+import datetime
+from typing import Any
+
+from django.conf import settings
+
+
+def get_outbox_config(key: str, default: Any = None) -> Any:
+    """
+    get_outbox_config function retrieves a specific configuration value from the EMAIL_OUTBOX dictionary in Django settings.
+
+    Parameters:
+        key (str): The key of the configuration value to retrieve.
+        default (Any, optional): A default value to return if the specified key is not found in the EMAIL_OUTBOX dictionary. Defaults to None.
+
+    Returns:
+        Any: The value associated with the specified key in the EMAIL_OUTBOX dictionary, or the default value if the key is not found.
+    """
+    return getattr(settings, "EMAIL_OUTBOX", {}).get(key, default)
+
+
+def get_batch_size() -> int:
+    """
+    get_batch_size function retrieves the value of the "BATCH_SIZE" configuration from the EMAIL_OUTBOX dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 100.
+
+    Returns:
+        int: The maximum number of emails sent over a single connection.
+    """
+    return get_outbox_config("BATCH_SIZE", 100)
+
+
+def get_max_attempts() -> int:
+    """
+    get_max_attempts function retrieves the value of the "MAX_ATTEMPTS" configuration from the EMAIL_OUTBOX dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 5.
+
+    Returns:
+        int: The number of delivery attempts after which an email is marked as failed.
+    """
+    return get_outbox_config("MAX_ATTEMPTS", 5)
+
+
+def get_backoff_base() -> datetime.timedelta:
+    """
+    get_backoff_base function retrieves the value of the "BACKOFF_BASE" configuration from the EMAIL_OUTBOX dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 30 seconds.
+
+    Returns:
+        datetime.timedelta: The delay before the first retry. Every next retry doubles it.
+    """
+    return get_outbox_config("BACKOFF_BASE", datetime.timedelta(seconds=30))
+
+
+def get_backoff_max() -> datetime.timedelta:
+    """
+    get_backoff_max function retrieves the value of the "BACKOFF_MAX" configuration from the EMAIL_OUTBOX dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 1 hour.
+
+    Returns:
+        datetime.timedelta: The upper bound of the delay between two retries.
+    """
+    return get_outbox_config("BACKOFF_MAX", datetime.timedelta(hours=1))
+
+
+def get_lease() -> datetime.timedelta:
+    """
+    get_lease function retrieves the value of the "LEASE" configuration from the EMAIL_OUTBOX dictionary in Django settings.
+    If the key is not found, it returns the default value, which is 5 minutes.
+
+    Returns:
+        datetime.timedelta: How long a batch claimed by drain_outbox is hidden from the other workers. The emails of a worker that dies while sending them are retried after it.
+    """
+    return get_outbox_config("LEASE", datetime.timedelta(minutes=5))
@@ -0,0 +1,117 @@
+from typing import Optional
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from user_auth.models import EmailOutbox
+
+from .config import (
+    get_batch_size,
+    get_max_attempts,
+    get_backoff_base,
+    get_backoff_max,
+    get_lease,
+)
+
+__all__ = ["claim_batch", "drain_outbox", "schedule_retry"]
+
+
+def schedule_retry(email: EmailOutbox, error: str) -> None:
+    """
+    Registers a failed delivery attempt and schedules the next one with exponential backoff.
+    Once the maximum number of attempts is reached, the email is marked as failed and is not retried anymore.
+
+    Parameters:
+        email (EmailOutbox): The email whose delivery failed.
+        error (str): The error message to store.
+    """
+    email.attempts += 1
+    email.last_error = error
+
+    if email.attempts >= get_max_attempts():
+        email.status = EmailOutbox.Status.FAILED
+        return
+
+    delay = min(get_backoff_base() * 2 ** (email.attempts - 1), get_backoff_max())
+    email.next_attempt_at = timezone.now() + delay
+
+
+def claim_batch(batch_size: int) -> list[EmailOutbox]:
+    """
+    Claims a batch of due pending emails: their next attempt is pushed back by the lease,
+    so that the other workers skip them while they are sent. The rows are only locked
+    for the duration of this short transaction (where the database supports it).
+    """
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(
+                status=EmailOutbox.Status.PENDING,
+                next_attempt_at__lte=timezone.now(),
+            )
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        if batch:
+            EmailOutbox.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=timezone.now() + get_lease()
+            )
+    return batch
+
+
+def drain_outbox(batch_size: Optional[int] = None) -> int:
+    """
+    Sends a batch of pending emails over a single email backend connection.
+
+    The batch is claimed in a first transaction (see claim_batch), sent outside of any
+    transaction, and the results are recorded in a second one: the database is not
+    locked while the email backend is slow. Several workers can drain the outbox
+    concurrently without sending the same email twice, unless a batch takes longer
+    than EMAIL_OUTBOX["LEASE"] to send.
+
+    Parameters:
+        batch_size (int, optional): The maximum number of emails to send. Defaults to the "BATCH_SIZE" setting.
+
+    Returns:
+        int: The number of successfully sent emails.
+    """
+    sent = 0
+
+    batch = claim_batch(batch_size or get_batch_size())
+    if not batch:
+        return 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            schedule_retry(email, str(e))
+    else:
+        try:
+            for email in batch:
+                try:
+                    connection.send_messages([email.to_message(connection)])
+                except Exception as e:
+                    schedule_retry(email, str(e))
+                else:
+                    email.status = EmailOutbox.Status.SENT
+                    email.attempts += 1
+                    email.sent_at = timezone.now()
+                    sent += 1
+        finally:
+            connection.close()
+
+    with transaction.atomic():
+        EmailOutbox.objects.bulk_update(
+            batch,
+            fields=(
+                "status",
+                "attempts",
+                "next_attempt_at",
+                "last_error",
+                "sent_at",
+            ),
+        )
+
+    return sent
@@ -0,0 +1,81 @@
+"""
+Per-user permission cache.
+
+Cache entries are keyed by the user id and CustomUser.permissions_version, which the
+receivers in user_auth.signals increment whenever the user groups or permissions (or the
+permissions of one of its groups) change. The version is read with the user row, so
+a stale entry is never served, even when the cache is local to each process.
+
+PERMISSION_CACHE_ALIAS selects the cache: an in-process LocMemCache by default, or a
+shared backend (Redis, Memcached) to share entries between workers.
+"""
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+
+
+@dataclass(frozen=True)
+class PermissionData:
+    group_ids: tuple[int, ...]
+    user_permission_ids: tuple[int, ...]
+    user_permissions: frozenset[str]
+    group_permissions: frozenset[str]
+
+    @property
+    def all_permissions(self) -> frozenset[str]:
+        return self.user_permissions | self.group_permissions
+
+
+def get_permission_cache_key(user) -> str:
+    return f"user_auth:permissions:{user.pk}:{user.permissions_version}"
+
+
+def load_permission_data(user) -> PermissionData:
+    """
+    Loads the groups and permissions of the user from the database.
+    """
+    user_permissions = Permission.objects.filter(user=user).values_list(
+        "id", "content_type__app_label", "codename"
+    )
+    group_permissions = Permission.objects.filter(group__user=user).values_list(
+        "content_type__app_label", "codename"
+    )
+
+    return PermissionData(
+        group_ids=tuple(user.groups.order_by("id").values_list("id", flat=True)),
+        user_permission_ids=tuple(sorted(id for id, _, _ in user_permissions)),
+        user_permissions=frozenset(
+            f"{app_label}.{codename}" for _, app_label, codename in user_permissions
+        ),
+        group_permissions=frozenset(
+            f"{app_label}.{codename}" for app_label, codename in group_permissions
+        ),
+    )
+
+
+def get_permission_data(user) -> PermissionData:
+    """
+    Returns the groups and permissions of the user, from the instance, the cache or the database.
+
+    Parameters:
+        user (CustomUser): The user.
+
+    Returns:
+        PermissionData: The groups and permissions of the user.
+    """
+    key = get_permission_cache_key(user)
+    cached = getattr(user, "_permission_data", None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    cache = caches[settings.PERMISSION_CACHE_ALIAS]
+    data = cache.get(key)
+    if data is None:
+        data = load_permission_data(user)
+        cache.set(key, data)
+
+    user._permission_data = (key, data)
+    return data
@@ -0,0 +1,122 @@
+"""
+Bulk sign-up of users, for partner integrations (POST /auth/users/bulk/ and
+`manage.py provision_users`).
+
+Every row of a batch is validated like a SignUpView request, except for the uniqueness
+of the usernames and emails, which is checked with a single query for the whole batch
+(and within the batch). The passwords of the valid rows are hashed in a process pool (see
+user_auth.hashing), then the users, their sign-up requests and their verification emails
+are inserted with one bulk_create each, in a single transaction. Invalid rows are
+reported with their index and their errors, and are not inserted.
+"""
+
+from dataclasses import dataclass, field
+from typing import cast
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Field, Q
+
+from .hashing import hash_passwords
+from .models import EmailOutbox, UserRequest
+from .serializers import BulkSignUpSerializer
+
+User = get_user_model()
+
+
+@dataclass
+class ProvisioningResult:
+    created: list[dict] = field(default_factory=list)
+    errors: list[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {"created": self.created, "errors": self.errors}
+
+
+def validate_users(records: list[dict]) -> tuple[dict[int, dict], dict[int, dict]]:
+    """
+    Validates the rows of a batch.
+
+    Returns:
+        tuple[dict[int, dict], dict[int, dict]]: The validated data and the errors of the rows, by index.
+    """
+    valid, errors = {}, {}
+    for index, record in enumerate(records):
+        serializer = BulkSignUpSerializer(data=record)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            errors[index] = serializer.errors
+
+    existing: dict[str, set[str]] = {"username": set(), "email": set()}
+    for username, email in User.objects.filter(
+        Q(username__in=[data["username"] for data in valid.values()])
+        | Q(email__in=[data["email"] for data in valid.values()])
+    ).values_list("username", "email"):
+        existing["username"].add(username)
+        existing["email"].add(email)
+
+    for field_name, taken in existing.items():
+        model_field = cast(Field, User._meta.get_field(field_name))
+        message = str(model_field.error_messages["unique"])
+        for index, data in valid.items():
+            # The first row of the batch with a value wins
+            if data[field_name] in taken:
+                errors.setdefault(index, {})[field_name] = [message]
+            taken.add(data[field_name])
+
+    return {index: data for index, data in valid.items() if index not in errors}, errors
+
+
+def provision_users(records: list[dict]) -> ProvisioningResult:
+    """
+    Signs up a batch of users (see the module docstring).
+
+    Parameters:
+        records (list[dict]): The username, email and password of every user.
+
+    Returns:
+        ProvisioningResult: The created users and the errors, with the index of their row.
+
+    Raises:
+        IntegrityError: If a username or email was taken by a concurrent sign-up.
+    """
+    valid, errors = validate_users(records)
+    result = ProvisioningResult(
+        errors=[
+            {"index": index, "errors": row_errors}
+            for index, row_errors in sorted(errors.items())
+        ]
+    )
+    if not valid:
+        return result
+
+    passwords = hash_passwords([data["password"] for data in valid.values()])
+    users = [
+        User(username=data["username"], email=data["email"], password=password)
+        for data, password in zip(valid.values(), passwords)
+    ]
+    requests = [
+        UserRequest(user=user, type=UserRequest.UserRequestType.SIGNUP_COMPLETE)
+        for user in users
+    ]
+    emails = [
+        EmailOutbox.build(user.email, *request.get_email())
+        for user, request in zip(users, requests)
+    ]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        UserRequest.objects.bulk_create(requests)
+        EmailOutbox.objects.bulk_create(emails)
+
+    result.created = [
+        {
+            "index": index,
+            "id": str(user.pk),
+            "username": user.username,
+            "request_id": str(request.pk),
+        }
+        for index, user, request in zip(valid, users, requests)
+    ]
+    return result
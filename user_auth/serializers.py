@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
 from .models import Session
 
@@ -8,6 +10,17 @@ User = get_user_model()
 
 # Models
 class UserSerializer(serializers.ModelSerializer):
+    groups = serializers.ListField(
+        child=serializers.IntegerField(),
+        source="permission_data.group_ids",
+        read_only=True,
+    )
+    user_permissions = serializers.ListField(
+        child=serializers.IntegerField(),
+        source="permission_data.user_permission_ids",
+        read_only=True,
+    )
+
     class Meta:
         model = User
         fields = (
@@ -45,12 +58,41 @@ class SignUpSerializer(serializers.ModelSerializer):
         fields = ("username", "email", "password")
 
 
+class BulkSignUpSerializer(SignUpSerializer):
+    """
+    SignUpSerializer without the uniqueness checks, which user_auth.provisioning runs
+    with one query for the whole batch.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for field in fields.values():
+            field.validators = [
+                validator
+                for validator in field.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
+        return fields
+
+
+class BulkSignUpRequestSerializer(serializers.Serializer):
+    users = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_users(self, users):
+        max_batch_size = settings.BULK_PROVISIONING["MAX_BATCH_SIZE"]
+        if len(users) > max_batch_size:
+            raise serializers.ValidationError(
+                f"Ensure this field has no more than {max_batch_size} elements."
+            )
+        return users
+
+
 class SignInSerializer(serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField()
 
 
-class SignInResponseSerializer(serializers.ModelSerializer):
+class SignInResponseSerializer(serializers.Serializer):
     access_token = serializers.CharField()
     refresh_token = serializers.CharField()
 
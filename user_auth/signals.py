@@ -0,0 +1,97 @@
+from django.contrib.auth.models import Group, Permission
+from django.core.signals import request_finished
+from django.db import connections, router
+from django.db.models import F, Q
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from moviements.db.sharding import is_sharded
+
+from .audit import get_audit_writer
+from .models import AuthEvent, CustomUser, Session
+
+USER_M2M_FIELDS = {
+    CustomUser.groups.through: "groups",
+    CustomUser.user_permissions.through: "user_permissions",
+}
+
+
+def bump_permissions_version(users) -> None:
+    """
+    Increments the permissions version (and updated_at) of the given users,
+    invalidating their cached permissions and their representation ETag.
+
+    Parameters:
+        users (QuerySet): The users whose permissions changed.
+    """
+    users.update(
+        permissions_version=F("permissions_version") + 1,
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+def user_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action not in ("post_add", "post_remove", "post_clear"):
+            return
+        bump_permissions_version(CustomUser.objects.filter(pk=instance.pk))
+        instance.refresh_from_db(fields=("permissions_version", "updated_at"))
+    elif action in ("post_add", "post_remove"):
+        bump_permissions_version(CustomUser.objects.filter(pk__in=pk_set))
+    elif action == "pre_clear":
+        # The group or permission is cleared from the other side of the relation
+        bump_permissions_version(
+            CustomUser.objects.filter(**{USER_M2M_FIELDS[sender]: instance})
+        )
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action not in ("post_add", "post_remove", "post_clear"):
+            return
+        users = CustomUser.objects.filter(groups=instance)
+    elif action in ("post_add", "post_remove"):
+        users = CustomUser.objects.filter(groups__in=pk_set)
+    elif action == "pre_clear":
+        users = CustomUser.objects.filter(groups__permissions=instance)
+    else:
+        return
+
+    bump_permissions_version(CustomUser.objects.filter(pk__in=users.values("pk")))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # Cascade deletes of the m2m rows do not send m2m_changed
+    bump_permissions_version(CustomUser.objects.filter(groups=instance))
+
+
+@receiver(pre_delete, sender=Permission)
+def permission_deleted(sender, instance, **kwargs):
+    users = CustomUser.objects.filter(
+        Q(user_permissions=instance) | Q(groups__permissions=instance)
+    )
+    bump_permissions_version(CustomUser.objects.filter(pk__in=users.values("pk")))
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_deleted(sender, instance, **kwargs):
+    # The cascade only reaches the sessions on the database of the user
+    if is_sharded(Session):
+        Session.objects.for_user(instance.pk).filter(user_id=instance.pk).delete()
+
+
+@receiver(request_finished)
+def flush_audit_log(sender, **kwargs):
+    # After the response is sent: the request never waits for the write. Django's
+    # close_old_connections runs first, so a connection opened for the write is closed
+    # again rather than left idle until the next request
+    connection = connections[router.db_for_write(AuthEvent)]
+    was_closed = connection.connection is None
+    get_audit_writer().flush_if_due()
+    if was_closed and connection.connection is not None:
+        connection.close()
@@ -1,6 +1,49 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import re
+import tempfile
+import threading
+import uuid
+from datetime import timedelta
+from unittest import mock, skipIf
 
-from .models import CustomUser, Session
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import Group, Permission
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection
+from django.test import (
+    LiveServerTestCase,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from django.utils import timezone
+
+from rest_framework.request import Request
+
+from monitoring.testing import QueryBudgetTestMixin
+from moviements.db.admin import EstimatedCountPaginator
+
+from tokens.models import Blacklist
+
+from . import hashing, idempotency
+from .audit import get_audit_writer, purge_auth_events, record_auth_event
+from .loadtest import LoadTest
+from .loadtest.client import HTTPResponse
+from .loadtest.runner import VirtualUser
+from .models import AuthEvent, CustomUser, Session, UserRequest, EmailOutbox
+from .outbox import drain_outbox
+from .serializers import UserSerializer
+from .signals import flush_audit_log
 
 USER_CREDENTIALS = ("testuser", "testuser@moviements.ru", "testpassword")
 SUPERUSER_CREDENTIALS = ("superuser", "superuser@moviements.ru", "superpassword")
@@ -80,3 +123,993 @@ class SessionsTestCase(TestCase):
         self.user.delete()
         self.session.delete()
         self.session2.delete()
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("SMTP server unavailable")
+
+
+class ClaimCheckingEmailBackend(BaseEmailBackend):
+    due_while_sending: list[int] = []
+
+    def send_messages(self, email_messages):
+        self.due_while_sending.append(
+            EmailOutbox.objects.filter(
+                status=EmailOutbox.Status.PENDING, next_attempt_at__lte=timezone.now()
+            ).count()
+        )
+        return len(email_messages)
+
+
+class EmailOutboxTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username=USER_CREDENTIALS[0], email=USER_CREDENTIALS[1]
+        )
+
+    def test_email_user_is_queued(self):
+        self.user.email_user("Subject", "Body")
+
+        self.assertEqual(len(mail.outbox), 0)
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.to, USER_CREDENTIALS[1])
+        self.assertEqual(email.status, EmailOutbox.Status.PENDING)
+
+    def test_drain_outbox(self):
+        for i in range(3):
+            self.user.email_user(f"Subject {i}", "Body")
+
+        self.assertEqual(drain_outbox(batch_size=2), 2)
+        self.assertEqual(drain_outbox(batch_size=2), 1)
+        self.assertEqual(drain_outbox(batch_size=2), 0)
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(
+            EmailOutbox.objects.exclude(status=EmailOutbox.Status.SENT).exists()
+        )
+
+    @override_settings(EMAIL_BACKEND="user_auth.tests.ClaimCheckingEmailBackend")
+    def test_drain_outbox_claims_batch(self):
+        self.addCleanup(ClaimCheckingEmailBackend.due_while_sending.clear)
+        for i in range(2):
+            self.user.email_user(f"Subject {i}", "Body")
+
+        self.assertEqual(drain_outbox(), 2)
+        # The batch is hidden from the other workers while it is sent
+        self.assertEqual(ClaimCheckingEmailBackend.due_while_sending, [0, 0])
+
+    @override_settings(
+        EMAIL_BACKEND="user_auth.tests.FailingEmailBackend",
+        EMAIL_OUTBOX={"MAX_ATTEMPTS": 2, "BACKOFF_BASE": timedelta(seconds=30)},
+    )
+    def test_drain_outbox_retries_with_backoff(self):
+        email = self.user.email_user("Subject", "Body")
+
+        self.assertEqual(drain_outbox(), 0)
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailOutbox.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn("SMTP server unavailable", email.last_error)
+
+        # Not due yet
+        self.assertEqual(drain_outbox(), 0)
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        drain_outbox()
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailOutbox.Status.FAILED)
+        self.assertEqual(email.attempts, 2)
+
+    def test_sign_up_queues_verification_email(self):
+        response = self.client.post(
+            "/auth/signup/",
+            {
+                "username": SUPERUSER_CREDENTIALS[0],
+                "email": SUPERUSER_CREDENTIALS[1],
+                "password": SUPERUSER_CREDENTIALS[2],
+            },
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        verification_request = UserRequest.objects.get(id=response.json()["request_id"])
+        email = EmailOutbox.objects.get(to=SUPERUSER_CREDENTIALS[1])
+        self.assertIn(str(verification_request.id), email.body)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username=USER_CREDENTIALS[0], email=USER_CREDENTIALS[1], is_active=True
+        )
+        self.session = Session.create_for_user(self.user, USER_AGENT, REMOTE_IP)
+        self.access_token, _ = self.session.create_token_pair()
+
+    def get(self, path, etag=None):
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "User-Agent": USER_AGENT,
+        }
+        if etag:
+            headers["If-None-Match"] = etag
+        return self.client.get(path, headers=headers, REMOTE_ADDR=REMOTE_IP)
+
+    def test_me_not_modified(self):
+        response = self.get("/auth/me/")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith("W/"))
+
+        # Blacklist check and session lookup only: no touch writes, no serialization
+        with self.assertNumQueries(2):
+            response = self.get("/auth/me/", etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_me_modified(self):
+        etag = self.get("/auth/me/")["ETag"]
+
+        self.user.info = "Changed"
+        self.user.save()
+        response = self.get("/auth/me/", etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        self.user.groups.add(Group.objects.create(name="group"))
+        self.assertEqual(self.get("/auth/me/", etag).status_code, 200)
+
+    def test_sessions_not_modified(self):
+        etag = self.get("/auth/sessions/")["ETag"]
+        self.assertEqual(self.get("/auth/sessions/", etag).status_code, 304)
+
+        Session.create_for_user(self.user, USER_AGENT, REMOTE_IP)
+        response = self.get("/auth/sessions/", etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["sessions"]), 2)
+
+    def test_session_not_modified(self):
+        path = f"/auth/sessions/{self.session.id}/"
+        etag = self.get(path)["ETag"]
+        self.assertEqual(self.get(path, etag).status_code, 304)
+
+    def test_fingerprint_mismatch(self):
+        response = self.client.get(
+            "/auth/me/",
+            headers={
+                "Authorization": f"Bearer {self.access_token}",
+                "User-Agent": "Other",
+            },
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Session.objects.filter(id=self.session.id).exists())
+        self.assertTrue(EmailOutbox.objects.filter(to=self.user.email).exists())
+
+
+class PermissionCacheTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username=USER_CREDENTIALS[0], email=USER_CREDENTIALS[1], is_active=True
+        )
+        self.permission = Permission.objects.get(
+            content_type__app_label="user_auth", codename="view_session"
+        )
+        self.group = Group.objects.create(name="group")
+
+    def fetch_user(self):
+        return CustomUser.objects.get(pk=self.user.pk)
+
+    def test_user_permissions(self):
+        self.assertFalse(self.fetch_user().has_perm("user_auth.view_session"))
+
+        self.user.user_permissions.add(self.permission)
+        user = self.fetch_user()
+        self.assertTrue(user.has_perm("user_auth.view_session"))
+        self.assertEqual(user.get_all_permissions(), {"user_auth.view_session"})
+
+        # Served from the cache
+        user = self.fetch_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm("user_auth.view_session"))
+
+        self.user.user_permissions.remove(self.permission)
+        self.assertFalse(self.fetch_user().has_perm("user_auth.view_session"))
+
+    def test_group_permissions(self):
+        self.user.groups.add(self.group)
+        self.assertFalse(self.fetch_user().has_perm("user_auth.view_session"))
+
+        self.group.permissions.add(self.permission)
+        self.assertTrue(self.fetch_user().has_perm("user_auth.view_session"))
+
+        self.group.delete()
+        self.assertFalse(self.fetch_user().has_perm("user_auth.view_session"))
+
+    def test_inactive_user(self):
+        self.user.user_permissions.add(self.permission)
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertFalse(self.fetch_user().has_perm("user_auth.view_session"))
+
+    def test_serializer(self):
+        self.user.groups.add(self.group)
+        self.user.user_permissions.add(self.permission)
+
+        data = UserSerializer(self.fetch_user()).data
+        self.assertEqual(data["groups"], [self.group.id])
+        self.assertEqual(data["user_permissions"], [self.permission.id])
+
+        user = self.fetch_user()
+        with self.assertNumQueries(0):
+            UserSerializer(user).data
+
+
+class QueryBudgetTestCase(QueryBudgetTestMixin, TestCase):
+    query_budgets = {
+        "sign_up": 8,
+        "sign_up_complete": 4,
+        "bulk_sign_up": 9,
+        "sign_in": 3,
+        "refresh": 5,
+        "reset_password_request": 6,
+        "reset_password_complete": 5,
+        "me": 6,
+        "session": 4,
+        "sessions": 5,
+    }
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username=USER_CREDENTIALS[0],
+            email=USER_CREDENTIALS[1],
+            password=USER_CREDENTIALS[2],
+            is_active=True,
+        )
+        self.user.groups.add(Group.objects.create(name="group"))
+        for _ in range(3):
+            Session.create_for_user(self.user, USER_AGENT, REMOTE_IP)
+        self.session = Session.create_for_user(self.user, USER_AGENT, REMOTE_IP)
+        self.access_token, self.refresh_token = self.session.create_token_pair()
+
+    def post(self, path, data=None, token=None):
+        headers = {"User-Agent": USER_AGENT}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return self.client.post(
+            path,
+            data,
+            content_type="application/json",
+            headers=headers,
+            REMOTE_ADDR=REMOTE_IP,
+        )
+
+    def get(self, path):
+        return self.client.get(
+            path,
+            headers={
+                "Authorization": f"Bearer {self.access_token}",
+                "User-Agent": USER_AGENT,
+            },
+            REMOTE_ADDR=REMOTE_IP,
+        )
+
+    def test_every_route_has_a_budget(self):
+        url_names = {
+            pattern.name for pattern in get_resolver("user_auth.urls").url_patterns
+        }
+        self.assertEqual(url_names, set(self.query_budgets))
+
+    def test_sign_up(self):
+        with self.assertQueryBudget("sign_up"):
+            response = self.post(
+                "/auth/signup/",
+                {
+                    "username": "newuser",
+                    "email": "newuser@moviements.ru",
+                    "password": "newpassword",
+                },
+            )
+        self.assertEqual(response.status_code, 201)
+
+        with self.assertQueryBudget("sign_up_complete"):
+            response = self.post(
+                f"/auth/signup/complete/{response.json()['request_id']}"
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_sign_up(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_staff=True)
+        with self.assertQueryBudget("bulk_sign_up"):
+            response = self.post(
+                "/auth/users/bulk/",
+                {
+                    "users": [
+                        {
+                            "username": "newuser",
+                            "email": "newuser@moviements.ru",
+                            "password": "newpassword",
+                        }
+                    ]
+                },
+                token=self.access_token,
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_sign_in(self):
+        with self.assertQueryBudget("sign_in"):
+            response = self.post(
+                "/auth/signin/",
+                {"username": USER_CREDENTIALS[0], "password": USER_CREDENTIALS[2]},
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_refresh(self):
+        with self.assertQueryBudget("refresh"):
+            response = self.post("/auth/refresh/", token=self.refresh_token)
+        self.assertEqual(response.status_code, 200)
+
+    def test_reset_password(self):
+        with self.assertQueryBudget("reset_password_request"):
+            response = self.post(
+                "/auth/reset-password/", {"username": USER_CREDENTIALS[0]}
+            )
+        self.assertEqual(response.status_code, 201)
+
+        with self.assertQueryBudget("reset_password_complete"):
+            response = self.post(
+                f"/auth/reset-password/{response.json()['request_id']}/",
+                {"new_password": "newpassword"},
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_me(self):
+        with self.assertQueryBudget("me"):
+            response = self.get("/auth/me/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_sessions(self):
+        with self.assertQueryBudget("sessions"):
+            response = self.get("/auth/sessions/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["sessions"]), 4)
+
+        with self.assertQueryBudget("session"):
+            response = self.get(f"/auth/sessions/{self.session.id}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_url_name_is_checked(self):
+        with self.assertRaisesMessage(
+            AssertionError, "resolved to 'me', not 'session'"
+        ):
+            with self.assertQueryBudget("session"):
+                self.get("/auth/me/")
+
+
+@skipIf(settings.API_ONLY, "API-only processes do not serve the admin")
+class AdminTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            CustomUser.objects.create_superuser(*SUPERUSER_CREDENTIALS)
+        )
+
+    def create_user(self, sessions: int = 2) -> CustomUser:
+        name = uuid.uuid4().hex[:12]
+        user = CustomUser.objects.create_user(
+            username=name, email=f"{name}@moviements.ru", is_active=True
+        )
+        for _ in range(sessions):
+            Session.create_for_user(user, USER_AGENT, REMOTE_IP)
+        return user
+
+    def test_user_changelist_queries(self):
+        self.create_user()
+        with CaptureQueriesContext(connection) as few_users:
+            self.assertEqual(
+                self.client.get("/admin/user_auth/customuser/").status_code, 200
+            )
+
+        users = [self.create_user() for _ in range(5)]
+        with CaptureQueriesContext(connection) as more_users:
+            response = self.client.get("/admin/user_auth/customuser/")
+
+        self.assertEqual(len(more_users), len(few_users))
+        self.assertContains(response, f"?user__id__exact={users[0].pk}")
+
+    def test_session_search(self):
+        user, other_user = self.create_user(), self.create_user()
+
+        response = self.client.get(f"/admin/user_auth/session/?q={user.pk}")
+        for session in user.sessions.all():
+            self.assertContains(response, str(session.pk))
+        for session in other_user.sessions.all():
+            self.assertNotContains(response, str(session.pk))
+
+        response = self.client.get(
+            f"/admin/user_auth/session/?user__id__exact={user.pk}"
+        )
+        self.assertContains(response, str(user.sessions.first().pk))
+
+    def test_recent_sessions_inline(self):
+        user = self.create_user(sessions=25)
+        sessions = list(user.sessions.all())
+        for index, session in enumerate(sessions):
+            Session.objects.filter(pk=session.pk).update(
+                updated_at=timezone.now() - timedelta(minutes=index)
+            )
+
+        response = self.client.get(f"/admin/user_auth/customuser/{user.pk}/change/")
+
+        total_forms = re.search(
+            r'name="sessions-TOTAL_FORMS" value="(\d+)"', response.content.decode()
+        )
+        self.assertEqual(total_forms.group(1), "20")
+        self.assertContains(response, str(sessions[0].pk))
+        self.assertNotContains(response, str(sessions[-1].pk))
+
+    def test_estimated_count(self):
+        for _ in range(3):
+            self.create_user()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.create_user(sessions=1)
+
+        paginator = type("Paginator", (EstimatedCountPaginator,), {"count_limit": 2})
+        # From the statistics, before the last session
+        self.assertEqual(paginator(Session.objects.order_by("pk"), 100).count, 6)
+        # Filtered lists are counted up to count_limit + 1
+        self.assertEqual(
+            paginator(
+                Session.objects.filter(user__is_active=True).order_by("pk"), 100
+            ).count,
+            3,
+        )
+        self.assertEqual(
+            EstimatedCountPaginator(Session.objects.order_by("pk"), 100).count, 7
+        )
+
+
+class TransferTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(*USER_CREDENTIALS, is_active=True)
+        self.sessions = [
+            Session.create_for_user(self.user, USER_AGENT, REMOTE_IP) for _ in range(3)
+        ]
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def snapshot(self):
+        return (
+            list(
+                CustomUser.objects.order_by("id").values_list(
+                    "id", "username", "password", "date_joined", "updated_at"
+                )
+            ),
+            list(Session.objects.order_by("id").values()),
+        )
+
+    def test_round_trip(self):
+        for format in ("csv", "jsonl"):
+            with self.subTest(format=format):
+                before = self.snapshot()
+                for model in ("users", "sessions"):
+                    call_command(
+                        "export_data",
+                        model,
+                        output=f"{self.directory}/{model}.{format}",
+                        stderr=io.StringIO(),
+                    )
+
+                Session.objects.all().delete()
+                CustomUser.objects.all().delete()
+                for model in ("users", "sessions"):
+                    call_command(
+                        "import_data",
+                        model,
+                        f"{self.directory}/{model}.{format}",
+                        batch_size=2,
+                        stdout=io.StringIO(),
+                    )
+
+                self.assertEqual(self.snapshot(), before)
+                self.assertTrue(
+                    CustomUser.objects.get().check_password(USER_CREDENTIALS[2])
+                )
+
+    def test_stdout(self):
+        stdout = io.StringIO()
+        call_command("export_data", "sessions", format="jsonl", stdout=stdout)
+
+        records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(
+            {record["id"] for record in records},
+            {str(session.id) for session in self.sessions},
+        )
+        self.assertEqual(records[0]["user_id"], str(self.user.id))
+
+    @skipIf(settings.API_ONLY, "API-only processes do not serve the admin")
+    def test_admin_export(self):
+        self.client.force_login(
+            CustomUser.objects.create_superuser(*SUPERUSER_CREDENTIALS)
+        )
+
+        response = self.client.post(
+            "/admin/user_auth/session/",
+            {
+                "action": "export_csv",
+                "_selected_action": [str(session.pk) for session in self.sessions[:2]],
+            },
+        )
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            lines[0], "id,user_id,user_agent,ip_address,created_at,updated_at"
+        )
+        self.assertEqual(len(lines), 3)
+
+    def test_import_existing(self):
+        path = f"{self.directory}/users.csv"
+        call_command("export_data", "users", output=path, stderr=io.StringIO())
+
+        call_command(
+            "import_data", "users", path, skip_existing=True, stdout=io.StringIO()
+        )
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+        with self.assertRaises(CommandError):
+            call_command("import_data", "users", path, stdout=io.StringIO())
+
+
+@override_settings(
+    AUDIT_LOG={"ENABLED": True, "FLUSH_SIZE": 2, "FLUSH_INTERVAL": timedelta(hours=1)}
+)
+class AuditLogTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(*USER_CREDENTIALS, is_active=True)
+        self.addCleanup(get_audit_writer().clear)
+
+    def sign_in(self, password):
+        return self.client.post(
+            "/auth/signin/",
+            {"username": USER_CREDENTIALS[0], "password": password},
+            content_type="application/json",
+            headers={"User-Agent": USER_AGENT},
+            REMOTE_ADDR=REMOTE_IP,
+        )
+
+    def test_buffered_sign_in_events(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.sign_in("wrongpassword").status_code, 403)
+        self.assertEqual(len(get_audit_writer()), 1)
+        self.assertFalse(AuthEvent.objects.exists())
+
+        # The buffer is full at the end of the request: both events are written at once
+        response = self.sign_in(USER_CREDENTIALS[2])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(get_audit_writer()), 0)
+
+        failed, signed_in = AuthEvent.objects.order_by("id")
+        self.assertEqual(failed.type, AuthEvent.Type.SIGN_IN_FAILED)
+        self.assertEqual(failed.data, {"reason": "invalid_password"})
+        self.assertEqual(signed_in.type, AuthEvent.Type.SIGN_IN)
+        self.assertEqual(signed_in.user_id, self.user.pk)
+        self.assertEqual(signed_in.session_id, Session.objects.get().pk)
+        self.assertEqual(
+            (signed_in.user_agent, signed_in.ip_address), (USER_AGENT, REMOTE_IP)
+        )
+        self.assertLess(failed.created_at, signed_in.created_at)
+
+    def test_flush_closes_the_connection_it_opens(self):
+        for _ in range(2):
+            record_auth_event(AuthEvent.Type.SIGN_IN_FAILED)
+        opened = connection.connection
+
+        # As left by close_old_connections, which runs before the flush
+        with mock.patch.object(connection, "connection", None), mock.patch.object(
+            connection, "close"
+        ) as close, mock.patch.object(
+            AuthEvent.objects,
+            "bulk_create",
+            side_effect=lambda events: setattr(connection, "connection", opened),
+        ):
+            flush_audit_log(sender=None)
+        close.assert_called_once()
+
+        with mock.patch.object(connection, "close") as close:
+            for _ in range(2):
+                record_auth_event(AuthEvent.Type.SIGN_IN_FAILED)
+            flush_audit_log(sender=None)
+        close.assert_not_called()
+        self.assertEqual(AuthEvent.objects.count(), 2)
+
+    def test_flush_interval(self):
+        with override_settings(
+            AUDIT_LOG={"FLUSH_SIZE": 100, "FLUSH_INTERVAL": timedelta(0)}
+        ):
+            self.sign_in("wrongpassword")
+        self.assertEqual(AuthEvent.objects.count(), 1)
+
+    def test_session_events(self):
+        session = Session.create_for_user(self.user, USER_AGENT, REMOTE_IP)
+        other = Session.create_for_user(self.user, USER_AGENT, REMOTE_IP)
+        access_token, _ = session.create_token_pair()
+
+        response = self.client.delete(
+            f"/auth/sessions/{other.pk}/",
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "User-Agent": USER_AGENT,
+            },
+            REMOTE_ADDR=REMOTE_IP,
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            "/auth/me/",
+            headers={"Authorization": f"Bearer {access_token}", "User-Agent": "Other"},
+            REMOTE_ADDR=REMOTE_IP,
+        )
+        self.assertEqual(response.status_code, 403)
+
+        deleted, mismatch = AuthEvent.objects.order_by("id")
+        self.assertEqual(deleted.type, AuthEvent.Type.SESSION_DELETE)
+        self.assertEqual(
+            (deleted.session_id, deleted.data), (other.pk, {"current": False})
+        )
+        self.assertEqual(mismatch.type, AuthEvent.Type.FINGERPRINT_MISMATCH)
+        self.assertEqual(mismatch.session_id, session.pk)
+        self.assertEqual(mismatch.data["session_user_agent"], USER_AGENT)
+
+    def test_purge(self):
+        now = timezone.now()
+        AuthEvent.objects.bulk_create(
+            AuthEvent(
+                type=AuthEvent.Type.SIGN_IN,
+                created_at=now - timedelta(days=days, hours=1),
+            )
+            for days in (0, 10, 95, 100, 400)
+        )
+
+        self.assertEqual(purge_auth_events(), 3)
+        self.assertEqual(AuthEvent.objects.count(), 2)
+
+        stdout = io.StringIO()
+        call_command("purge_auth_events", older_than=5, stdout=stdout)
+        self.assertIn("Deleted 1 authentication events", stdout.getvalue())
+        self.assertEqual(AuthEvent.objects.count(), 1)
+
+
+class IdempotencyTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(*USER_CREDENTIALS, is_active=True)
+        self.cache = caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+        self.addCleanup(self.cache.clear)
+
+    def sign_in(self, password=USER_CREDENTIALS[2], key="key"):
+        return self.client.post(
+            "/auth/signin/",
+            {"username": USER_CREDENTIALS[0], "password": password},
+            content_type="application/json",
+            headers={"User-Agent": USER_AGENT, "Idempotency-Key": key},
+            REMOTE_ADDR=REMOTE_IP,
+        )
+
+    def lock(self, key="key"):
+        request = Request(
+            RequestFactory().post(
+                "/", HTTP_USER_AGENT=USER_AGENT, REMOTE_ADDR=REMOTE_IP
+            )
+        )
+        lock_key = idempotency.get_idempotency_cache_key(request, key) + ":lock"
+        self.cache.add(lock_key, "in flight")
+        return lock_key
+
+    def test_replay(self):
+        response = self.sign_in()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Idempotent-Replayed", response.headers)
+
+        with self.assertNumQueries(0):
+            replayed = self.sign_in()
+        self.assertEqual(replayed.status_code, 200)
+        self.assertEqual(replayed["Idempotent-Replayed"], "true")
+        self.assertEqual(replayed.json(), response.json())
+        self.assertEqual(Session.objects.count(), 1)
+
+        self.assertEqual(self.sign_in(key="other").status_code, 200)
+        self.assertEqual(Session.objects.count(), 2)
+
+    def test_password_is_not_stored(self):
+        self.sign_in()
+        request = Request(
+            RequestFactory().post(
+                "/", HTTP_USER_AGENT=USER_AGENT, REMOTE_ADDR=REMOTE_IP
+            )
+        )
+        stored = self.cache.get(idempotency.get_idempotency_cache_key(request, "key"))
+
+        body = json.dumps(
+            {"password": USER_CREDENTIALS[2], "username": USER_CREDENTIALS[0]},
+            sort_keys=True,
+        )
+        unkeyed = hashlib.sha256(f"POST|/auth/signin/|{body}".encode()).hexdigest()
+        self.assertNotEqual(stored["digest"], unkeyed)
+        self.assertNotIn(USER_CREDENTIALS[2], str(stored))
+
+    def test_reused_key(self):
+        self.assertEqual(self.sign_in("wrongpassword").status_code, 403)
+        self.assertEqual(self.sign_in().status_code, 422)
+        self.assertFalse(Session.objects.exists())
+
+    def test_waits_for_request_in_flight(self):
+        lock_key = self.lock()
+        # The request in flight fails without a response: the retry runs once it is gone
+        threading.Timer(0.2, self.cache.delete, [lock_key]).start()
+
+        self.assertEqual(self.sign_in().status_code, 200)
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_request_in_flight_timeout(self):
+        self.lock()
+        with mock.patch.object(idempotency, "WAIT_TIMEOUT", 0.1):
+            self.assertEqual(self.sign_in().status_code, 409)
+        self.assertFalse(Session.objects.exists())
+
+
+@override_settings(PASSWORD_HASHING={"WORKERS": 2, "MIN_POOL_BATCH": 2})
+class ProvisioningTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            *USER_CREDENTIALS, is_active=True, is_staff=True
+        )
+        self.access_token, _ = Session.create_for_user(
+            self.user, USER_AGENT, REMOTE_IP
+        ).create_token_pair()
+
+    def post(self, users):
+        return self.client.post(
+            "/auth/users/bulk/",
+            {"users": users},
+            content_type="application/json",
+            headers={
+                "Authorization": f"Bearer {self.access_token}",
+                "User-Agent": USER_AGENT,
+            },
+            REMOTE_ADDR=REMOTE_IP,
+        )
+
+    def test_bulk_sign_up(self):
+        response = self.post(
+            [
+                {
+                    "username": "user1",
+                    "email": "user1@moviements.ru",
+                    "password": "password1",
+                },
+                {"username": "user2", "email": "invalid", "password": "password2"},
+                {
+                    "username": USER_CREDENTIALS[0],
+                    "email": "user3@moviements.ru",
+                    "password": "password3",
+                },
+                {
+                    "username": "user4",
+                    "email": "user4@moviements.ru",
+                    "password": "password4",
+                },
+                {
+                    "username": "user5",
+                    "email": "user1@moviements.ru",
+                    "password": "password5",
+                },
+            ]
+        )
+        self.assertEqual(response.status_code, 201)
+
+        created, errors = response.json()["created"], response.json()["errors"]
+        self.assertEqual([row["index"] for row in created], [0, 3])
+        self.assertEqual(
+            {row["index"]: set(row["errors"]) for row in errors},
+            {1: {"email"}, 2: {"username"}, 4: {"email"}},
+        )
+        self.assertEqual(
+            errors[1]["errors"]["username"],
+            ["A user with that username already exists."],
+        )
+
+        user = CustomUser.objects.get(username="user4")
+        self.assertFalse(user.is_active)
+        self.assertTrue(user.check_password("password4"))
+        self.assertEqual(str(user.pk), created[1]["id"])
+
+        verification_request = UserRequest.objects.get(user=user)
+        self.assertEqual(str(verification_request.id), created[1]["request_id"])
+        self.assertEqual(
+            verification_request.type, UserRequest.UserRequestType.SIGNUP_COMPLETE
+        )
+        email = EmailOutbox.objects.get(to="user4@moviements.ru")
+        self.assertIn(str(verification_request.id), email.body)
+
+    def test_hashing_pool_lifetime(self):
+        with mock.patch.object(
+            hashing, "start_pool", wraps=hashing.start_pool
+        ) as start_pool:
+            # One pool per batch, shut down once it is hashed
+            hashing.hash_passwords(["password1", "password2"])
+            self.assertIsNone(hashing._pool)
+
+            with hashing.hashing_pool():
+                hashing.hash_passwords(["password1", "password2"])
+                encoded = hashing.hash_passwords(["password1", "password2"])
+            self.assertIsNone(hashing._pool)
+
+        self.assertEqual(start_pool.call_count, 2)
+        self.assertTrue(check_password("password2", encoded[1]))
+
+    def test_no_valid_rows(self):
+        response = self.post([{"username": "user1"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            set(response.json()["errors"][0]["errors"]), {"email", "password"}
+        )
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+    def test_staff_only(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_staff=False)
+        response = self.post(
+            [
+                {
+                    "username": "user1",
+                    "email": "user1@moviements.ru",
+                    "password": "password1",
+                }
+            ]
+        )
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(BULK_PROVISIONING={"MAX_BATCH_SIZE": 1})
+    def test_max_batch_size(self):
+        response = self.post([{}, {}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("users", response.json())
+
+    def test_command(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        path = f"{directory}/users.csv"
+        with open(path, "w") as file:
+            file.write("username,email,password\n")
+            for i in range(3):
+                file.write(f"user{i},user{i}@moviements.ru,password{i}\n")
+            file.write(f"{USER_CREDENTIALS[0]},other@moviements.ru,password\n")
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command(
+            "provision_users", path, batch_size=2, stdout=stdout, stderr=stderr
+        )
+
+        self.assertIn("Created 3 users, 1 invalid rows", stdout.getvalue())
+        self.assertEqual(
+            stderr.getvalue(),
+            "Row 4: username: A user with that username already exists.\n",
+        )
+        self.assertEqual(UserRequest.objects.count(), 3)
+        self.assertTrue(
+            CustomUser.objects.get(username="user2").check_password("password2")
+        )
+
+
+class SeedDataTestCase(TestCase):
+    def seed(self, **options):
+        call_command(
+            "seed_data",
+            users=50,
+            seed=42,
+            batch_size=20,
+            revoked_fraction=0.5,
+            inactive_fraction=0.2,
+            stdout=io.StringIO(),
+            **options,
+        )
+        return (
+            list(
+                CustomUser.objects.order_by("username").values_list(
+                    "id", "username", "is_active"
+                )
+            ),
+            list(
+                Session.objects.order_by("id").values_list(
+                    "id", "user_id", "ip_address"
+                )
+            ),
+        )
+
+    def test_seed_data(self):
+        users, sessions = self.seed()
+
+        self.assertEqual(len(users), 50)
+        self.assertTrue(sessions)
+        self.assertEqual(Blacklist.objects.count() % 2, 0)
+        self.assertTrue(Blacklist.objects.exists())
+        self.assertEqual(
+            UserRequest.objects.filter(
+                type=UserRequest.UserRequestType.SIGNUP_COMPLETE
+            ).count(),
+            CustomUser.objects.filter(is_active=False).count(),
+        )
+        # Timestamps are generated, not set to now
+        self.assertLess(
+            Session.objects.earliest("created_at").created_at,
+            timezone.now() - timedelta(days=1),
+        )
+
+        user = CustomUser.objects.get(username="seed0")
+        self.assertTrue(user.check_password("password"))
+
+    def test_seed_data_is_deterministic(self):
+        first = self.seed()
+        CustomUser.objects.all().delete()
+        Blacklist.objects.all().delete()
+        self.assertEqual(self.seed(), first)
+
+
+class EndpointStatsTestCase(SimpleTestCase):
+    def test_summary_with_errors_and_statuses(self):
+        user = VirtualUser(LoadTest("http://127.0.0.1:8000"), 0, None)
+        responses = [
+            ConnectionRefusedError(),
+            HTTPResponse(200, {}, b""),
+            HTTPResponse(401, {}, b""),
+        ]
+
+        with mock.patch.object(user.connection, "request", side_effect=responses):
+            for _ in responses:
+                asyncio.run(user.call("me", "GET", "/auth/me/"))
+
+        summary = user.test.stats["me"].summary(elapsed=1.0)
+        self.assertEqual(
+            summary["statuses"], {"200": 1, "401": 1, "ConnectionRefusedError": 1}
+        )
+        self.assertEqual(summary["errors"], 2)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class LoadTestTestCase(LiveServerTestCase):
+    databases = "__all__"
+
+    def test_load_test(self):
+        results = asyncio.run(
+            LoadTest(
+                self.live_server_url,
+                concurrency=1,
+                duration=1.5,
+                mix={
+                    "signup": 1,
+                    "signin": 1,
+                    "refresh": 2,
+                    "me": 4,
+                    "session_delete": 1,
+                },
+            ).run()
+        )
+
+        self.assertEqual(results["errors"], 0, results["endpoints"])
+        self.assertEqual(
+            set(results["endpoints"]),
+            {
+                "sign_up",
+                "sign_up_complete",
+                "sign_in",
+                "refresh",
+                "me",
+                "session_delete",
+            },
+        )
+        self.assertIsNotNone(results["endpoints"]["me"]["p99_ms"])
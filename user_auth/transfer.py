@@ -0,0 +1,206 @@
+"""
+Streaming export and import of users and sessions, as CSV or JSON Lines.
+
+Exports read the rows with QuerySet.iterator and yield one line at a time; imports read
+the file line by line and bulk_create in batches. Memory stays constant whatever the row
+count. Password hashes are exported and imported as they are; group and permission
+memberships are not transferred.
+"""
+
+import csv
+import datetime
+import io
+import json
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+
+from moviements.db.config import get_shard_aliases
+
+from .models import CustomUser, Session
+
+FORMATS = ("csv", "jsonl")
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/jsonl; charset=utf-8",
+}
+
+MODELS = {"users": CustomUser, "sessions": Session}
+
+# Reset on import
+EXCLUDED_FIELDS = {"permissions_version"}
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Disables auto_now and auto_now_add on the models, so that bulk_create keeps the given timestamps.
+    """
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class ExportJSONEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # Full precision, DjangoJSONEncoder rounds the times to milliseconds
+        if isinstance(o, (datetime.date, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def get_fields(model) -> list:
+    return [
+        field
+        for field in model._meta.concrete_fields
+        if field.name not in EXCLUDED_FIELDS
+    ]
+
+
+def get_format(path: str) -> str:
+    """
+    Returns the format of a file from its extension.
+    """
+    extension = path.rsplit(".", 1)[-1].lower()
+    if extension not in FORMATS:
+        raise ValueError(
+            f"Unknown format of {path}, expected one of {', '.join(FORMATS)}"
+        )
+    return extension
+
+
+def iter_rows(model, queryset=None, chunk_size: int = 2000) -> Iterator[tuple]:
+    """
+    Yields the values of the exported fields of the rows, shard by shard for sharded models.
+
+    Parameters:
+        model: CustomUser or Session.
+        queryset (QuerySet, optional): The rows to export. Defaults to all of them.
+        chunk_size (int, optional): The number of rows fetched at once. Defaults to 2000.
+    """
+    if queryset is not None:
+        querysets = [queryset]
+    elif model is Session:
+        querysets = [
+            Session.objects.for_shard(alias)
+            for alias in get_shard_aliases() or [DEFAULT_DB_ALIAS]
+        ]
+    else:
+        querysets = [model.objects.all()]
+
+    attnames = [field.attname for field in get_fields(model)]
+    for queryset in querysets:
+        yield from queryset.order_by().values_list(*attnames).iterator(chunk_size)
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def export_lines(model, rows: Iterable[tuple], format: str) -> Iterator[str]:
+    """
+    Serializes the rows of iter_rows, yielding a header (for CSV) and one line per row.
+    """
+    attnames = [field.attname for field in get_fields(model)]
+
+    if format == "jsonl":
+        encoder = ExportJSONEncoder()
+        for row in rows:
+            yield encoder.encode(dict(zip(attnames, row))) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values: list) -> str:
+        writer.writerow(values)
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    yield line(attnames)
+    for row in rows:
+        yield line([_csv_value(value) for value in row])
+
+
+def read_records(file: IO[str], format: str) -> Iterator[dict]:
+    if format == "jsonl":
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from csv.DictReader(file)
+
+
+def to_instance(model, record: dict, fields: list):
+    values = {}
+    for field in fields:
+        if field.attname not in record:
+            continue
+        value = record[field.attname]
+        # CSV has no null
+        if value == "" and field.null:
+            value = None
+        values[field.attname] = None if value is None else field.to_python(value)
+    return model(**values)
+
+
+def import_records(
+    model,
+    file: IO[str],
+    format: str,
+    batch_size: int = 2000,
+    ignore_conflicts: bool = False,
+) -> int:
+    """
+    Imports the records of a file written by export_lines, one bulk_create per batch.
+
+    Parameters:
+        model: CustomUser or Session.
+        file (IO[str]): The file, read line by line.
+        format (str): "csv" or "jsonl".
+        batch_size (int, optional): The number of rows inserted at once. Defaults to 2000.
+        ignore_conflicts (bool, optional): Skip the rows that already exist instead of failing.
+
+    Returns:
+        int: The number of records read.
+    """
+    fields = get_fields(model)
+    count = 0
+    batch: list[CustomUser | Session] = []
+
+    def flush():
+        if model is Session:
+            model.objects.bulk_create_sharded(batch, ignore_conflicts=ignore_conflicts)
+        else:
+            model.objects.bulk_create(batch, ignore_conflicts=ignore_conflicts)
+        batch.clear()
+
+    with explicit_timestamps(model):
+        for record in read_records(file, format):
+            batch.append(to_instance(model, record, fields))
+            count += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+    return count
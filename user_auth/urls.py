@@ -3,6 +3,7 @@ from django.urls import path
 from .views import (
     SignUpView,
     SignUpCompleteView,
+    BulkSignUpView,
     SignInView,
     RefreshView,
     MeView,
@@ -19,6 +20,7 @@ urlpatterns = [
         SignUpCompleteView.as_view(),
         name="sign_up_complete",
     ),
+    path("users/bulk/", BulkSignUpView.as_view(), name="bulk_sign_up"),
     path("signin/", SignInView.as_view(), name="sign_in"),
     path("refresh/", RefreshView.as_view(), name="refresh"),
     path(
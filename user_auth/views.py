@@ -1,7 +1,8 @@
 import uuid
 
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q
 from django.utils import timezone
 
 from rest_framework import status
@@ -9,16 +10,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.request import Request
 
+from monitoring.metrics import SIGN_IN_TOTAL, REFRESH_TOTAL
+from monitoring.timing import phase
+from moviements.db.routers import stick_to_primary
 from tokens.authentication import AuthenticationData
 from tokens.permissions import (
     IsRefreshToken,
     IsAccessToken,
+    IsStaff,
 )
 from tokens.models import Blacklist
 
-from .models import UserRequest, Session
+from .audit import record_auth_event
+from .etags import make_etag, conditional_response
+from .idempotency import idempotent
+from .models import AuthEvent, UserRequest, Session
+from .provisioning import provision_users
 from .serializers import (
     SignUpSerializer,
+    BulkSignUpRequestSerializer,
     SignInSerializer,
     PasswordResetRequestSerializer,
     PasswordResetSerializer,
@@ -30,18 +40,22 @@ User = get_user_model()
 
 
 class SignUpView(APIView):
+    @idempotent
     def post(self, request: Request, *args, **kwargs):
         serializer = SignUpSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
 
-        serializer.instance.set_password(serializer.validated_data["password"])
-        serializer.instance.save()
+        with transaction.atomic():
+            serializer.save()
 
-        verification_request = UserRequest.objects.create(
-            user=serializer.instance,
-            type=UserRequest.UserRequestType.SIGNUP_COMPLETE,
-        )
+            serializer.instance.set_password(serializer.validated_data["password"])
+            serializer.instance.save()
+
+            verification_request = UserRequest.objects.create(
+                user=serializer.instance,
+                type=UserRequest.UserRequestType.SIGNUP_COMPLETE,
+            )
+            verification_request.send_email()
 
         return Response(
             {"request_id": str(verification_request.id)},
@@ -71,38 +85,94 @@ class SignUpCompleteView(APIView):
         )
 
 
+class BulkSignUpView(APIView):
+    permission_classes = [IsAccessToken, IsStaff]
+
+    @idempotent
+    def post(self, request: Request, *args, **kwargs):
+        serializer = BulkSignUpRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            result = provision_users(serializer.validated_data["users"])
+        except IntegrityError:
+            return Response(
+                {"error": "A username or email was taken during the sign-up, retry"},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        return Response(
+            result.to_dict(),
+            status=status.HTTP_201_CREATED
+            if result.created
+            else status.HTTP_400_BAD_REQUEST,
+        )
+
+
 class SignInView(APIView):
+    @idempotent
     def post(self, request: Request, *args, **kwargs):
         serializer = SignInSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         try:
-            user = User.objects.get(
-                Q(username=serializer.validated_data["username"])
-                | Q(email=serializer.validated_data["username"])
-            )
+            with phase("user_lookup"):
+                user = User.objects.get(
+                    Q(username=serializer.validated_data["username"])
+                    | Q(email=serializer.validated_data["username"])
+                )
         except User.DoesNotExist:
+            SIGN_IN_TOTAL.inc(outcome="unknown_user")
+            record_auth_event(
+                AuthEvent.Type.SIGN_IN_FAILED,
+                request,
+                reason="unknown_user",
+                username=serializer.validated_data["username"],
+            )
             return Response(
                 {"error": "Invalid credentials"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        if not user.check_password(serializer.validated_data["password"]):
+        with phase("password_check"):
+            valid_password = user.check_password(serializer.validated_data["password"])
+        if not valid_password:
+            SIGN_IN_TOTAL.inc(outcome="invalid_password")
+            record_auth_event(
+                AuthEvent.Type.SIGN_IN_FAILED,
+                request,
+                user_id=user.pk,
+                reason="invalid_password",
+            )
             return Response(
                 {"error": "Invalid credentials"}, status=status.HTTP_403_FORBIDDEN
             )
 
         if not user.is_active:
+            SIGN_IN_TOTAL.inc(outcome="inactive")
+            record_auth_event(
+                AuthEvent.Type.SIGN_IN_FAILED,
+                request,
+                user_id=user.pk,
+                reason="inactive",
+            )
             return Response(
                 {"error": "User is not active"}, status=status.HTTP_403_FORBIDDEN
             )
 
-        session = Session.create_for_user(
-            user, request.META["HTTP_USER_AGENT"], request.META["REMOTE_ADDR"]
+        with phase("session_create"):
+            session = Session.create_for_user(
+                user, request.META["HTTP_USER_AGENT"], request.META["REMOTE_ADDR"]
+            )
+            session.updated_at = timezone.now()
+            session.save()
+        stick_to_primary(user.pk)
+        with phase("token_generate"):
+            access_token, refresh_token = session.create_token_pair()
+
+        SIGN_IN_TOTAL.inc(outcome="success")
+        record_auth_event(
+            AuthEvent.Type.SIGN_IN, request, user_id=user.pk, session_id=session.pk
         )
-        session.updated_at = timezone.now()
-        session.save()
-        access_token, refresh_token = session.create_token_pair()
-
         return Response(
             {"access_token": access_token, "refresh_token": refresh_token},
             status=status.HTTP_200_OK,
@@ -112,13 +182,27 @@ class SignInView(APIView):
 class RefreshView(APIView):
     permission_classes = [IsRefreshToken]
 
+    def handle_exception(self, exc):
+        REFRESH_TOTAL.inc(outcome="rejected")
+        return super().handle_exception(exc)
+
     def post(self, request: Request, *args, **kwargs):
         auth: AuthenticationData = request.auth
 
-        Blacklist.blacklist_refresh_token(str(auth.token))
+        with phase("token_revoke"):
+            Blacklist.blacklist_refresh_token(str(auth.token))
+        stick_to_primary(request.user.pk)
 
-        access_token, refresh_token = auth.session.create_token_pair()
+        with phase("token_generate"):
+            access_token, refresh_token = auth.session.create_token_pair()
 
+        REFRESH_TOTAL.inc(outcome="success")
+        record_auth_event(
+            AuthEvent.Type.REFRESH,
+            request,
+            user_id=request.user.pk,
+            session_id=auth.session.pk,
+        )
         return Response(
             {"access_token": access_token, "refresh_token": refresh_token},
             status=status.HTTP_200_OK,
@@ -126,6 +210,7 @@ class RefreshView(APIView):
 
 
 class PasswordResetRequestView(APIView):
+    @idempotent
     def post(self, request: Request, *args, **kwargs):
         serializer = PasswordResetRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -140,16 +225,18 @@ class PasswordResetRequestView(APIView):
                 {"error": "Invalid credentials"}, status=status.HTTP_403_FORBIDDEN
             )
 
-        # Delete all previous password reset requests
-        UserRequest.objects.filter(
-            user=user,
-            type=UserRequest.UserRequestType.PASSWORD_RESET,
-        ).delete()
+        with transaction.atomic():
+            # Delete all previous password reset requests
+            UserRequest.objects.filter(
+                user=user,
+                type=UserRequest.UserRequestType.PASSWORD_RESET,
+            ).delete()
 
-        reset_request = UserRequest.objects.create(
-            user=user,
-            type=UserRequest.UserRequestType.PASSWORD_RESET,
-        )
+            reset_request = UserRequest.objects.create(
+                user=user,
+                type=UserRequest.UserRequestType.PASSWORD_RESET,
+            )
+            reset_request.send_email()
 
         return Response(
             {"request_id": str(reset_request.id)}, status=status.HTTP_201_CREATED
@@ -157,6 +244,7 @@ class PasswordResetRequestView(APIView):
 
 
 class PasswordResetView(APIView):
+    @idempotent
     def post(self, request: Request, request_id: str, *args, **kwargs):
         try:
             reset_request = UserRequest.objects.get(
@@ -175,9 +263,15 @@ class PasswordResetView(APIView):
         reset_request.user.set_password(serializer.validated_data["new_password"])
         reset_request.user.save()
 
-        reset_request.user.sessions.all().delete()
+        Session.objects.for_user(reset_request.user_id).filter(
+            user_id=reset_request.user_id
+        ).delete()
 
         reset_request.delete()
+        stick_to_primary(reset_request.user_id)
+        record_auth_event(
+            AuthEvent.Type.PASSWORD_RESET, request, user_id=reset_request.user_id
+        )
 
         return Response({"response": "Password changed"}, status=status.HTTP_200_OK)
 
@@ -186,20 +280,32 @@ class MeView(APIView):
     permission_classes = [IsAccessToken]
 
     def get(self, request: Request, *args, **kwargs):
-        serializer = UserSerializer(request.user)
+        user = request.user
         session = request.auth.session
 
-        return Response(
-            {
-                "user": serializer.data,
-                "session": {
-                    "id": str(session.id),
-                    "created_at": session.created_at,
-                    "updated_at": session.updated_at,
+        def get_response():
+            with phase("serialize"):
+                user_data = UserSerializer(user).data
+            return Response(
+                {
+                    "user": user_data,
+                    "session": {
+                        "id": str(session.id),
+                        "created_at": session.created_at,
+                        "updated_at": session.updated_at,
+                    },
                 },
-            },
-            status=status.HTTP_200_OK,
+                status=status.HTTP_200_OK,
+            )
+
+        etag = make_etag(
+            user.pk,
+            user.updated_at,
+            user.last_login,
+            session.pk,
+            session.updated_at,
         )
+        return conditional_response(request, etag, get_response)
 
 
 class SessionView(APIView):
@@ -207,28 +313,46 @@ class SessionView(APIView):
 
     def get(self, request: Request, session_id: str, *args, **kwargs):
         try:
-            session = Session.objects.get(id=uuid.UUID(session_id))
-        except Session.DoesNotExist:
+            session = Session.objects.for_user(request.user.pk).get(
+                id=uuid.UUID(session_id)
+            )
+        except (Session.DoesNotExist, ValueError):
             return Response(
                 {"error": "Invalid session id"}, status=status.HTTP_404_NOT_FOUND
             )
 
         self.check_object_permissions(request, session)
 
-        serializer = SessionSerializer(session)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return conditional_response(
+            request,
+            make_etag(session.pk, session.updated_at),
+            lambda: Response(
+                SessionSerializer(session).data, status=status.HTTP_200_OK
+            ),
+        )
 
     def delete(self, request: Request, session_id: str, *args, **kwargs):
         try:
-            session = Session.objects.get(id=uuid.UUID(session_id))
-        except Session.DoesNotExist:
+            session = Session.objects.for_user(request.user.pk).get(
+                id=uuid.UUID(session_id)
+            )
+        except (Session.DoesNotExist, ValueError):
             return Response(
                 {"error": "Invalid session id"}, status=status.HTTP_404_NOT_FOUND
             )
 
         self.check_object_permissions(request, session)
 
+        session_pk = session.pk
         session.delete()
+        stick_to_primary(request.user.pk)
+        record_auth_event(
+            AuthEvent.Type.SESSION_DELETE,
+            request,
+            user_id=request.user.pk,
+            session_id=session_pk,
+            current=session_pk == request.auth.session.pk,
+        )
         return Response({"response": "Session deleted"}, status=status.HTTP_200_OK)
 
 
@@ -236,11 +360,14 @@ class SessionsView(APIView):
     permission_classes = [IsAccessToken]
 
     def get(self, request: Request, *args, **kwargs):
-        http_request = request._request
-        if not http_request.token_session or not http_request.token_user:
-            return Response(status=status.HTTP_403_FORBIDDEN)
-
-        serializer = SessionSerializer(
-            http_request.token_user.sessions.all(), many=True
+        sessions = Session.objects.for_user(request.user.pk).filter(user=request.user)
+        version = sessions.aggregate(count=Count("id"), updated_at=Max("updated_at"))
+
+        return conditional_response(
+            request,
+            make_etag(request.user.pk, version["count"], version["updated_at"]),
+            lambda: Response(
+                {"sessions": SessionSerializer(sessions, many=True).data},
+                status=status.HTTP_200_OK,
+            ),
         )
-        return Response({"sessions": serializer.data}, status=status.HTTP_200_OK)